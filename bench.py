@@ -0,0 +1,792 @@
+"""
+Offline benchmarks and Overwatch replay for scan.py: a fake Telegram client, synthetic
+chats and event streams, and playback of `scan.py overwatch --record` logs.
+Needs no Telegram login or network access; kept out of scan.py, which users download as one file.
+
+    python3 bench.py run [--only overwatch,scan,loader,refresh] [--format json]
+    python3 bench.py replay updates.jsonl.gz --speed 20 --list-file scammer_ids_v2.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List, Tuple, Optional, Dict, Set, Any
+
+from telethon import events
+from telethon.tl import functions
+from telethon.tl.types import (Channel, User, PeerUser, ChatPhotoEmpty, MessageActionChatAddUser,
+                               MessageActionChatJoinedByLink)
+from telethon.errors.rpcerrorlist import UsernameNotOccupiedError
+
+from scan import (
+    __version__, METRICS, _HIST_BUCKETS, _Histogram, DUPLICATE_MARKER_EMOJI,
+    EXIT_OK, EXIT_ERROR, EXIT_NO_SCAMMER_DATA, EXIT_USAGE,
+    _internal_id_from_peer, check_chats_for_scammers, overwatch_mode, read_update_recording,
+    load_scammer_data_v2, load_scammer_data_v2_from_file, load_scammer_index_v2_in_subprocess,
+    close_http_sessions,
+)
+
+# --- Offline stand-ins (benchmarks / replay) ---
+class FakeMessage:
+    """Just the Message attributes the Overwatch handlers read."""
+
+    def __init__(self, msg_id: int, date: datetime, *, sender_id: Optional[int] = None, out: bool = False,
+                 action=None, text: str = ""):
+        self.id = msg_id
+        self.date = date
+        self.out = out
+        self.action = action
+        self.message = text
+        self.sender_id = sender_id
+        self.from_id = PeerUser(user_id=sender_id) if sender_id else None
+
+class FakeNewMessageEvent:
+    def __init__(self, client: "FakeTelegramClient", chat_id: int, message: FakeMessage):
+        self.client = client
+        self.chat_id = chat_id
+        self.message = message
+        self.raw_text = message.message
+
+    async def get_chat(self):
+        return self.client._entity_for_peer(self.chat_id)
+
+    async def get_sender(self):
+        uid = self.message.sender_id
+        return self.client._user(uid) if uid else None
+
+class FakeChatActionEvent:
+    def __init__(self, client: "FakeTelegramClient", chat_id: int, user_id: int, *, joined: bool = False,
+                 added: bool = False, left: bool = False, kicked: bool = False,
+                 action_message: Optional[FakeMessage] = None):
+        self.client = client
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.user_joined = joined
+        self.user_added = added
+        self.user_left = left
+        self.user_kicked = kicked
+        self.action_message = action_message
+
+    async def get_chat(self):
+        return self.client._entity_for_peer(self.chat_id)
+
+    async def get_user(self):
+        return self.client._user(self.user_id)
+
+class _FakeDialog:
+    def __init__(self, peer_id: int, entity):
+        self.id = peer_id
+        self.entity = entity
+
+class FakeTelegramClient:
+    """
+    In-memory stand-in for TelegramClient: no network, no session file.
+
+    Holds synthetic chats (real Telethon Channel objects, so isinstance checks
+    behave), participant lists and users. Handlers registered via client.on()
+    are driven by dispatch(event). Every API call is counted in rpc_counts and
+    can be given an artificial latency (rpc_latency seconds).
+    """
+
+    def __init__(self, *, me_id: int = 1, rpc_latency: float = 0.0):
+        self.me = User(id=me_id, is_self=True, first_name="Me", access_hash=1)
+        self.rpc_latency = rpc_latency
+        self.rpc_counts: Dict[str, int] = defaultdict(int)
+        self.handlers: List[Tuple[Any, Any]] = []
+        self.chats: Dict[int, Any] = {}            # peer id -> Channel
+        self.participants: Dict[int, List[Any]] = {}
+        self.users: Dict[int, Any] = {}
+        self.sent: List[Tuple[Any, str]] = []
+        self.history: Dict[int, List[Any]] = defaultdict(list)   # peer id -> messages, oldest first
+        self._next_msg_id = 1
+        self._disconnected = asyncio.Event()
+        self.running = asyncio.Event()              # set once run_until_disconnected() is entered
+
+    # -- synthetic world --
+    def add_chat(self, internal_id: int, title: str, participants: List[Any], *, username: Optional[str] = None,
+                 participants_count: Optional[int] = None, peer_id: Optional[int] = None):
+        if peer_id is None:
+            peer_id = int(f"-100{internal_id}")
+        if participants_count is None:
+            participants_count = len(participants)
+        ent = Channel(id=internal_id, title=title, photo=ChatPhotoEmpty(), date=None, megagroup=True,
+                      access_hash=internal_id, username=username, participants_count=participants_count)
+        self.chats[peer_id] = ent
+        self.participants[peer_id] = list(participants)
+        for u in participants:
+            self.users[u.id] = u
+        return peer_id, ent
+
+    def add_user(self, user_id: int, *, username: Optional[str] = None, first_name: str = "User"):
+        u = User(id=user_id, access_hash=user_id, username=username, first_name=first_name)
+        self.users[user_id] = u
+        return u
+
+    def _user(self, user_id: int):
+        u = self.users.get(user_id)
+        if u is None:
+            u = self.add_user(user_id)
+        return u
+
+    def _entity_for_peer(self, peer_id: int):
+        return self.chats.get(peer_id)
+
+    async def _rpc(self, name: str):
+        self.rpc_counts[name] += 1
+        METRICS.inc("scamscan_rpc_total", method=name)  # like ScamScanClient, so RPC budgets work offline
+        if self.rpc_latency:
+            await asyncio.sleep(self.rpc_latency)
+
+    # -- TelegramClient surface used by scan.py --
+    def on(self, builder):
+        def decorator(fn):
+            self.handlers.append((builder, fn))
+            return fn
+        return decorator
+
+    async def dispatch(self, event) -> float:
+        """Runs every matching handler; returns the wall time spent in handlers."""
+        t0 = time.perf_counter()
+        for builder, fn in self.handlers:
+            if isinstance(event, FakeNewMessageEvent) and isinstance(builder, events.NewMessage):
+                await fn(event)
+            elif isinstance(event, FakeChatActionEvent) and isinstance(builder, events.ChatAction):
+                await fn(event)
+        return time.perf_counter() - t0
+
+    async def start(self, *args, **kwargs):
+        return self
+
+    async def connect(self):
+        self._disconnected.clear()
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    def is_connected(self) -> bool:
+        return not self._disconnected.is_set()
+
+    async def disconnect(self):
+        self._disconnected.set()
+
+    async def run_until_disconnected(self):
+        self.running.set()
+        await self._disconnected.wait()
+
+    async def get_me(self):
+        await self._rpc("GetUsersRequest")
+        return self.me
+
+    async def get_dialogs(self, *args, **kwargs):
+        await self._rpc("GetDialogsRequest")
+        return [_FakeDialog(pid, ent) for pid, ent in self.chats.items()]
+
+    async def get_participants(self, chat, *args, **kwargs):
+        peer_id = int(f"-100{chat.id}") if getattr(chat, "id", 0) > 0 else chat.id
+        n = len(self.participants.get(peer_id, []))
+        # Telegram pages participant lists 200 at a time
+        for _ in range(max(1, (n + 199) // 200)):
+            await self._rpc("GetParticipantsRequest")
+        return list(self.participants.get(peer_id, []))
+
+    async def get_entity(self, ref):
+        await self._rpc("ResolveUsernameRequest" if isinstance(ref, str) else "GetUsersRequest")
+        if isinstance(ref, str):
+            name = ref.lstrip("@").lower()
+            for u in self.users.values():
+                if (getattr(u, "username", None) or "").lower() == name:
+                    return u
+            raise UsernameNotOccupiedError(request=None)
+        if ref in self.chats:
+            return self.chats[ref]
+        return self._user(int(ref))
+
+    async def get_input_entity(self, ref):
+        if ref == "me":
+            return self.me
+        return await self.get_entity(ref)
+
+    async def send_message(self, entity, text, *args, **kwargs):
+        await self._rpc("SendMessageRequest")
+        self.sent.append((entity, text))
+        self._next_msg_id += 1
+        return FakeMessage(self._next_msg_id, datetime.now(timezone.utc), sender_id=self.me.id, out=True, text=text)
+
+    async def iter_messages(self, entity, limit=None, *, min_id: int = 0, reverse: bool = False, **kwargs):
+        peer_id = entity if isinstance(entity, int) else int(f"-100{entity.id}")
+        msgs = [m for m in self.history.get(peer_id, []) if m.id > min_id]
+        msgs = (msgs if reverse else msgs[::-1])[:limit]
+        for _ in range(max(1, (len(msgs) + 99) // 100)):
+            await self._rpc("GetHistoryRequest")
+        for m in msgs:
+            yield m
+
+    async def delete_messages(self, entity, message_ids, *args, **kwargs):
+        await self._rpc("DeleteMessagesRequest")
+        return []
+
+    async def catch_up(self):
+        await self._rpc("GetDifferenceRequest")
+
+    async def __call__(self, request, *args, **kwargs):
+        name = type(request).__name__
+        await self._rpc(name)
+        if isinstance(request, functions.messages.GetCommonChatsRequest):
+            uid = getattr(request.user_id, "id", request.user_id)
+            chats = [ent for pid, ent in self.chats.items()
+                     if any(u.id == uid for u in self.participants.get(pid, []))]
+            return SimpleNamespace(chats=chats)
+        if isinstance(request, functions.channels.GetParticipantsRequest):
+            peer_id = int(f"-100{request.channel.id}")
+            users = self.participants.get(peer_id, [])[request.offset:request.offset + request.limit]
+            return SimpleNamespace(users=users, participants=[], count=len(users))
+        return SimpleNamespace()
+
+# --- Offline benchmark ---
+BENCH_SCAMMER_ID_BASE = 7_000_000_000
+BENCH_USER_ID_BASE = 1_000_000_000
+BENCH_CHAT_ID_BASE = 1_500_000_000
+
+def _bench_scammer_payload(n: int) -> Dict[str, Any]:
+    data = {}
+    for i in range(n):
+        uid = BENCH_SCAMMER_ID_BASE + i
+        data[str(uid)] = {
+            "topic_id": 1000 + i,
+            "message_id": 50_000 + i,
+            "reason": "bench: synthetic entry",
+            "username": f"scam_bench_{i}" if i % 3 else "DELETED",
+            "full_name": f"Bench Scammer {i}",
+        }
+    return {"count": n, "generated_at": int(time.time()), "data": data}
+
+def _quantile(sorted_vals: List[float], q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+def _histogram_counts(name: str) -> List[int]:
+    """Bucket counts of a METRICS histogram, all label series added together."""
+    counts = [0] * (len(_HIST_BUCKETS) + 1)
+    for h in METRICS.histograms.get(name, {}).values():
+        counts = [a + b for a, b in zip(counts, h.counts)]
+    return counts
+
+def _histogram_since(name: str, before: List[int]) -> _Histogram:
+    """What a METRICS histogram observed since _histogram_counts(name) returned before."""
+    h = _Histogram()
+    h.counts = [a - b for a, b in zip(_histogram_counts(name), before)]
+    h.count = sum(h.counts)
+    return h
+
+def _rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def _bench_world(
+    *,
+    chats: int,
+    participants: int,
+    scammers: int,
+    scammers_per_chat: int,
+    rpc_latency: float,
+) -> Tuple[FakeTelegramClient, List[int], List[int], List[int]]:
+    """
+    Builds a fake client with `chats` megagroups of `participants` users each,
+    `scammers_per_chat` of which are listed scammers.
+    Returns (client, chat_peer_ids, member_ids, scammer_ids).
+    """
+    client = FakeTelegramClient(rpc_latency=rpc_latency)
+    scammer_ids = [BENCH_SCAMMER_ID_BASE + i for i in range(scammers)]
+    member_ids: List[int] = []
+    peer_ids: List[int] = []
+    for c in range(chats):
+        members = []
+        for p in range(participants):
+            uid = BENCH_USER_ID_BASE + c * participants + p
+            members.append(client.add_user(uid, first_name=f"Member {p}"))
+            member_ids.append(uid)
+        for k in range(min(scammers_per_chat, scammers)):
+            sid = scammer_ids[(c * scammers_per_chat + k) % scammers]
+            members.append(client.add_user(sid, username=f"scam_bench_{sid - BENCH_SCAMMER_ID_BASE}"))
+        peer_id, _ = client.add_chat(BENCH_CHAT_ID_BASE + c, f"Bench chat {c}", members)
+        peer_ids.append(peer_id)
+    return client, peer_ids, member_ids, scammer_ids
+
+def _bench_event_stream(
+    client: FakeTelegramClient,
+    peer_ids: List[int],
+    member_ids: List[int],
+    scammer_ids: List[int],
+    *,
+    count: int,
+    hit_rate: float,
+    action_rate: float,
+    seed: int,
+):
+    """Yields synthetic NewMessage / ChatAction events (deterministic for a given seed)."""
+    import random
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        chat_id = rng.choice(peer_ids)
+        is_hit = rng.random() < hit_rate
+        uid = rng.choice(scammer_ids) if is_hit and scammer_ids else rng.choice(member_ids)
+        if rng.random() < action_rate:
+            joined = rng.random() < 0.7
+            yield FakeChatActionEvent(client, chat_id, uid, joined=joined, left=not joined)
+        else:
+            msg = FakeMessage(10_000 + i, now, sender_id=uid, text=f"bench message {i}")
+            yield FakeNewMessageEvent(client, chat_id, msg)
+
+async def bench_overwatch(
+    *,
+    events_count: int = 20_000,
+    chats: int = 50,
+    participants: int = 200,
+    scammers: int = 5_000,
+    hit_rate: float = 0.01,
+    action_rate: float = 0.05,
+    report_mode: int = 1,
+    rpc_latency: float = 0.0,
+    seed: int = 1,
+) -> Dict[str, Any]:
+    """
+    Runs overwatch_mode() against a FakeTelegramClient and replays a synthetic
+    event stream through its handlers, one event at a time.
+    """
+    client, peer_ids, member_ids, scammer_ids = _bench_world(
+        chats=chats, participants=participants, scammers=scammers, scammers_per_chat=2, rpc_latency=rpc_latency,
+    )
+    payload = _bench_scammer_payload(scammers)
+    scammer_map = payload["data"]
+
+    stream = ((None, ev) for ev in _bench_event_stream(
+        client, peer_ids, member_ids, scammer_ids, count=events_count,
+        hit_rate=hit_rate, action_rate=action_rate, seed=seed,
+    ))
+    return await _drive_overwatch(client, set(scammer_map), scammer_map, report_mode, stream)
+
+async def _drive_overwatch(
+    client: FakeTelegramClient,
+    scammer_ids: Set[str],
+    scammer_map: Dict[str, Dict[str, Any]],
+    report_mode: int,
+    timed_events,
+    *,
+    speed: float = 0.0,
+    quiet: bool = True,
+) -> Dict[str, Any]:
+    """
+    Starts overwatch_mode() on a fake client, feeds it (t, event) pairs and measures event latency.
+    t is seconds from the start of the stream; with speed > 0 events are paced at t / speed,
+    otherwise (or when t is None) they are dispatched back to back.
+    Handlers only classify and enqueue, so the dispatch_* figures are that; event_* (enqueue to
+    processed) and queue_wait_* come from the worker histograms and are bucket upper bounds.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, "overwatch_state.json")
+        stdout_target = open(os.devnull, "w") if quiet else contextlib.nullcontext(sys.stdout)
+        with stdout_target as out, contextlib.redirect_stdout(out):
+            ow_task = asyncio.create_task(overwatch_mode(
+                client, scammer_ids, scammer_map, report_mode,
+                metrics_interval=0, state_file=state_file, check_updates=False,
+            ))
+            await client.running.wait()
+
+            setup_rpcs = sum(client.rpc_counts.values())
+            setup_sent = len(client.sent)
+            waits_before = _histogram_counts("scamscan_event_queue_wait_seconds")
+            events_before = _histogram_counts("scamscan_event_seconds")
+            latencies: List[float] = []
+            t0 = time.perf_counter()
+            for t, ev in timed_events:
+                if speed > 0 and t is not None:
+                    delay = t0 + (t / speed) - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                latencies.append(await client.dispatch(ev))
+                await asyncio.sleep(0)  # let the workers run between updates, as Telethon's receive loop does
+            # handlers only enqueue; wait for the workers so RPCs and alerts are counted
+            while METRICS.gauge_total("scamscan_event_queue_depth") > 0:
+                await asyncio.sleep(0.001)
+            elapsed = time.perf_counter() - t0
+            event_rpcs = sum(client.rpc_counts.values()) - setup_rpcs
+            waits = _histogram_since("scamscan_event_queue_wait_seconds", waits_before)
+            processed = _histogram_since("scamscan_event_seconds", events_before)
+
+            await client.disconnect()
+            await ow_task
+
+    n = len(latencies)
+    latencies.sort()
+    return {
+        "events": n,
+        "events_processed": processed.count,
+        "seconds": elapsed,
+        "events_per_sec": n / elapsed if elapsed else None,
+        "event_p50_ms": (processed.quantile(0.50) or 0) * 1000,
+        "event_p99_ms": (processed.quantile(0.99) or 0) * 1000,
+        "queue_wait_p50_ms": (waits.quantile(0.50) or 0) * 1000,
+        "queue_wait_p99_ms": (waits.quantile(0.99) or 0) * 1000,
+        "dispatch_p99_ms": (_quantile(latencies, 0.99) or 0) * 1000,
+        "dispatch_max_ms": (latencies[-1] if latencies else 0) * 1000,
+        "rpcs_per_event": event_rpcs / n if n else 0,
+        "rpcs_by_method": dict(client.rpc_counts),
+        "messages_sent": len(client.sent) - setup_sent,
+        "max_rss_mb": _rss_mb(),
+    }
+
+async def bench_scan(
+    *,
+    chats: int = 50,
+    participants: int = 2_000,
+    scammers: int = 5_000,
+    rpc_latency: float = 0.0,
+    concurrency: int = 1,
+) -> Dict[str, Any]:
+    """
+    Runs check_chats_for_scammers() over synthetic chats (console-only reporting, no per-chat pause).
+    """
+    client, _, _, _ = _bench_world(
+        chats=chats, participants=participants, scammers=scammers, scammers_per_chat=3, rpc_latency=rpc_latency,
+    )
+    scammer_map = _bench_scammer_payload(scammers)["data"]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        t0 = time.perf_counter()
+        summary = await check_chats_for_scammers(
+            client, "", set(scammer_map), scammer_map, 1, concurrency=concurrency, pause_seconds=0,
+        )
+        elapsed = time.perf_counter() - t0
+    users = chats * (participants + 3)
+    return {
+        "chats": summary["chats_scanned"],
+        "participants": users,
+        "hits": sum(len(r["scammers"]) for r in summary["results"]),
+        "seconds": elapsed,
+        "chats_per_sec": chats / elapsed if elapsed else None,
+        "participants_per_sec": users / elapsed if elapsed else None,
+        "rpcs": sum(client.rpc_counts.values()),
+        "max_rss_mb": _rss_mb(),
+    }
+
+@contextlib.contextmanager
+def _serve_bench_payload(body: bytes):
+    """Local HTTP fake of the v2 endpoint; yields its URL."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/scammer_ids_v2.json"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+async def _max_loop_lag_during(coro, tick: float = 0.001) -> Tuple[Any, float]:
+    """Runs coro while a ticker measures the worst event-loop stall; returns (result, max_lag_seconds)."""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def _ticker():
+        nonlocal worst
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(tick)
+            worst = max(worst, time.perf_counter() - t0 - tick)
+
+    ticker = asyncio.create_task(_ticker())
+    try:
+        result = await coro
+    finally:
+        done.set()
+        await ticker
+    return result, worst
+
+async def bench_refresh_stall(*, scammers: int = 50_000) -> Dict[str, Any]:
+    """
+    Worst event-loop stall while refreshing the list: worker thread vs worker process.
+    This is what Overwatch handlers feel during the hourly refresh.
+    """
+    body = json.dumps(_bench_scammer_payload(scammers)).encode("utf-8")
+    out: Dict[str, Any] = {"scammers": scammers}
+    with _serve_bench_payload(body) as url:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            t0 = time.perf_counter()
+            _, lag = await _max_loop_lag_during(asyncio.to_thread(load_scammer_data_v2, url))
+            out["thread_seconds"] = time.perf_counter() - t0
+            out["thread_max_loop_lag_ms"] = lag * 1000
+
+            # warm the worker process so spawn/import time isn't counted
+            await load_scammer_index_v2_in_subprocess(url)
+            t0 = time.perf_counter()
+            _, lag = await _max_loop_lag_during(load_scammer_index_v2_in_subprocess(url))
+            out["subprocess_seconds"] = time.perf_counter() - t0
+            out["subprocess_max_loop_lag_ms"] = lag * 1000
+    return out
+
+def bench_loader(*, scammers: int = 50_000, rounds: int = 3) -> Dict[str, Any]:
+    """
+    Serves a synthetic v2 payload from a local HTTP server and times load_scammer_data_v2() against it.
+    Peak Python allocation is measured with tracemalloc on a separate, untimed round.
+    """
+    import tracemalloc
+
+    body = json.dumps(_bench_scammer_payload(scammers)).encode("utf-8")
+    with _serve_bench_payload(body) as url:
+        timings = []
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(max(1, rounds)):
+                t0 = time.perf_counter()
+                _, ids = load_scammer_data_v2(url)
+                timings.append(time.perf_counter() - t0)
+
+            tracemalloc.start()
+            load_scammer_data_v2(url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "scammers": len(ids),
+        "payload_bytes": len(body),
+        "seconds_best": timings[0],
+        "seconds_median": timings[len(timings) // 2],
+        "entries_per_sec": len(ids) / timings[0] if timings[0] else None,
+        "peak_alloc_mb": peak / (1024 * 1024),
+    }
+
+async def run_benchmarks(args) -> Dict[str, Any]:
+    which = set((args.only or "overwatch,scan,loader,refresh").split(","))
+    results: Dict[str, Any] = {"version": __version__, "python": sys.version.split()[0]}
+    latency = args.rpc_latency_ms / 1000.0
+
+    if "loader" in which:
+        print(f"⏱️ bench loader: {args.scammers} scammers ...", file=sys.stderr)
+        results["loader"] = await asyncio.to_thread(bench_loader, scammers=args.scammers)
+    if "refresh" in which:
+        print(f"⏱️ bench refresh stall: {args.scammers} scammers ...", file=sys.stderr)
+        results["refresh"] = await bench_refresh_stall(scammers=args.scammers)
+    if "scan" in which:
+        print(f"⏱️ bench scan: {args.chats} chats x {args.participants} participants ...", file=sys.stderr)
+        results["scan"] = await bench_scan(chats=args.chats, participants=args.participants,
+                                           scammers=args.scammers, rpc_latency=latency,
+                                           concurrency=args.concurrency)
+    if "overwatch" in which:
+        print(f"⏱️ bench overwatch: {args.events} events ...", file=sys.stderr)
+        results["overwatch"] = await bench_overwatch(events_count=args.events, chats=args.chats,
+                                                     participants=min(args.participants, 500),
+                                                     scammers=args.scammers, hit_rate=args.hit_rate,
+                                                     report_mode=args.report_mode, rpc_latency=latency,
+                                                     seed=args.seed)
+    return results
+
+# --- Overwatch replay (recorded update streams) ---
+def _replay_events_from_recording(client: FakeTelegramClient, records: List[Any], started_at: float):
+    """
+    Turns UpdateRecorder records into (t, fake event) pairs. Chats get registered on the fake client.
+    """
+    for r in records:
+        if isinstance(r, list) and r and r[0] == "c":
+            _, chat_id, title, username = (r + [None] * 4)[:4]
+            if chat_id not in client.chats:
+                client.add_chat(int(_internal_id_from_peer(chat_id)), title or "(recorded chat)", [],
+                                username=username, participants_count=3, peer_id=chat_id)
+
+    for r in records:
+        if not isinstance(r, list) or not r or r[0] not in ("m", "a"):
+            continue
+        chat_id = r[2]
+        if chat_id not in client.chats:
+            client.add_chat(int(_internal_id_from_peer(chat_id)), "(recorded chat)", [],
+                            participants_count=3, peer_id=chat_id)
+        t = float(r[1])
+        date = datetime.fromtimestamp(started_at + t, timezone.utc)
+
+        if r[0] == "m":
+            _, _, _, msg_id, sender_id, out, action_rec, alert_uids = (r + [None] * 8)[:8]
+            action = None
+            if action_rec and action_rec[0] == "add":
+                action = MessageActionChatAddUser(users=list(action_rec[1] or []))
+            elif action_rec and action_rec[0] == "link":
+                action = MessageActionChatJoinedByLink(inviter_id=0)
+                sender_id = action_rec[1] or sender_id
+            text = f"{DUPLICATE_MARKER_EMOJI} scam alert " + " ".join(alert_uids) if alert_uids else ""
+            msg = FakeMessage(int(msg_id or 0), date, sender_id=sender_id, out=bool(out), action=action, text=text)
+            yield t, FakeNewMessageEvent(client, chat_id, msg)
+        else:
+            _, _, _, user_id, flags = (r + [None] * 5)[:5]
+            if user_id is None:
+                continue
+            flags = flags or ""
+            yield t, FakeChatActionEvent(client, chat_id, int(user_id), joined="j" in flags, added="a" in flags,
+                                         left="l" in flags, kicked="k" in flags)
+
+async def replay_overwatch_recording(
+    path: str,
+    scammer_ids: Set[str],
+    scammer_map: Dict[str, Dict[str, Any]],
+    *,
+    speed: float = 0.0,
+    report_mode: int = 1,
+    rpc_latency: float = 0.0,
+    quiet: bool = True,
+) -> Dict[str, Any]:
+    """
+    Feeds a recording made with `overwatch --record` back through the Overwatch handlers
+    against a FakeTelegramClient. speed=10 plays 10x faster than recorded; 0 = no pacing.
+    Dedupe windows and delayed join checks use real time, so use speed=1 when testing those.
+    """
+    records = list(read_update_recording(path))
+    header = records[0] if records and isinstance(records[0], dict) else {}
+    started_at = float(header.get("started_at") or time.time())
+
+    client = FakeTelegramClient(rpc_latency=rpc_latency)
+    timed = list(_replay_events_from_recording(client, records, started_at))
+    result = await _drive_overwatch(client, scammer_ids, scammer_map, report_mode, iter(timed),
+                                    speed=speed, quiet=quiet)
+    result["recording"] = path
+    result["recorded_seconds"] = timed[-1][0] if timed else 0.0
+    result["chats"] = len(client.chats)
+    return result
+
+def _print_bench_results(results: Dict[str, Any]):
+    print(f"📊 ScamScan benchmark (v{results['version']}, Python {results['python']})")
+    lo = results.get("loader")
+    if lo:
+        print(f"  loader    : {lo['scammers']} entries, {lo['payload_bytes'] / 1e6:.1f} MB payload, "
+              f"best {lo['seconds_best'] * 1000:.0f}ms, median {lo['seconds_median'] * 1000:.0f}ms, "
+              f"{lo['entries_per_sec']:.0f} entries/s, peak alloc {lo['peak_alloc_mb']:.1f} MB")
+    rf = results.get("refresh")
+    if rf:
+        print(f"  refresh   : worst loop stall {rf['thread_max_loop_lag_ms']:.1f}ms in a thread "
+              f"({rf['thread_seconds'] * 1000:.0f}ms), {rf['subprocess_max_loop_lag_ms']:.1f}ms in a worker process "
+              f"({rf['subprocess_seconds'] * 1000:.0f}ms)")
+    sc = results.get("scan")
+    if sc:
+        print(f"  scan      : {sc['chats']} chats / {sc['participants']} participants in {sc['seconds']:.2f}s, "
+              f"{sc['participants_per_sec']:.0f} participants/s, {sc['hits']} hits, {sc['rpcs']} RPCs")
+    ow = results.get("overwatch")
+    if ow:
+        print(f"  overwatch : {ow['events']} events in {ow['seconds']:.2f}s, {ow['events_per_sec']:.0f} ev/s, "
+              f"event p50 ≤{ow['event_p50_ms']:g}ms, p99 ≤{ow['event_p99_ms']:g}ms "
+              f"(queue wait p99 ≤{ow['queue_wait_p99_ms']:g}ms, dispatch max {ow['dispatch_max_ms']:.1f}ms), "
+              f"{ow['rpcs_per_event']:.3f} RPCs/event")
+    if ow or sc:
+        rss = (ow or sc).get("max_rss_mb")
+        if rss is not None:
+            print(f"  max RSS   : {rss:.0f} MB")
+
+async def _cli_run(args) -> int:
+    results = await run_benchmarks(args)
+    if args.format == "json":
+        print(json.dumps(results, indent=2), file=sys.__stdout__)
+    else:
+        _print_bench_results(results)
+    return EXIT_OK
+
+async def _cli_replay(args) -> int:
+    if not os.path.exists(args.recording):
+        print(f"❌ Recording not found: {args.recording}")
+        return EXIT_ERROR
+    if args.list_file:
+        scammer_map, scammer_ids = load_scammer_data_v2_from_file(args.list_file)
+    else:
+        scammer_map, scammer_ids = load_scammer_data_v2()
+    if not scammer_ids:
+        print("⚠️ No scammer data loaded.")
+        return EXIT_NO_SCAMMER_DATA
+
+    result = await replay_overwatch_recording(
+        args.recording, scammer_ids, scammer_map,
+        speed=args.speed, report_mode=args.report_mode,
+        rpc_latency=args.rpc_latency_ms / 1000.0, quiet=not args.verbose,
+    )
+    if args.format == "json":
+        print(json.dumps(result, indent=2), file=sys.__stdout__)
+    else:
+        print(f"🎞️ Replayed {result['events']} event(s) from {result['chats']} chat(s) "
+              f"({result['recorded_seconds']:.0f}s recorded) in {result['seconds']:.2f}s: "
+              f"{result['events_per_sec'] or 0:.0f} ev/s, event p50 ≤{result['event_p50_ms']:g}ms, "
+              f"p99 ≤{result['event_p99_ms']:g}ms (queue wait p99 ≤{result['queue_wait_p99_ms']:g}ms), "
+              f"{result['rpcs_per_event']:.3f} RPCs/event, {result['messages_sent']} message(s) sent")
+    return EXIT_OK
+
+# --- Main ---
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bench.py", description="ScamScan offline benchmarks and replay")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_replay = sub.add_parser("replay", help="replay an `overwatch --record` log offline through the Overwatch handlers")
+    p_replay.add_argument("recording", help="file written by overwatch --record")
+    p_replay.add_argument("--speed", type=float, default=0.0,
+                          help="playback speed multiplier; 0 = as fast as possible (default: %(default)s)")
+    p_replay.add_argument("--report-mode", type=int, choices=(1, 2, 3), default=1)
+    p_replay.add_argument("--list-file", metavar="PATH",
+                          help="saved v2 payload (.json/.json.gz) instead of fetching the live list")
+    p_replay.add_argument("--rpc-latency-ms", type=float, default=0.0,
+                          help="artificial latency per fake API call (default: %(default)s)")
+    p_replay.add_argument("--verbose", action="store_true", help="show handler output")
+    p_replay.add_argument("--format", choices=("text", "json"), default="text")
+
+    p_bench = sub.add_parser("run", help="offline benchmarks against a fake Telegram client")
+    p_bench.add_argument("--only", default=None,
+                         help="comma-separated subset of: overwatch,scan,loader,refresh (default: all)")
+    p_bench.add_argument("--events", type=int, default=20_000, help="Overwatch events to replay (default: %(default)s)")
+    p_bench.add_argument("--chats", type=int, default=50, help="synthetic chats (default: %(default)s)")
+    p_bench.add_argument("--participants", type=int, default=2_000, help="participants per chat (default: %(default)s)")
+    p_bench.add_argument("--scammers", type=int, default=50_000, help="entries in the synthetic list (default: %(default)s)")
+    p_bench.add_argument("--hit-rate", type=float, default=0.01,
+                         help="fraction of events from listed scammers (default: %(default)s)")
+    p_bench.add_argument("--report-mode", type=int, choices=(1, 2, 3), default=1)
+    p_bench.add_argument("--rpc-latency-ms", type=float, default=0.0,
+                         help="artificial latency per fake API call (default: %(default)s)")
+    p_bench.add_argument("--concurrency", type=int, default=1, help="scan concurrency (default: %(default)s)")
+    p_bench.add_argument("--seed", type=int, default=1)
+    p_bench.add_argument("--format", choices=("text", "json"), default="text")
+
+    return parser
+
+async def cli_main(argv: List[str]) -> int:
+    args = build_arg_parser().parse_args(argv)
+    # json output: keep stdout clean for the results, send progress to stderr
+    redirect = contextlib.redirect_stdout(sys.stderr) if args.format == "json" else contextlib.nullcontext()
+    try:
+        with redirect:
+            if args.command == "run":
+                return await _cli_run(args)
+            if args.command == "replay":
+                return await _cli_replay(args)
+    finally:
+        await close_http_sessions()
+    return EXIT_USAGE
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(cli_main(sys.argv[1:])))
@@ -5,17 +5,40 @@ __version__ = "0.3.8"
 __force__ = False
 ## Version info. Force should force existing clients to exit.
 
+import argparse
 import asyncio
+import bisect
+import codecs
+import contextlib
+import csv
+import gzip
+import heapq
+import itertools
+import importlib.util
+import math
 import json
+import mmap
 import os
 import subprocess
 import sys
 import time
 import re
+import socket
+import sqlite3
+import struct
+import tempfile
+import threading
+import zlib
 from collections import defaultdict, deque
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs, urlencode
 from typing import List, Tuple, Optional, Dict, Set, Any
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks
+    fcntl = None
+
 # 📦 --- Package Installer Helper ---
 def ensure_packages():
     required_packages = ["telethon", "requests"]
@@ -42,15 +65,23 @@ ensure_packages()
 
 # Safe to import now
 import requests
+try:
+    import aiohttp  # optional: native asyncio HTTP; without it requests runs in a worker thread
+except ImportError:
+    aiohttp = None
 from telethon import TelegramClient, events
 from telethon.tl.types import Channel, Chat, MessageActionChatAddUser, MessageActionChatJoinedByLink, ChannelParticipantsRecent
 from telethon.tl import functions
-from telethon.errors.rpcerrorlist import FloodWaitError, UsernameNotOccupiedError, UsernameInvalidError, UserIdInvalidError, UserPrivacyRestrictedError
+from telethon.tl.types import (ChannelAdminLogEventsFilter, ChannelAdminLogEventActionParticipantJoin, ChannelAdminLogEventActionParticipantJoinByInvite,
+                               ChannelAdminLogEventActionParticipantJoinByRequest, ChannelAdminLogEventActionParticipantLeave,
+                               ChannelAdminLogEventActionParticipantInvite, ChannelAdminLogEventActionParticipantToggleBan,
+                               ChannelParticipantLeft, ChannelParticipantBanned)
+from telethon.errors.rpcerrorlist import FloodWaitError, UsernameNotOccupiedError, UsernameInvalidError, UserIdInvalidError, UserPrivacyRestrictedError, UserNotParticipantError
 
 # --- Config ---
 CONFIG_FILE = 'config.json'
 SESSION_NAME = 'userbot_session'
-SCAMMER_API_V2 = 'https://countersign.chat/api/scammer_ids_v2.json'
+SCAMMER_API_V2 = os.environ.get("SCAMSCAN_LIST_URL") or 'https://countersign.chat/api/scammer_ids_v2.json'
 SCAMMER_TOPIC_BASE = "https://t.me/scamtrackinglist"
 
 GITHUB_OWNER = "yumi-kitsune"
@@ -59,6 +90,17 @@ GITHUB_SCRIPT_PATH = "scan.py"
 GITHUB_RAW_URL = f"https://raw.githubusercontent.com/{GITHUB_OWNER}/{GITHUB_REPO}/main/{GITHUB_SCRIPT_PATH}"
 UPDATE_CHECK_SECONDS = 2 * 60 * 60  # 2 hours
 
+# --- Exit codes (headless CLI) ---
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2              # argparse also uses 2
+EXIT_FORCED_UPDATE = 3      # upstream __force__ (see check_for_update_once)
+EXIT_NO_SCAMMER_DATA = 4
+EXIT_NOT_CONFIGURED = 5     # no API credentials available without prompting
+EXIT_NOT_AUTHORIZED = 6     # session needs an interactive login
+EXIT_SCAMMERS_FOUND = 10    # scan finished and found at least one scammer
+EXIT_INTERRUPTED = 130
+
 # --- API Key Setup ---
 def setup_api_credentials():
     if os.path.exists(CONFIG_FILE):
@@ -98,6 +140,45 @@ def setup_api_credentials():
     return api_id, api_hash
 
 
+def load_api_credentials_noninteractive() -> Optional[Tuple[str, str]]:
+    """
+    Headless credential lookup: SCAMSCAN_API_ID / SCAMSCAN_API_HASH env vars, then config.json.
+    Never prompts. Returns None if nothing valid is available.
+    """
+    api_id = os.environ.get("SCAMSCAN_API_ID", "").strip()
+    api_hash = os.environ.get("SCAMSCAN_API_HASH", "").strip()
+    if not (api_id and api_hash) and os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                config = json.load(f)
+            api_id = str(config.get('api_id', '')).strip()
+            api_hash = str(config.get('api_hash', '')).strip()
+        except Exception as e:
+            print(f"❌ Could not read {CONFIG_FILE}: {e}")
+            return None
+
+    if not (api_id and api_hash):
+        return None
+    if _validate_api_id(api_id) or _validate_api_hash(api_hash):
+        return None
+    return api_id, api_hash
+
+async def start_client(client: TelegramClient, interactive: bool = True) -> bool:
+    """
+    interactive=True  -> client.start() (may prompt for phone/code on first login)
+    interactive=False -> connect only; returns False if the session isn't already authorized
+    """
+    if interactive:
+        await client.start()
+        return True
+
+    await client.connect()
+    if not await client.is_user_authorized():
+        print("❌ Telegram session is not authorized. Run `python3 scan.py` once interactively to log in.")
+        return False
+    return True
+
+
 def _validate_api_id(api_id):
     """
     Returns:
@@ -131,7 +212,96 @@ def _validate_api_hash(api_hash):
         print("API Hash could not be parsed")
         return 1
 
+# --- HTTP (one pooled session per process) ---
+HTTP_USER_AGENT = f"ScamScan/{__version__}"
+
+_HTTP_SESSION: Optional[requests.Session] = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+def http_accept_encoding() -> str:
+    """gzip/deflate always; br and zstd when urllib3 can decode them (brotli / zstandard installed)."""
+    try:
+        from urllib3.util.request import ACCEPT_ENCODING
+        return ACCEPT_ENCODING
+    except Exception:
+        return "gzip, deflate"
+
+def http_session() -> requests.Session:
+    """
+    Keep-alive session shared by every fetch in this process (list, update check), so
+    hourly refreshes reuse the TLS connection instead of handshaking each time.
+    Response bodies are decompressed transparently by urllib3.
+    """
+    global _HTTP_SESSION
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None:
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": HTTP_USER_AGENT, "Accept-Encoding": http_accept_encoding()})
+            _HTTP_SESSION = session
+        return _HTTP_SESSION
+
+_AIOHTTP_SESSION = None
+_AIOHTTP_SESSION_LOOP = None  # the event loop _AIOHTTP_SESSION was created on
+_AIOHTTP_SESSION_LOCK: Optional[asyncio.Lock] = None  # guards creating / swapping _AIOHTTP_SESSION
+_AIOHTTP_SESSION_LOCK_LOOP = None
+
+def _aiohttp_session_lock() -> asyncio.Lock:
+    """The session lock for the running loop (an asyncio.Lock can't be shared across loops)."""
+    global _AIOHTTP_SESSION_LOCK, _AIOHTTP_SESSION_LOCK_LOOP
+    loop = asyncio.get_running_loop()
+    if _AIOHTTP_SESSION_LOCK is None or _AIOHTTP_SESSION_LOCK_LOOP is not loop:
+        _AIOHTTP_SESSION_LOCK, _AIOHTTP_SESSION_LOCK_LOOP = asyncio.Lock(), loop
+    return _AIOHTTP_SESSION_LOCK
+
+def _aiohttp_session_current(loop) -> bool:
+    return _AIOHTTP_SESSION is not None and not _AIOHTTP_SESSION.closed and _AIOHTTP_SESSION_LOOP is loop
+
+async def aiohttp_session():
+    """
+    Shared aiohttp session (one connection pool) for the running event loop, or None
+    if aiohttp isn't installed. aiohttp negotiates and decodes gzip/deflate (and br/zstd
+    when their packages are installed) itself.
+    A session left over from another event loop is closed before a new one is made; both
+    happen under a lock, so callers racing past the fast path still end up sharing one session.
+    """
+    global _AIOHTTP_SESSION, _AIOHTTP_SESSION_LOOP
+    if aiohttp is None:
+        return None
+    loop = asyncio.get_running_loop()
+    if _aiohttp_session_current(loop):
+        return _AIOHTTP_SESSION
+    async with _aiohttp_session_lock():
+        if _aiohttp_session_current(loop):  # another caller made it while we waited
+            return _AIOHTTP_SESSION
+        await _close_aiohttp_session()
+        _AIOHTTP_SESSION = aiohttp.ClientSession(
+            headers={"User-Agent": HTTP_USER_AGENT},
+            connector=aiohttp.TCPConnector(limit=8),
+        )
+        _AIOHTTP_SESSION_LOOP = loop
+        return _AIOHTTP_SESSION
+
+async def _close_aiohttp_session():
+    global _AIOHTTP_SESSION, _AIOHTTP_SESSION_LOOP
+    session, _AIOHTTP_SESSION, _AIOHTTP_SESSION_LOOP = _AIOHTTP_SESSION, None, None
+    if session is not None and not session.closed:
+        try:
+            await session.close()
+        except Exception:
+            pass  # its loop is gone, and its connections with it
+
+async def close_http_sessions():
+    async with _aiohttp_session_lock():
+        await _close_aiohttp_session()
+
 # --- Unified scammer data loader (v2) ---
+# Last good result per URL + its HTTP validators, so an unchanged list costs one 304.
+_V2_LAST: Dict[str, Tuple[Dict[str, str], Dict[str, Dict[str, Any]], Set[str]]] = {}
+
 def load_scammer_data_v2(api_url: str = SCAMMER_API_V2) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
     """
     Returns:
@@ -139,34 +309,895 @@ def load_scammer_data_v2(api_url: str = SCAMMER_API_V2) -> Tuple[Dict[str, Dict[
       scammer_ids: set of user_id strings
     """
     print("🌐 Fetching unified scammer list (v2) ...")
+    cached = _V2_LAST.get(api_url)
+    scammer_map: Dict[str, Dict[str, Any]] = {}
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        payload = response.json()
-        if not isinstance(payload, dict) or "data" not in payload or not isinstance(payload.get("data"), dict):
-            print("⚠️ API response format issue: expected { data: {...} }")
-            return {}, set()
+        meta, validators = stream_scammer_data_v2(
+            api_url, lambda k, v: _add_v2_entry(scammer_map, k, v),
+            validators=cached[0] if cached else None,
+        )
+    except Exception as e:
+        print(f"❌ Error fetching scammer list (v2): {e}")
+        return {}, set()
+    return _finish_v2_load(api_url, cached, scammer_map, meta, validators)
 
-        data = payload["data"]
-        scammer_map: Dict[str, Dict[str, Any]] = {}
-        for k, v in data.items():
-            if not isinstance(v, dict):
-                continue
-            scammer_map[str(k)] = v
+async def load_scammer_data_v2_async(api_url: str = SCAMMER_API_V2) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    load_scammer_data_v2 on the event loop via aiohttp: chunks are parsed as they
+    arrive (a few ms each), so no worker thread is needed. Without aiohttp, falls back
+    to load_scammer_data_v2 in a thread.
+    """
+    if aiohttp is None:
+        return await asyncio.to_thread(load_scammer_data_v2, api_url)
+
+    print("🌐 Fetching unified scammer list (v2) ...")
+    cached = _V2_LAST.get(api_url)
+    scammer_map: Dict[str, Dict[str, Any]] = {}
+    scammer_ids: Set[str] = set()  # built as we go: one set() over the finished map stalls the loop
+    try:
+        meta, validators = await stream_scammer_data_v2_async(
+            api_url, lambda k, v: _add_v2_entry(scammer_map, k, v, scammer_ids),
+            validators=cached[0] if cached else None,
+        )
+    except Exception as e:
+        print(f"❌ Error fetching scammer list (v2): {e!r}")
+        return {}, set()
+    return _finish_v2_load(api_url, cached, scammer_map, meta, validators, scammer_ids)
+
+def _finish_v2_load(api_url: str, cached, scammer_map, meta, validators, scammer_ids: Optional[Set[str]] = None):
+    if meta is None:
+        print(f"✅ Scammer list unchanged (HTTP 304); keeping {len(cached[2])} scammers.\n")
+        return cached[1], cached[2]
 
+    if scammer_ids is None:
         scammer_ids = set(scammer_map.keys())
-        count = payload.get("count", len(scammer_ids))
-        generated_at = payload.get("generated_at", None)
-        if generated_at is not None:
-            print(f"✅ Loaded {count} scammers (generated_at={generated_at}).\n")
-        else:
-            print(f"✅ Loaded {count} scammers.\n")
+    if validators:
+        _V2_LAST[api_url] = (validators, scammer_map, scammer_ids)
+    else:
+        _V2_LAST.pop(api_url, None)
+    _print_scammers_loaded(meta.get("count", len(scammer_ids)), meta.get("generated_at"))
+    return scammer_map, scammer_ids
+
+def _add_v2_entry(scammer_map: Dict[str, Dict[str, Any]], k, v, scammer_ids: Optional[Set[str]] = None):
+    if isinstance(v, dict):
+        uid = str(k)
+        # Entries decoded one at a time don't share key strings the way one big json.loads does
+        scammer_map[uid] = {sys.intern(f): x for f, x in v.items()}
+        if scammer_ids is not None:
+            scammer_ids.add(uid)
+
+def _print_scammers_loaded(count, generated_at):
+    if generated_at is not None:
+        print(f"✅ Loaded {count} scammers (generated_at={generated_at}).\n")
+    else:
+        print(f"✅ Loaded {count} scammers.\n")
+
+def scammer_data_from_v2_payload(payload: Any) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    Validates a decoded v2 payload ({ data: {...}, count, generated_at }) and indexes it.
+    Same return shape as load_scammer_data_v2.
+    """
+    if not isinstance(payload, dict) or "data" not in payload or not isinstance(payload.get("data"), dict):
+        print("⚠️ API response format issue: expected { data: {...} }")
+        return {}, set()
 
-        return scammer_map, scammer_ids
+    scammer_map: Dict[str, Dict[str, Any]] = {}
+    for k, v in payload["data"].items():
+        _add_v2_entry(scammer_map, k, v)
+
+    scammer_ids = set(scammer_map.keys())
+    _print_scammers_loaded(payload.get("count", len(scammer_ids)), payload.get("generated_at", None))
+    return scammer_map, scammer_ids
+
+def load_scammer_data_v2_from_file(path: str) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    Offline variant of load_scammer_data_v2: reads a saved v2 payload (.json, .json.gz or .json.zst).
+    """
+    scammer_map: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, "rb") as f:
+            meta = parse_v2_chunks(
+                iter(lambda: f.read(V2_STREAM_CHUNK_BYTES), b""),
+                lambda k, v: _add_v2_entry(scammer_map, k, v),
+            )
     except Exception as e:
-        print(f"❌ Error fetching scammer list (v2): {e}")
+        print(f"❌ Error reading scammer list file {path}: {e}")
         return {}, set()
 
+    scammer_ids = set(scammer_map.keys())
+    _print_scammers_loaded(meta.get("count", len(scammer_ids)), meta.get("generated_at"))
+    return scammer_map, scammer_ids
+
+# --- Streaming v2 decode ---
+V2_STREAM_CHUNK_BYTES = 64 * 1024
+
+class StreamingV2Parser:
+    """
+    Incremental decoder for the v2 payload: { "data": { "<user_id>": {...}, ... }, "count": n, "generated_at": t }.
+
+    feed() text as it arrives; each `data` entry is handed to on_entry(user_id, value) as soon
+    as it is complete and its text is dropped, so neither the whole body nor the whole decoded
+    tree is held at once. Entries themselves are small and go through json's raw_decode.
+    Other top-level keys end up in .meta. close() raises ValueError if the payload was
+    truncated or has no `data` object.
+    """
+
+    _WS = re.compile(r"[ \t\n\r]*")
+    _ENTRY_KEY = re.compile(r'[ \t\n\r]*"((?:[^"\\]|\\.)*)"[ \t\n\r]*:[ \t\n\r]*')
+    _ENTRY_END = re.compile(r"[ \t\n\r]*([,}])")
+    _NEED_MORE = object()
+    _NUMBER_DELIMITERS = frozenset(" \t\n\r,}]")
+
+    def __init__(self, on_entry):
+        self._on_entry = on_entry
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._eof = False
+        self.meta: Dict[str, Any] = {}
+        self.saw_data = False
+        self.entries = 0
+
+    def feed(self, text: str):
+        self._buf = self._buf + text if self._buf else text
+        self._run()
+
+    def close(self):
+        self._eof = True
+        self._run()
+        if self._state != "done":
+            raise ValueError("truncated v2 payload")
+        if not self.saw_data:
+            raise ValueError("API response format issue: expected { data: {...} }")
+
+    def _value(self, pos: int):
+        try:
+            value, end = self._decoder.raw_decode(self._buf, pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise
+            return self._NEED_MORE, pos
+        # "12" / "12." / "1e" at the end of the buffer may be the start of "1234" / "12.5" / "1e9":
+        # a number is only complete once a delimiter follows it
+        if (not self._eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                and (end == len(self._buf) or self._buf[end] not in self._NUMBER_DELIMITERS)):
+            return self._NEED_MORE, pos
+        return value, end
+
+    def _expect(self, ch: str, *allowed: str):
+        if ch not in allowed:
+            raise ValueError(f"unexpected {ch!r} in v2 payload (state {self._state})")
+
+    def _entries_fast(self, buf: str, pos: int) -> int:
+        """
+        Tight loop over complete `"key": value,` entries of the data object (the bulk of
+        the payload). Stops at the first entry that isn't complete yet (or looks odd) and
+        leaves it to the general state machine in _run.
+        """
+        decode = self._decoder.raw_decode
+        key_match = self._ENTRY_KEY.match
+        end_match = self._ENTRY_END.match
+        on_entry = self._on_entry
+        while True:
+            m = key_match(buf, pos)
+            if m is None:
+                return pos
+            try:
+                value, end = decode(buf, m.end())
+            except json.JSONDecodeError:
+                return pos
+            sep = end_match(buf, end)
+            if sep is None:
+                return pos
+            key = m.group(1)
+            if "\\" in key:
+                key = json.loads(f'"{key}"')
+            self.entries += 1
+            on_entry(key, value)
+            pos = sep.end()
+            if sep.group(1) == "}":
+                self._state = "top_sep"
+                return pos
+
+    def _run(self):
+        buf = self._buf
+        pos = 0
+        while True:
+            pos = self._WS.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            ch = buf[pos]
+            state = self._state
+
+            if state == "start":
+                self._expect(ch, "{")
+                self._state, pos = "top_key", pos + 1
+            elif state in ("top_key", "data_key"):
+                if state == "data_key" and ch == '"':
+                    new_pos = self._entries_fast(buf, pos)
+                    if new_pos != pos:
+                        pos = new_pos
+                        continue
+                if ch == "}":
+                    self._state, pos = ("done" if state == "top_key" else "top_sep"), pos + 1
+                    continue
+                self._expect(ch, '"')
+                key, pos = self._value(pos)
+                if key is self._NEED_MORE:
+                    break
+                self._key = key
+                self._state = "top_colon" if state == "top_key" else "data_colon"
+            elif state in ("top_colon", "data_colon"):
+                self._expect(ch, ":")
+                pos += 1
+                if state == "data_colon":
+                    self._state = "data_value"
+                elif self._key == "data":
+                    self._state = "data_open"
+                else:
+                    self._state = "top_value"
+            elif state == "data_open":
+                if ch == "{":
+                    self.saw_data = True
+                    self._state, pos = "data_key", pos + 1
+                else:
+                    self._state = "top_value"  # not an object: kept in meta, close() rejects it
+            elif state in ("top_value", "data_value"):
+                value, pos = self._value(pos)
+                if value is self._NEED_MORE:
+                    break
+                if state == "data_value":
+                    self.entries += 1
+                    self._on_entry(self._key, value)
+                    self._state = "data_sep"
+                else:
+                    self.meta[self._key] = value
+                    self._state = "top_sep"
+            elif state in ("top_sep", "data_sep"):
+                self._expect(ch, ",", "}")
+                pos += 1
+                if ch == ",":
+                    self._state = "top_key" if state == "top_sep" else "data_key"
+                else:
+                    self._state = "done" if state == "top_sep" else "top_sep"
+            else:  # done
+                raise ValueError("trailing data after v2 payload")
+        self._buf = buf[pos:]
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def _zstd_decompressobj():
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdDecompressor()
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd-compressed list snapshot needs the 'zstandard' package (pip install zstandard)")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+class _BrotliDecompressObj:
+    def __init__(self):
+        import brotli
+        self._d = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._d.process(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+def _feeder_accept_encoding() -> str:
+    """Accept-Encoding for list downloads that _V2ChunkFeeder decodes itself (see _content_decompressobj)."""
+    codings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") is not None:
+        codings.append("br")
+    try:
+        _zstd_decompressobj()
+        codings.append("zstd")
+    except ValueError:
+        pass
+    return ", ".join(codings)
+
+def _content_decompressobj(encoding: str, first: bytes):
+    """Decompressor for an HTTP Content-Encoding; first is the first body chunk."""
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    if encoding == "deflate":  # zlib-wrapped as the RFC says, or raw as some servers send it
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS if first[:1] and first[0] & 0x0F == 8 else -zlib.MAX_WBITS)
+    if encoding == "br":
+        return _BrotliDecompressObj()
+    if encoding == "zstd":
+        return _zstd_decompressobj()
+    raise ValueError(f"unsupported Content-Encoding: {encoding}")
+
+class _V2ChunkFeeder:
+    """
+    Byte chunks in, StreamingV2Parser entries out. Plain JSON passes straight through; a
+    compressed snapshot (.json.gz / .json.zst, recognised by its magic bytes rather than
+    Content-Encoding) is decompressed chunk by chunk.
+    content_encoding: the response's Content-Encoding when the HTTP client left the body
+    encoded; it is undone first, so the caller can count the bytes received.
+    """
+
+    def __init__(self, on_entry, content_encoding: Optional[str] = None):
+        self._parser = StreamingV2Parser(on_entry)
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._decomp = None
+        self._started = False
+        self._content_encoding = (content_encoding or "identity").strip().lower()
+        self._content_decomp = None
+
+    def feed(self, chunk: bytes):
+        if self._content_encoding != "identity" and chunk:
+            if self._content_decomp is None:
+                self._content_decomp = _content_decompressobj(self._content_encoding, chunk)
+            chunk = self._content_decomp.decompress(chunk)
+        self._feed_body(chunk)
+
+    def _feed_body(self, chunk: bytes):
+        if not chunk:
+            return
+        if not self._started:
+            self._started = True
+            if chunk.startswith(_GZIP_MAGIC):
+                self._decomp = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            elif chunk.startswith(_ZSTD_MAGIC):
+                self._decomp = _zstd_decompressobj()
+        if self._decomp is not None:
+            chunk = self._decomp.decompress(chunk)
+        self._parser.feed(self._text.decode(chunk))
+
+    def close(self) -> Dict[str, Any]:
+        if self._content_decomp is not None:
+            self._feed_body(self._content_decomp.flush())
+        tail = self._decomp.flush() if self._decomp is not None and hasattr(self._decomp, "flush") else b""
+        self._parser.feed(self._text.decode(tail, final=True))
+        self._parser.close()
+        return self._parser.meta
+
+def parse_v2_chunks(chunks, on_entry) -> Dict[str, Any]:
+    """Feeds raw byte chunks (plain or compressed snapshot) through StreamingV2Parser; returns .meta."""
+    feeder = _V2ChunkFeeder(on_entry)
+    for chunk in chunks:
+        feeder.feed(chunk)
+    return feeder.close()
+
+def stream_scammer_data_v2(
+    api_url: str,
+    on_entry,
+    validators: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """
+    Downloads the v2 payload over the pooled session and parses it as it arrives.
+    validators: {"etag": ..., "last_modified": ...} from an earlier response; sent as a
+    conditional request.
+    Returns (meta, validators): meta is the top-level metadata (count, generated_at, ...),
+    or None if the server answered 304 Not Modified (on_entry was never called).
+    Raises on HTTP/format errors.
+    """
+    headers = {"Accept-Encoding": _feeder_accept_encoding(), **_conditional_headers(validators)}
+    with http_session().get(api_url, timeout=30, stream=True, headers=headers) as response:
+        if response.status_code == 304 and validators:
+            METRICS.inc("scamscan_list_fetch_total", result="not_modified")
+            return None, validators
+        response.raise_for_status()
+        # the raw, still encoded body: the feeder decodes it, and we count the bytes received
+        # (raw.tell() stays 0 on chunked responses)
+        encoding = response.headers.get("Content-Encoding") or "identity"
+        feeder = _V2ChunkFeeder(on_entry, encoding)
+        wire_bytes = 0
+        for chunk in response.raw.stream(V2_STREAM_CHUNK_BYTES, decode_content=False):
+            wire_bytes += len(chunk)
+            feeder.feed(chunk)
+        meta = feeder.close()
+        new_validators = {
+            k: v for k, v in (
+                ("etag", response.headers.get("ETag")),
+                ("last_modified", response.headers.get("Last-Modified")),
+            ) if v
+        }
+    METRICS.inc("scamscan_list_fetch_total", result="ok")
+    METRICS.inc("scamscan_list_fetch_bytes_total", wire_bytes, encoding=encoding)
+    return meta, new_validators
+
+def _conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+async def stream_scammer_data_v2_async(
+    api_url: str,
+    on_entry,
+    validators: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """aiohttp counterpart of stream_scammer_data_v2 (same arguments and return value)."""
+    session = await aiohttp_session()
+    timeout = aiohttp.ClientTimeout(total=60, sock_read=30)
+    headers = {"Accept-Encoding": _feeder_accept_encoding(), **_conditional_headers(validators)}
+    # auto_decompress off: the feeder decodes, so what we count are the bytes received, as with requests
+    async with session.get(api_url, headers=headers, timeout=timeout, auto_decompress=False) as response:
+        if response.status == 304 and validators:
+            METRICS.inc("scamscan_list_fetch_total", result="not_modified")
+            return None, validators
+        response.raise_for_status()
+        encoding = response.headers.get("Content-Encoding") or "identity"
+        feeder = _V2ChunkFeeder(on_entry, encoding)
+        wire_bytes = 0
+        async for chunk in response.content.iter_chunked(V2_STREAM_CHUNK_BYTES):
+            wire_bytes += len(chunk)
+            feeder.feed(chunk)
+        meta = feeder.close()
+        new_validators = {
+            k: v for k, v in (
+                ("etag", response.headers.get("ETag")),
+                ("last_modified", response.headers.get("Last-Modified")),
+            ) if v
+        }
+    METRICS.inc("scamscan_list_fetch_total", result="ok")
+    METRICS.inc("scamscan_list_fetch_bytes_total", wire_bytes, encoding=encoding)
+    return meta, new_validators
+
+# --- Compact scammer index (mmap-able file) ---
+# Layout (little-endian):
+#   header   : magic(8) count(u64) blob_offset(u64) generated_at(i64, 0 = unknown)
+#   uids     : count x i64, sorted ascending
+#   offsets  : (count + 1) x u64, record start/end relative to blob_offset
+#   blob     : records: topic_id(i64) message_id(i64) then username, full_name, reason
+#              as u32 length + UTF-8 bytes each. INDEX_NONE encodes a missing integer.
+INDEX_MAGIC = b"SSIDX001"
+INDEX_HEADER = struct.Struct("<8sQQq")
+INDEX_RECORD_INTS = struct.Struct("<qq")
+INDEX_STR_LEN = struct.Struct("<I")
+INDEX_NONE = -(2 ** 63)
+
+def _index_int(v) -> int:
+    try:
+        return int(v)
+    except Exception:
+        return INDEX_NONE
+
+def _index_str(v) -> bytes:
+    return b"" if v is None else str(v).encode("utf-8")
+
+class CompactIndexBuilder:
+    """
+    Packs v2 entries into index records as they arrive, so a streamed payload never
+    exists as a dict of dicts. Use add() as a StreamingV2Parser callback.
+    Entries whose key isn't an integer user id (or whose value isn't a dict) are skipped;
+    for a repeated id the last entry wins, as with json.loads.
+    """
+
+    def __init__(self):
+        self._rows: List[Tuple[int, bytes]] = []
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> "CompactIndexBuilder":
+        builder = cls()
+        for k, v in data.items():
+            builder.add(k, v)
+        return builder
+
+    def add(self, k, v):
+        if not isinstance(v, dict):
+            return
+        try:
+            uid = int(k)
+        except (TypeError, ValueError):
+            return
+        rec = bytearray(INDEX_RECORD_INTS.pack(_index_int(v.get("topic_id")), _index_int(v.get("message_id"))))
+        for field in ("username", "full_name", "reason"):
+            b = _index_str(v.get(field))
+            rec += INDEX_STR_LEN.pack(len(b))
+            rec += b
+        self._rows.append((uid, bytes(rec)))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def to_bytes(self, generated_at: Optional[int] = None) -> bytes:
+        self._rows.sort(key=lambda r: r[0])  # stable: duplicates stay in arrival order
+        uids: List[int] = []
+        recs: List[bytes] = []
+        for uid, rec in self._rows:
+            if uids and uids[-1] == uid:
+                recs[-1] = rec
+            else:
+                uids.append(uid)
+                recs.append(rec)
+
+        offsets = [0]
+        for rec in recs:
+            offsets.append(offsets[-1] + len(rec))
+        count = len(uids)
+        blob_offset = INDEX_HEADER.size + 8 * count + 8 * (count + 1)
+        return b"".join((
+            INDEX_HEADER.pack(INDEX_MAGIC, count, blob_offset, int(generated_at or 0)),
+            struct.pack(f"<{count}q", *uids),
+            struct.pack(f"<{count + 1}Q", *offsets),
+            *recs,
+        ))
+
+def build_compact_index_bytes(data: Dict[str, Any], generated_at: Optional[int] = None) -> bytes:
+    """Serializes v2 `data` ({ "<user_id>": {...}, ... }) into the compact index layout."""
+    return CompactIndexBuilder.from_data(data).to_bytes(generated_at)
+
+def write_compact_index_file(path: str, data, generated_at: Optional[int] = None) -> int:
+    """
+    Writes the index to path via a temp file + atomic rename. Returns the entry count.
+    data: v2 `data` dict, or a filled CompactIndexBuilder.
+    """
+    builder = data if isinstance(data, CompactIndexBuilder) else CompactIndexBuilder.from_data(data)
+    payload = builder.to_bytes(generated_at)
+    _write_file_atomic(path, payload)
+    return INDEX_HEADER.unpack_from(payload, 0)[1]
+
+def _write_file_atomic(path: str, payload: bytes):
+    """Temp file in the same directory + fsync + os.replace: readers see the old or the new file, never half."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".scamscan_index_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; other users' processes may map the shared index
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+class CompactScammerIndex:
+    """
+    Read-only view over a compact index (bytes or an mmap'd file), usable wherever the
+    code expects scammer_map and/or scammer_ids:
+
+      uid_str in index            -> binary search over the sorted id array
+      index.get(uid_str, {})      -> record decoded on demand into the v2 dict shape
+      len(index), iter(index)     -> user id strings
+
+    Nothing is copied into Python objects up front, so opening is O(1) and the
+    pages live in the OS page cache (shared between processes mapping the same file).
+    """
+
+    def __init__(
+        self,
+        buf,
+        *,
+        path: Optional[str] = None,
+        mm: Optional[mmap.mmap] = None,
+        identity: Optional[Tuple[int, int]] = None,
+    ):
+        magic, count, blob_offset, generated_at = INDEX_HEADER.unpack_from(buf, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError("not a scamscan index (bad magic)")
+        self.path = path
+        self.identity = identity  # (st_dev, st_ino) of the file that was mapped
+        self.count = count
+        self.generated_at = generated_at or None
+        self._mm = mm
+        self._buf = memoryview(buf)
+        uid_start = INDEX_HEADER.size
+        off_start = uid_start + 8 * count
+        if sys.byteorder == "little":
+            self._uids = self._buf[uid_start:off_start].cast("q")
+            self._offsets = self._buf[off_start:blob_offset].cast("Q")
+        else:  # pragma: no cover - big-endian hosts get a private copy
+            import array
+            self._uids = array.array("q", bytes(self._buf[uid_start:off_start]))
+            self._uids.byteswap()
+            self._offsets = array.array("Q", bytes(self._buf[off_start:blob_offset]))
+            self._offsets.byteswap()
+        self._blob_offset = blob_offset
+
+    @classmethod
+    def open(cls, path: str) -> "CompactScammerIndex":
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, path=path, mm=mm, identity=(st.st_dev, st.st_ino))
+
+    def _position(self, uid) -> int:
+        try:
+            key = int(uid)
+        except (TypeError, ValueError):
+            return -1
+        i = bisect.bisect_left(self._uids, key)
+        if i < self.count and self._uids[i] == key:
+            return i
+        return -1
+
+    def _decode(self, i: int) -> Dict[str, Any]:
+        pos = self._blob_offset + self._offsets[i]
+        topic_id, message_id = INDEX_RECORD_INTS.unpack_from(self._buf, pos)
+        pos += INDEX_RECORD_INTS.size
+        strings = []
+        for _ in range(3):
+            (n,) = INDEX_STR_LEN.unpack_from(self._buf, pos)
+            pos += INDEX_STR_LEN.size
+            strings.append(bytes(self._buf[pos:pos + n]).decode("utf-8") if n else None)
+            pos += n
+        return {
+            "topic_id": None if topic_id == INDEX_NONE else topic_id,
+            "message_id": None if message_id == INDEX_NONE else message_id,
+            "username": strings[0],
+            "full_name": strings[1],
+            "reason": strings[2],
+        }
+
+    def __contains__(self, uid) -> bool:
+        return self._position(uid) >= 0
+
+    def get(self, uid, default=None):
+        i = self._position(uid)
+        return self._decode(i) if i >= 0 else default
+
+    def __getitem__(self, uid) -> Dict[str, Any]:
+        i = self._position(uid)
+        if i < 0:
+            raise KeyError(uid)
+        return self._decode(i)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def __iter__(self):
+        for uid in self._uids:
+            yield str(uid)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for i in range(self.count):
+            yield str(self._uids[i]), self._decode(i)
+
+def _build_index_file_from_v2_url(
+    api_url: str,
+    out_path: str,
+    validators: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """
+    Runs in a worker process: stream-decode the v2 payload straight into index records
+    and write the compact index. Returns (entry_count, generated_at, validators);
+    entry_count is None if the server said 304 Not Modified (out_path untouched).
+    Raises on any failure.
+    """
+    builder = CompactIndexBuilder()
+    meta, validators = stream_scammer_data_v2(api_url, builder.add, validators)
+    if meta is None:
+        return None, None, validators
+    generated_at = meta.get("generated_at")
+    gen_int = _index_int(generated_at)
+    count = write_compact_index_file(out_path, builder, None if gen_int == INDEX_NONE else gen_int)
+    return count, generated_at, validators
+
+_INDEX_POOL = None
+
+def _index_process_pool():
+    """Single long-lived worker process ("spawn", so no forked event loop / threads)."""
+    global _INDEX_POOL
+    if _INDEX_POOL is None:
+        import concurrent.futures
+        import multiprocessing
+        _INDEX_POOL = concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _INDEX_POOL
+
+def _discard_index_pool_if_broken(exc: BaseException):
+    """A crashed worker leaves the pool unusable; drop it so the next call spawns a fresh one."""
+    global _INDEX_POOL
+    import concurrent.futures.process
+    if isinstance(exc, concurrent.futures.process.BrokenProcessPool) and _INDEX_POOL is not None:
+        _INDEX_POOL.shutdown(wait=False)
+        _INDEX_POOL = None
+
+async def fetch_scammer_list(parse_in_subprocess: bool = False, index_file: Optional[str] = None):
+    """
+    Async front door for loading the list without blocking the event loop.
+    index_file: use the host-wide shared index at this path (see load_shared_scammer_index).
+    Returns (scammer_map, scammer_ids); both empty on failure.
+    """
+    if index_file:
+        index, ids = await load_shared_scammer_index(index_file, parse_in_subprocess=parse_in_subprocess)
+        if index is None:
+            return {}, set()
+        return index, ids
+    if parse_in_subprocess:
+        index, ids = await load_scammer_index_v2_in_subprocess()
+        if index is None:
+            return {}, set()
+        return index, ids
+    return await load_scammer_data_v2_async()
+
+async def load_scammer_index_v2_in_subprocess(
+    api_url: str = SCAMMER_API_V2,
+) -> Tuple[Optional[CompactScammerIndex], Optional[CompactScammerIndex]]:
+    """
+    Like load_scammer_data_v2, but the download, JSON decode and indexing all happen
+    in a worker process. This process only mmaps the finished index file, so the
+    event loop never runs the per-entry Python loop.
+    Returns (index, index) — the same object serves as scammer_map and scammer_ids —
+    or (None, None) on failure.
+    """
+    print("🌐 Fetching unified scammer list (v2) in a worker process ...")
+    fd, path = tempfile.mkstemp(prefix="scamscan_index_", suffix=".bin")
+    os.close(fd)
+    try:
+        loop = asyncio.get_running_loop()
+        count, generated_at, _ = await loop.run_in_executor(
+            _index_process_pool(), _build_index_file_from_v2_url, api_url, path,
+        )
+        index = CompactScammerIndex.open(path)
+    except Exception as e:
+        _discard_index_pool_if_broken(e)
+        print(f"❌ Error fetching scammer list (v2) in worker: {e!r}")
+        return None, None
+    finally:
+        # The mapping stays valid after unlink on POSIX; elsewhere the temp file is left behind.
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    if generated_at is not None:
+        print(f"✅ Loaded {count} scammers (generated_at={generated_at}).\n")
+    else:
+        print(f"✅ Loaded {count} scammers.\n")
+    return index, index
+
+# --- Shared scammer index (one file per host, many readers) ---
+SHARED_INDEX_FILE = "scammer_index.bin"
+SHARED_INDEX_MAX_AGE_SECONDS = 60 * 60   # same cadence as the Overwatch list refresh
+SHARED_INDEX_WATCH_SECONDS = 30          # how often readers stat() the file for a new version
+
+def index_file_identity(path: str) -> Optional[Tuple[int, int]]:
+    """
+    (st_dev, st_ino) of path, or None if it doesn't exist. Changes on every atomic replace: the
+    replaced file stays mapped by whoever compares against it, so its inode can't be reused yet.
+    Not the mtime, which a 304 refresh touches without changing the content.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+def index_file_age(path: str) -> Optional[float]:
+    try:
+        return max(0.0, time.time() - os.stat(path).st_mtime)
+    except OSError:
+        return None
+
+def refresh_shared_index_file(
+    path: str,
+    api_url: str = SCAMMER_API_V2,
+    max_age: float = SHARED_INDEX_MAX_AGE_SECONDS,
+) -> Tuple[bool, Optional[int], Optional[int]]:
+    """
+    Makes sure path holds an index no older than max_age, downloading only if needed.
+    Runs in a worker thread or process. A lock file (path + ".lock") keeps several
+    processes on the host from downloading at once: the ones that wait find a fresh
+    file when they get the lock and skip the download.
+    The response's ETag/Last-Modified are kept in path + ".etag"; if the server says the
+    list is unchanged, the index is just touched (marked fresh) instead of rebuilt.
+    Returns (downloaded, entry_count, generated_at); count/generated_at are None if skipped.
+    Raises on download/parse failure.
+    """
+    lock_f = open(path + ".lock", "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_f.fileno(), fcntl.LOCK_EX)
+        age = index_file_age(path)
+        if age is not None and age < max_age:
+            return False, None, None
+
+        validators = None
+        if age is not None:
+            try:
+                with open(path + ".etag", "r", encoding="utf-8") as f:
+                    validators = json.load(f)
+            except (OSError, ValueError):
+                validators = None
+        count, generated_at, validators = _build_index_file_from_v2_url(api_url, path, validators)
+        if count is None:
+            os.utime(path)
+            return False, None, None
+        try:
+            with open(path + ".etag", "w", encoding="utf-8") as f:
+                json.dump(validators, f)
+        except OSError:
+            pass
+        return True, count, generated_at
+    finally:
+        lock_f.close()  # releases the flock
+
+async def load_shared_scammer_index(
+    path: str = SHARED_INDEX_FILE,
+    *,
+    api_url: str = SCAMMER_API_V2,
+    max_age: float = SHARED_INDEX_MAX_AGE_SECONDS,
+    parse_in_subprocess: bool = False,
+) -> Tuple[Optional[CompactScammerIndex], Optional[CompactScammerIndex]]:
+    """
+    Opens the host-wide index at path (mmap, zero-copy), refreshing it first if it is
+    missing or older than max_age. Every scan/overwatch process pointed at the same path
+    maps the same file, so the list lives once in the page cache instead of once per process.
+    If the refresh fails, an existing (stale) file is still used.
+    Returns (index, index) or (None, None).
+    """
+    print(f"🌐 Scammer list: shared index {path} ...")
+    downloaded = False
+    try:
+        loop = asyncio.get_running_loop()
+        executor = _index_process_pool() if parse_in_subprocess else None
+        downloaded, count, generated_at = await loop.run_in_executor(
+            executor, refresh_shared_index_file, path, api_url, max_age,
+        )
+    except Exception as e:
+        _discard_index_pool_if_broken(e)
+        print(f"❌ Error refreshing shared index {path}: {e!r}")
+        if index_file_identity(path) is None:
+            return None, None
+        print("⚠️ Using the existing (stale) shared index.")
+    try:
+        index = CompactScammerIndex.open(path)
+    except Exception as e:
+        print(f"❌ Error opening shared index {path}: {e!r}")
+        return None, None
+
+    origin = "downloaded" if downloaded else f"reused, {index_file_age(path) or 0:.0f}s old"
+    if index.generated_at is not None:
+        print(f"✅ Loaded {len(index)} scammers (generated_at={index.generated_at}, {origin}).\n")
+    else:
+        print(f"✅ Loaded {len(index)} scammers ({origin}).\n")
+    return index, index
+
+# --- Local scammer list cache (fast Overwatch startup) ---
+SCAMMER_CACHE_FILE = "scammer_cache.bin"
+
+def save_scammer_cache(path: str, scammer_map) -> int:
+    """Writes the current list to path in the compact index format (atomic). Returns the entry count."""
+    if isinstance(scammer_map, CompactScammerIndex):
+        _write_file_atomic(path, bytes(scammer_map._buf))
+        return len(scammer_map)
+    return write_compact_index_file(path, scammer_map)
+
+def open_scammer_cache(path: str) -> Optional[CompactScammerIndex]:
+    """The last list saved by save_scammer_cache (mmap'd), or None if missing/unreadable/empty."""
+    if index_file_identity(path) is None:
+        return None
+    try:
+        index = CompactScammerIndex.open(path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable scammer cache {path}: {e}")
+        return None
+    return index if len(index) else None
+
+async def refresh_scammer_cache(path: Optional[str], scammer_map):
+    """save_scammer_cache off the event loop; failures only warn (the cache is an optimisation)."""
+    if not path or not scammer_map:
+        return
+    try:
+        await asyncio.to_thread(save_scammer_cache, path, scammer_map)
+    except Exception as e:
+        print(f"⚠️ Couldn't update scammer cache {path}: {e}")
+
 # --- Scammer formatting helpers (use v2 data) ---
 def topic_link_for_scammer(scammer_info: Dict[str, Any]) -> Optional[str]:
     tid = scammer_info.get("topic_id")
@@ -198,34 +1229,1152 @@ def name_for_telegram_user_fallback(user) -> str:
     full = f"{getattr(user, 'first_name', '') or ''} {getattr(user, 'last_name', '') or ''}".strip()
     return full if full else "Unknown"
 
-def format_scammer_report(chat_title: str, scammers: List[Tuple[str, str, Optional[str]]]) -> str:
-    header = f"🚨 Scammer(s) found in **{chat_title}** by ScamScan:"
-    lines = []
-    for uid, display, tlink in scammers:
-        if tlink:
-            lines.append(f"• {display} (id `{uid}`) — topic: {tlink}")
-        else:
-            lines.append(f"• {display} (id `{uid}`)")
-    return header + "\n" + "\n".join(lines)
+# --- Observed scammer identities (username / name history) ---
+OBSERVED_USERS_FILE = "observed_users.json"
+OBSERVED_HISTORY_MAX = 20                   # past identities kept per user
+OBSERVED_DEAD_USERNAME_SECONDS = 30 * 86400  # skip usernames that didn't resolve for 30 days
+OBSERVED_SAVE_SECONDS = 5 * 60
+
+def _observed_identity(user) -> Tuple[Optional[str], str]:
+    """(username without @ or None, display name) of a Telethon User."""
+    uname = getattr(user, "username", None)
+    if not uname:
+        for u in getattr(user, "usernames", None) or []:
+            if getattr(u, "active", False):
+                uname = u.username
+                break
+    if getattr(user, "deleted", False):
+        return None, "Deleted Account"
+    full = f"{getattr(user, 'first_name', '') or ''} {getattr(user, 'last_name', '') or ''}".strip()
+    return (uname or None), full
+
+class ObservedUsers:
+    """
+    What listed scammers actually look like right now, learned for free from User entities
+    we already hold (Overwatch events, scans, admin logs, immunize), keyed by user id:
+
+      users[uid] = {"username", "full_name", "first_seen", "last_seen",
+                    "history": [[username, full_name, first_seen, last_seen], ...]}
+      dead_usernames[lowercase name] = when it last failed to resolve
+
+    The list's username field goes stale as scammers rotate names; alerts and immunize
+    prefer what we saw. Saved as JSON (atomic) when dirty. Several processes (Overwatch
+    sessions, a scan next to Overwatch) share the file, so save() merges with what's on
+    disk under a lock file (path + ".lock") instead of overwriting it.
+    """
+
+    def __init__(self, path: Optional[str] = OBSERVED_USERS_FILE):
+        self.path = path
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.dead_usernames: Dict[str, float] = {}
+        self.dirty = False
+        self.generation = 0  # bumped when a user's identity is first recorded or changes
+
+    @classmethod
+    def load(cls, path: str = OBSERVED_USERS_FILE) -> "ObservedUsers":
+        store = cls(path)
+        try:
+            store.users, store.dead_usernames = cls._read(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to read {path}; starting an empty observed-identity store: {e}")
+        return store
+
+    @staticmethod
+    def _read(path: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, float]]:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        users = {str(k): v for k, v in (payload.get("users") or {}).items() if isinstance(v, dict)}
+        dead = {str(k): float(v) for k, v in (payload.get("dead_usernames") or {}).items()}
+        return users, dead
+
+    def merge(self, users: Dict[str, Dict[str, Any]], dead_usernames: Dict[str, float]):
+        """Folds another process's observations into ours (see _merge_observed_user)."""
+        changed = False
+        for uid_str, other in users.items():
+            mine = self.users.get(uid_str)
+            merged = other if mine is None else _merge_observed_user(mine, other)
+            if merged != mine:
+                self.users[uid_str] = merged
+                changed = True
+        for name, ts in dead_usernames.items():
+            if ts > self.dead_usernames.get(name, 0):
+                self.dead_usernames[name] = ts
+        # a name someone saw in use after it was marked dead is alive again
+        for rec in self.users.values():
+            uname = (rec.get("username") or "").lower()
+            if uname and rec.get("last_seen", 0) >= self.dead_usernames.get(uname, float("inf")):
+                del self.dead_usernames[uname]
+        if changed:
+            self.generation += 1
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        try:
+            with open(self.path + ".lock", "a+b") as lock_f:  # closing it releases the flock
+                if fcntl is not None:
+                    fcntl.flock(lock_f.fileno(), fcntl.LOCK_EX)
+                try:
+                    self.merge(*self._read(self.path))
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    print(f"⚠️ Failed to read {self.path} before saving; overwriting it: {e}")
+                payload = {"version": 1, "saved_at": int(time.time()),
+                           "users": self.users, "dead_usernames": self.dead_usernames}
+                _write_file_atomic(self.path, json.dumps(payload, ensure_ascii=False, indent=1).encode("utf-8"))
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Failed to save {self.path}: {e}")
+
+    async def run_saver(self, stop_event: asyncio.Event, interval_seconds: float = OBSERVED_SAVE_SECONDS):
+        """Saves every interval_seconds while dirty; final save when stop_event is set."""
+        try:
+            while not stop_event.is_set():
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self.save()
+        finally:
+            self.save()
+
+    def observe(self, user) -> Optional[str]:
+        """Records one sighting. Returns "old -> new" when the username or name changed."""
+        uid = getattr(user, "id", None)
+        if uid is None:
+            return None
+        uid_str = str(uid)
+        uname, full = _observed_identity(user)
+        now = int(time.time())
+        rec = self.users.get(uid_str)
+        if rec is None:
+            self.users[uid_str] = {"username": uname, "full_name": full, "first_seen": now, "last_seen": now, "history": []}
+            self.dirty = True
+            self.generation += 1
+            if uname:
+                self.dead_usernames.pop(uname.lower(), None)
+            return None
+        if rec.get("username") == uname and rec.get("full_name") == full:
+            if now - rec.get("last_seen", 0) >= 3600:  # keep last_seen roughly fresh without constant writes
+                rec["last_seen"] = now
+                self.dirty = True
+            return None
+
+        old = f"@{rec['username']}" if rec.get("username") else (rec.get("full_name") or "?")
+        new = f"@{uname}" if uname else (full or "?")
+        rec["history"] = ([[rec.get("username"), rec.get("full_name"), rec.get("first_seen"), rec.get("last_seen")]]
+                          + rec.get("history", []))[:OBSERVED_HISTORY_MAX]
+        rec.update(username=uname, full_name=full, first_seen=now, last_seen=now)
+        if uname:
+            self.dead_usernames.pop(uname.lower(), None)
+        self.dirty = True
+        self.generation += 1
+        METRICS.inc("scamscan_identity_changes_total")
+        return f"{old} -> {new}" if old != new else None
+
+    def current(self, uid_str: str) -> Optional[Dict[str, Any]]:
+        return self.users.get(uid_str)
+
+    def export_rows(self, scammer_map=None, changed_only: bool = False) -> List[Dict[str, Any]]:
+        """One row per observed user: current identity, the listed username and past identities."""
+        rows = []
+        for uid_str, rec in sorted(self.users.items(), key=lambda kv: -kv[1].get("last_seen", 0)):
+            history = rec.get("history") or []
+            if changed_only and not history:
+                continue
+            info = (scammer_map.get(uid_str) if scammer_map is not None else None) or {}
+            rows.append({
+                "user_id": uid_str,
+                "username": _normalize_username(rec.get("username")),
+                "full_name": rec.get("full_name"),
+                "listed_username": _normalize_username(info.get("username")),
+                "first_seen": rec.get("first_seen"),
+                "last_seen": rec.get("last_seen"),
+                "previous": [{"username": _normalize_username(h[0]), "full_name": h[1], "first_seen": h[2], "last_seen": h[3]}
+                             for h in history],
+            })
+        return rows
+
+    def mark_dead(self, username: str):
+        self.dead_usernames[username.lstrip("@").lower()] = time.time()
+        self.dirty = True
+
+    def is_dead(self, username: str, max_age: float = OBSERVED_DEAD_USERNAME_SECONDS) -> bool:
+        ts = self.dead_usernames.get(username.lstrip("@").lower())
+        return ts is not None and time.time() - ts < max_age
+
+def _merge_observed_user(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One user's record as two processes saw it: the identity seen last is current; the other
+    side's current identity (if different) and both histories become history, newest first.
+    """
+    def seen(r):
+        return r.get("last_seen") or 0, r.get("first_seen") or 0  # ties: the identity taken up later
+
+    if seen(b) > seen(a):
+        a, b = b, a
+    merged = dict(a)
+    current = (a.get("username"), a.get("full_name"))
+    entries = list(a.get("history") or []) + list(b.get("history") or [])
+    if (b.get("username"), b.get("full_name")) == current:
+        if b.get("first_seen") is not None:
+            merged["first_seen"] = min(a.get("first_seen") or b["first_seen"], b["first_seen"])
+    else:
+        entries.append([b.get("username"), b.get("full_name"), b.get("first_seen"), b.get("last_seen")])
+
+    history: List[List[Any]] = []
+    keys = set()
+    for h in sorted(entries, key=lambda h: -(h[3] or 0)):
+        key = (h[0], h[1], h[2])
+        if key in keys or ((h[0], h[1]) == current and (h[3] or 0) >= (merged.get("first_seen") or 0)):
+            continue  # duplicate, or just the current identity as the other side recorded it
+        keys.add(key)
+        history.append(h)
+    merged["history"] = history[:OBSERVED_HISTORY_MAX]
+    return merged
+
+def scammer_display_name(uid_str: str, info: Optional[Dict[str, Any]], observed: Optional[ObservedUsers] = None,
+                         fallback: Optional[str] = None) -> str:
+    """
+    Display name for alerts and reports: what we last saw the user as, if anything,
+    noting the list's name when it differs; otherwise the list's name (or fallback / the id).
+    """
+    listed = scammer_display_name_from_v2(info) if info else None
+    seen = observed.current(uid_str) if observed is not None else None
+    if not seen:
+        return listed or fallback or uid_str
+    fresh = f"@{seen['username']}" if seen.get("username") else (seen.get("full_name") or listed or fallback or uid_str)
+    if listed and listed != "Unknown" and listed.lower() != fresh.lower():
+        return f"{fresh} (listed as {listed})"
+    return fresh
+
+def _observe_scammer(observed: Optional[ObservedUsers], user, where: str):
+    """Feeds one entity of a listed scammer into the store and logs an identity change."""
+    if observed is None or user is None:
+        return
+    change = observed.observe(user)
+    if change:
+        print(f"🔁 Scammer {getattr(user, 'id', '?')} changed identity ({where}): {change}")
+
+# --- Alert templates (configurable text, cached per-scammer / per-chat fragments) ---
+ALERT_TEMPLATES_FILE = "alert_templates.json"
+ALERT_FRAGMENT_CACHE_MAX = 10_000
+
+# Each template gets only the fields in ALERT_TEMPLATE_FIELDS. scammer / topic_line are the rendered
+# "scammer" / "topic_line" fragments (topic_line is empty without a topic).
+# Overwatch alerts should keep 🚨, the word "scam" and {scammer}: the mode 3 duplicate detector
+# recognizes alerts (ours and other bots') by them.
+ALERT_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "en": {
+        "scammer": "{display} (id `{uid}`)",
+        "topic_line": "• Scammer topic: {topic_link}\n",
+        "unknown_chat": "(unknown chat)",
+        "added": "🚨 **Scammer invited/added detected**\n• Chat: **{chat_title}** (`{chat_id}`)\n"
+                 "• Chat link: {chat_link}\n• Scammer: {scammer}\n{topic_line}",
+        "message": "🚨 **Scammer message detected**\n• Chat: **{chat_title}**\n• Scammer: {scammer}\n"
+                   "{topic_line}• Message link: {msg_link}",
+        "verify_still": "🚨 **Scammer joined chat**\n• Chat: **{chat_title}**\n• Chat link: {chat_link}\n"
+                        "• Scammer: {scammer}\n{topic_line}",
+        "verify_unknown": "🚨 **Scammer joined chat (verify inconclusive)**\n• Chat: **{chat_title}**\n"
+                          "• Chat link: {chat_link}\n• Scammer: {scammer}\n{topic_line}• Verify: {why}",
+        "report_header": "🚨 Scammer(s) found in **{chat_title}** by ScamScan:",
+        "report_line": "• {scammer}",
+        "report_line_topic": "• {scammer} — topic: {topic_link}",
+        "summary_header": "🧾 ScamScan summary: {hits} scammer hit(s) in {chats} chat(s) "
+                          "({scanned} scanned, {failed} failed)",
+        "summary_empty": "✅ ScamScan summary: no known scammers in {scanned} scanned chat(s) ({failed} failed)",
+    },
+    "ru": {
+        "topic_line": "• Тема скамера: {topic_link}\n",
+        "unknown_chat": "(неизвестный чат)",
+        "added": "🚨 **ScamScan: скамера пригласили/добавили**\n• Чат: **{chat_title}** (`{chat_id}`)\n"
+                 "• Ссылка на чат: {chat_link}\n• Скамер: {scammer}\n{topic_line}",
+        "message": "🚨 **ScamScan: сообщение скамера**\n• Чат: **{chat_title}**\n• Скамер: {scammer}\n"
+                   "{topic_line}• Ссылка на сообщение: {msg_link}",
+        "verify_still": "🚨 **ScamScan: скамер в чате**\n• Чат: **{chat_title}**\n• Ссылка на чат: {chat_link}\n"
+                        "• Скамер: {scammer}\n{topic_line}",
+        "verify_unknown": "🚨 **ScamScan: скамер вошёл в чат (проверка не удалась)**\n• Чат: **{chat_title}**\n"
+                          "• Ссылка на чат: {chat_link}\n• Скамер: {scammer}\n{topic_line}• Проверка: {why}",
+        "report_header": "🚨 ScamScan: найдены скамеры в **{chat_title}**:",
+        "report_line_topic": "• {scammer} — тема: {topic_link}",
+        "summary_header": "🧾 Сводка ScamScan: {hits} совпадений в {chats} чатах (проверено {scanned}, ошибок {failed})",
+        "summary_empty": "✅ Сводка ScamScan: известных скамеров нет, проверено чатов: {scanned} (ошибок {failed})",
+    },
+}
+ALERT_LANGUAGES = tuple(ALERT_TEMPLATES)
+ALERT_TEMPLATE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "scammer": ("display", "uid"),
+    "topic_line": ("topic_link",),
+    "unknown_chat": (),
+    "added": ("chat_title", "chat_id", "chat_link", "scammer", "topic_line"),
+    "message": ("chat_title", "scammer", "topic_line", "msg_link"),
+    "verify_still": ("chat_title", "chat_link", "scammer", "topic_line"),
+    "verify_unknown": ("chat_title", "chat_link", "scammer", "topic_line", "why"),
+    "report_header": ("chat_title",),
+    "report_line": ("scammer",),
+    "report_line_topic": ("scammer", "topic_link"),
+    "summary_header": ("hits", "chats", "scanned", "failed"),
+    "summary_empty": ("scanned", "failed"),
+}
+_ALERT_SAMPLE_FIELDS = {
+    "chat_title": "Chat", "chat_id": -1001, "chat_link": "https://t.me/c/1", "msg_link": "https://t.me/c/1/2",
+    "scammer": "@x (id `1`)", "topic_line": "", "why": "why", "display": "@x", "uid": "1", "topic_link": "https://t.me/x/1",
+    "hits": 1, "chats": 1, "scanned": 1, "failed": 0,
+}
+
+class AlertRenderer:
+    """
+    Alert and report text from templates (built-in language + overrides).
+
+    Per-scammer fragments (display name, topic link, rendered "scammer" / "topic_line") and
+    per-chat fragments (title, link) are cached, so an alert during a raid is one format() call:
+      - scammer fragments are dropped when the list object is swapped (list refresh) or an
+        observed identity changes (ObservedUsers.generation)
+      - chat fragments are dropped by invalidate_chats() (allowlist refresh)
+    One renderer serves all accounts of a process; there's no await inside, so no lock.
+    """
+
+    def __init__(self, language: str = "en", overrides: Optional[Dict[str, str]] = None):
+        self.language = language if language in ALERT_TEMPLATES else "en"
+        self.templates: Dict[str, str] = dict(ALERT_TEMPLATES["en"])
+        self.templates.update(ALERT_TEMPLATES[self.language])
+        self.templates.update(overrides or {})
+        self._scammers: Dict[str, Tuple[str, Optional[str], str, str]] = {}
+        self._scammer_source = None
+        self._observed_generation = None
+        self._chats: Dict[int, Tuple[str, str]] = {}
+
+    def scammer(self, uid_str: str, scammer_map, observed: Optional[ObservedUsers] = None,
+                fallback: Optional[str] = None) -> Tuple[str, Optional[str], str, str]:
+        """(display, topic_link, "scammer" fragment, "topic_line" fragment) for a listed user."""
+        generation = observed.generation if observed is not None else None
+        if (scammer_map is not self._scammer_source or generation != self._observed_generation
+                or len(self._scammers) >= ALERT_FRAGMENT_CACHE_MAX):
+            self._scammers.clear()
+            self._scammer_source = scammer_map
+            self._observed_generation = generation
+        frag = self._scammers.get(uid_str)
+        if frag is None:
+            info = scammer_map.get(uid_str) or {}
+            display = scammer_display_name(uid_str, info, observed, fallback)
+            tlink = topic_link_for_scammer(info) if info else None
+            frag = (
+                display,
+                tlink,
+                self.templates["scammer"].format(display=display, uid=uid_str),
+                self.templates["topic_line"].format(topic_link=tlink) if tlink else "",
+            )
+            if info:  # a fallback name comes from the event, not the list; don't pin it
+                self._scammers[uid_str] = frag
+        return frag
+
+    def chat(self, chat_entity, chat_id: int) -> Tuple[str, str]:
+        """(title, link) of a chat; cached once the entity is known."""
+        frag = self._chats.get(chat_id)
+        if frag is None:
+            title = getattr(chat_entity, "title", None) or self.templates["unknown_chat"]
+            frag = (title, _chat_link(chat_entity, chat_id))
+            if chat_entity is not None:
+                self._chats[chat_id] = frag
+        return frag
+
+    def message_link(self, chat_entity, chat_id: int, msg_id: int) -> str:
+        return f"{self.chat(chat_entity, chat_id)[1]}/{msg_id}"
+
+    def invalidate_chats(self):
+        self._chats.clear()
+
+    def invalidate_scammers(self):
+        self._scammers.clear()
+
+    def render(self, kind: str, **fields) -> str:
+        return self.templates[kind].format(**fields).rstrip()
+
+    def report(self, chat_title: str, scammers: List[Tuple[str, str, Optional[str]]]) -> str:
+        t = self.templates
+        lines = [t["report_header"].format(chat_title=chat_title)]
+        for uid, display, tlink in scammers:
+            scammer = t["scammer"].format(display=display, uid=uid)
+            if tlink:
+                lines.append(t["report_line_topic"].format(scammer=scammer, topic_link=tlink))
+            else:
+                lines.append(t["report_line"].format(scammer=scammer))
+        return "\n".join(lines)
 
-async def send_report(client: TelegramClient, mode: int, chat, report_text: str):
+def load_alert_renderer(path: Optional[str] = ALERT_TEMPLATES_FILE, language: Optional[str] = None) -> AlertRenderer:
     """
-    mode 1: Console only (handled by caller)
-    mode 2: DM Saved Messages (me)
-    mode 3: Send to the chat where scammers were found
+    Renderer for language (default: the file's "language", else "en") with the overrides in path:
+      {"language": "ru", "templates": {"message": "🚨 ... {scammer} ... {msg_link}", ...}}
+    A missing default file is fine; unknown kinds and templates that don't format with the fields their
+    kind gets (ALERT_TEMPLATE_FIELDS) are ignored with a warning.
     """
-    if mode == 2:
+    payload: Dict[str, Any] = {}
+    if path:
         try:
-            await client.send_message("me", report_text)
-            await asyncio.sleep(2)
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if not isinstance(payload, dict):
+                raise ValueError("expected a JSON object")
+        except FileNotFoundError:
+            if path != ALERT_TEMPLATES_FILE:
+                print(f"⚠️ Alert templates file {path} not found; using built-in templates.")
+            payload = {}
         except Exception as e:
-            print(f"❌ Failed to DM Saved Messages: {e}")
-    elif mode == 3:
+            print(f"⚠️ Failed to read alert templates {path}: {e}; using built-in templates.")
+            payload = {}
+
+    language = language or payload.get("language") or "en"
+    if language not in ALERT_TEMPLATES:
+        print(f"⚠️ Unknown alert language '{language}' (have: {', '.join(ALERT_LANGUAGES)}); using en.")
+        language = "en"
+
+    overrides: Dict[str, str] = {}
+    for kind, text in (payload.get("templates") or {}).items():
+        if kind not in ALERT_TEMPLATES["en"]:
+            print(f"⚠️ Alert templates: unknown template '{kind}' ignored.")
+            continue
+        fields = ALERT_TEMPLATE_FIELDS[kind]
+        try:
+            str(text).format(**{f: _ALERT_SAMPLE_FIELDS[f] for f in fields})
+        except (KeyError, IndexError, ValueError, AttributeError) as e:
+            print(f"⚠️ Alert templates: '{kind}' doesn't render ({e!r}; it gets "
+                  f"{', '.join('{' + f + '}' for f in fields) or 'no fields'}); keeping the built-in one.")
+            continue
+        overrides[kind] = str(text)
+    return AlertRenderer(language, overrides)
+
+def format_scammer_report(chat_title: str, scammers: List[Tuple[str, str, Optional[str]]],
+                          alerts: Optional[AlertRenderer] = None) -> str:
+    return (alerts or AlertRenderer()).report(chat_title, scammers)
+
+# --- Scan report sending (split at the message limit, adaptive pacing) ---
+TELEGRAM_MESSAGE_LIMIT = 4096
+REPORT_PART_LABEL_RESERVE = 16         # room for the "(i/n)" label on split reports
+REPORT_MIN_INTERVAL = 1.0              # seconds between any two sends when Telegram is happy
+REPORT_GROUP_INTERVAL = 3.0            # per group chat (~20 messages/minute)
+REPORT_MAX_INTERVAL = 30.0
+REPORT_SEND_RETRIES = 3                # FloodWaits tolerated per message
+
+def split_report(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Splits text into messages of at most limit characters, on line boundaries (a longer
+    line is cut). Parts after the first repeat the first line (the header) so every message
+    says what it's about, and all parts are labelled "(i/n)".
+    """
+    if len(text) <= limit:
+        return [text]
+    body_limit = limit - REPORT_PART_LABEL_RESERVE
+    lines = text.split("\n")
+    header = lines[0] if len(lines[0]) <= body_limit // 4 else ""
+    room = body_limit - (len(header) + 1 if header else 0)
+
+    pieces: List[str] = []
+    for line in lines:
+        while len(line) > room:
+            pieces.append(line[:room])
+            line = line[room:]
+        pieces.append(line)
+
+    parts: List[str] = []
+    cur: List[str] = []
+    cur_len = -1
+    for piece in pieces:
+        if cur and cur_len + 1 + len(piece) > body_limit:
+            parts.append("\n".join(cur))
+            cur, cur_len = ([header], len(header)) if header else ([], -1)
+        cur.append(piece)
+        cur_len += 1 + len(piece)
+    parts.append("\n".join(cur))
+    return [f"({i}/{len(parts)}) {p}" for i, p in enumerate(parts, 1)]
+
+class ReportPacer:
+    """
+    Spaces out report messages instead of sleeping a fixed 2s after each one:
+      - at least interval seconds between any two sends, and group_interval per group chat
+      - a FloodWait doubles interval (up to max_interval) and the message is retried after the wait
+      - every clean send shrinks interval back toward min_interval
+    Sends go out one at a time (concurrent scans share the pacer), and nothing is slept
+    after the last one.
+    """
+
+    def __init__(self, min_interval: float = REPORT_MIN_INTERVAL, group_interval: float = REPORT_GROUP_INTERVAL,
+                 max_interval: float = REPORT_MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.group_interval = group_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._lock = asyncio.Lock()
+        self._next_any = 0.0
+        self._next_peer: Dict[Any, float] = {}
+
+    async def send(self, client, peer, text: str, key=None, is_group: bool = False):
+        """Sends one message (≤ TELEGRAM_MESSAGE_LIMIT); raises like send_message except for FloodWait."""
+        async with self._lock:
+            for attempt in range(REPORT_SEND_RETRIES + 1):
+                wait = max(self._next_any, self._next_peer.get(key, 0.0)) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    msg = await client.send_message(peer, text)
+                except FloodWaitError as e:
+                    self.interval = min(self.max_interval, self.interval * 2)
+                    if attempt == REPORT_SEND_RETRIES:
+                        raise
+                    print(f"   ⏳ FloodWait while sending a report: sleeping {e.seconds}s, "
+                          f"then pacing at {self.interval:.1f}s")
+                    await _sleep_floodwait(e, "report")
+                    continue
+                sent = time.monotonic()
+                self._next_any = sent + self.interval
+                if is_group:
+                    self._next_peer[key] = sent + max(self.interval, self.group_interval)
+                self.interval = max(self.min_interval, self.interval * 0.8)
+                METRICS.inc("scamscan_reports_sent_total")
+                return msg
+
+class ReportWriter:
+    """
+    Sends scan reports for report_mode (1 console only, 2 Saved Messages, 3 the scanned chat),
+    split at Telegram's message limit and paced by a ReportPacer.
+    With summary=True every chat's hits are also collected and send_summary() posts one
+    account-wide summary to Saved Messages at the end of the scan.
+    """
+
+    def __init__(self, client, mode: int, *, summary: bool = False, alerts: Optional[AlertRenderer] = None,
+                 pacer: Optional[ReportPacer] = None):
+        self.client = client
+        self.mode = mode
+        self.summary = summary
+        self.alerts = alerts or AlertRenderer()
+        self.pacer = pacer or ReportPacer()
+        self._collected: List[Tuple[str, List[Tuple[str, str, Optional[str]]]]] = []
+
+    async def _send_parts(self, peer, text: str, key, is_group: bool) -> int:
+        parts = split_report(text)
+        for part in parts:
+            await self.pacer.send(self.client, peer, part, key=key, is_group=is_group)
+        return len(parts)
+
+    def collect(self, chat_title: str, scammers: List[Tuple[str, str, Optional[str]]]):
+        """Adds one chat's hits to the summary (chat_report does this; resumed scans add earlier runs' hits)."""
+        if self.summary and scammers:
+            self._collected.append((chat_title, list(scammers)))
+
+    async def chat_report(self, chat, scammers: List[Tuple[str, str, Optional[str]]]):
+        chat_title = getattr(chat, "title", str(chat))
+        self.collect(chat_title, scammers)
+        if self.mode not in (2, 3):
+            return
+        text = self.alerts.report(chat_title, scammers)
+        if self.mode == 2:
+            try:
+                n = await self._send_parts("me", text, "me", False)
+            except Exception as e:
+                print(f"❌ Failed to DM Saved Messages: {e}")
+                return
+        else:
+            try:
+                n = await self._send_parts(chat, text, getattr(chat, "id", None), True)
+            except Exception as e:
+                print(f"❌ Failed to send message to chat '{chat_title}': {e}")
+                return
+        if n > 1:
+            print(f"✉️ Report for '{chat_title}' sent in {n} parts.")
+
+    async def send_summary(self, scanned: int, failed: int):
+        """One message (or several, split) to Saved Messages covering every chat with hits."""
+        if not self.summary:
+            return
+        t = self.alerts.templates
+        hits = sum(len(s) for _, s in self._collected)
+        if not self._collected:
+            text = t["summary_empty"].format(scanned=scanned, failed=failed)
+        else:
+            blocks = [t["summary_header"].format(hits=hits, chats=len(self._collected), scanned=scanned, failed=failed)]
+            blocks.extend(self.alerts.report(title, scammers) for title, scammers in self._collected)
+            text = "\n\n".join(blocks)
+        try:
+            n = await self._send_parts("me", text, "me", False)
+            print(f"🧾 Summary sent to Saved Messages ({hits} hit(s), {n} message(s)).")
+        except Exception as e:
+            print(f"❌ Failed to send the summary to Saved Messages: {e}")
+
+# --- Structured event output (JSONL) ---
+EVENTS_SCHEMA_VERSION = 1
+EVENTS_FLUSH_SECONDS = 2.0
+EVENTS_BATCH_SIZE = 256
+EVENTS_MAX_BYTES = 50 * 1024 * 1024  # rotate at 50 MB
+EVENTS_BACKUPS = 5
+
+# Stable event kinds written to the JSONL sink.
+#   scan_hit           scammer found in a participant list (extra source="history": in message history)
+#   scan_chat_failed   participant list (or, with source="history", message history) could not be read
+#   ow_message         scammer sent a message
+#   ow_added           scammer invited/added (service message)
+#   ow_join / ow_leave scammer joined/left (ChatAction)
+#   ow_verify          delayed join verification result (extra: result, detail)
+#   ow_duplicate_deleted  our newer duplicate alert(s) removed (extra: message_ids)
+EVENT_KINDS = (
+    "scan_hit", "scan_chat_failed",
+    "ow_message", "ow_added", "ow_join", "ow_leave", "ow_verify", "ow_duplicate_deleted",
+)
+
+def default_instance_name() -> str:
+    return f"{socket.gethostname()}:{SESSION_NAME}"
+
+class JsonlEventSink:
+    """
+    Buffered JSONL writer for scan hits and Overwatch events.
+
+    emit() only appends a dict to an in-memory buffer; serialization and the
+    file write happen in batches (flush()/run_flusher()), off the event loop.
+    The file rotates to path.1 ... path.N once it grows past max_bytes.
+
+    Every line has: v, ts (emit time, unix), time (UTC ISO-8601), kind, instance,
+    chat_id, chat_title, user_id, display, topic_link, link, event_ts (Telegram
+    message time if known, else null), plus any kind-specific extra fields.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        instance: Optional[str] = None,
+        max_bytes: int = EVENTS_MAX_BYTES,
+        backups: int = EVENTS_BACKUPS,
+        batch_size: int = EVENTS_BATCH_SIZE,
+    ):
+        self.path = path
+        self.instance = instance or default_instance_name()
+        self.max_bytes = max(0, int(max_bytes))
+        self.backups = max(0, int(backups))
+        self.batch_size = max(1, int(batch_size))
+        self._buf: List[Dict[str, Any]] = []
+        self._write_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+
+    def emit(
+        self,
+        kind: str,
+        *,
+        chat_id: Optional[int] = None,
+        chat_title: Optional[str] = None,
+        user_id: Optional[str] = None,
+        display: Optional[str] = None,
+        topic_link: Optional[str] = None,
+        link: Optional[str] = None,
+        event_ts: Optional[float] = None,
+        **extra,
+    ):
+        rec = {
+            "v": EVENTS_SCHEMA_VERSION,
+            "ts": time.time(),
+            "time": None,  # formatted at write time, off the hot path
+            "kind": kind,
+            "instance": self.instance,
+            "chat_id": chat_id,
+            "chat_title": chat_title,
+            "user_id": None if user_id is None else str(user_id),
+            "display": display,
+            "topic_link": topic_link,
+            "link": link,
+            "event_ts": event_ts,
+        }
+        if extra:
+            rec.update(extra)
+        self._buf.append(rec)
+
+        if len(self._buf) >= self.batch_size:
+            if self._wakeup is not None:
+                self._wakeup.set()
+            else:
+                self.flush()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch, self._buf = self._buf, []
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        parts = []
+        for rec in batch:
+            rec["time"] = datetime.fromtimestamp(rec["ts"], timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+            parts.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=str))
+        data = ("\n".join(parts) + "\n").encode("utf-8")
+
+        with self._write_lock:
+            try:
+                self._maybe_rotate(len(data))
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                self.written += len(batch)
+            except Exception as e:
+                print(f"⚠️ Event sink: failed to write {len(batch)} event(s) to {self.path}: {e}")
+
+    def _maybe_rotate(self, incoming: int):
+        if not self.max_bytes:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+
+        if self.backups == 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def flush(self):
+        """Synchronous flush (used at shutdown and when no flusher task is running)."""
+        self._write_batch(self._take_batch())
+
+    async def run_flusher(self, stop_event: asyncio.Event, interval_seconds: float = EVENTS_FLUSH_SECONDS):
+        """
+        Writes buffered events every interval_seconds (or sooner once a batch fills up).
+        Writes run in a worker thread; final flush happens when stop_event is set.
+        """
+        self._wakeup = asyncio.Event()
+        try:
+            while not stop_event.is_set():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                batch = self._take_batch()
+                if batch:
+                    await asyncio.to_thread(self._write_batch, batch)
+        finally:
+            self._wakeup = None
+            self.flush()
+
+# --- Overwatch update recording (for bench.py replay) ---
+RECORDING_FORMAT_VERSION = 1
+
+class UpdateRecorder:
+    """
+    Records the Overwatch update stream as compact JSON arrays, one per line
+    (gzip-compressed if the path ends with .gz). Metadata only, never message text:
+
+      {"scamscan_recording": 1, "started_at": ..., "version": ...}     header
+      ["c", chat_id, title, username]                                  first sighting of a chat
+      ["m", t, chat_id, msg_id, sender_id, out, action, alert_uids]    NewMessage
+      ["a", t, chat_id, user_id, flags]                                ChatAction (flags: j/a/l/k)
+
+    t is seconds since the recording started. action is null, ["add", [uids]]
+    or ["link", uid]. alert_uids lists the ids found in messages that look
+    like scam alerts (so duplicate detection replays), else null.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._buf: List[Any] = [{
+            "scamscan_recording": RECORDING_FORMAT_VERSION,
+            "started_at": self.started_at,
+            "version": __version__,
+        }]
+        self._seen_chats: Set[int] = set()
+        self._write_lock = threading.Lock()
+        self.recorded = 0
+
+    def _t(self) -> float:
+        return round(time.perf_counter() - self._t0, 3)
+
+    def _note_chat(self, chat_id: int, entity):
+        if chat_id in self._seen_chats or entity is None:
+            return
+        self._seen_chats.add(chat_id)
+        self._buf.append(["c", chat_id, getattr(entity, "title", None), getattr(entity, "username", None)])
+
+    def record_new_message(self, event):
+        chat_id = event.chat_id
+        if chat_id is None:
+            return
+        msg = event.message
+        self._note_chat(chat_id, getattr(event, "chat", None))
+
+        action = getattr(msg, "action", None)
+        action_rec = None
+        if isinstance(action, MessageActionChatAddUser):
+            action_rec = ["add", [int(x) for x in (action.users or [])]]
+        elif isinstance(action, MessageActionChatJoinedByLink):
+            action_rec = ["link", getattr(getattr(msg, "from_id", None), "user_id", None)]
+
+        text = getattr(event, "raw_text", None) or ""
+        alert_uids = sorted(_extract_uids_from_text(text)) if _looks_like_scam_alert(text) else None
+
+        self._buf.append(["m", self._t(), chat_id, msg.id, getattr(msg, "sender_id", None),
+                          1 if getattr(msg, "out", False) else 0, action_rec, alert_uids])
+        self.recorded += 1
+
+    def record_chat_action(self, event):
+        chat_id = event.chat_id
+        if chat_id is None:
+            return
+        self._note_chat(chat_id, getattr(event, "chat", None))
+        flags = (("j" if event.user_joined else "") + ("a" if event.user_added else "")
+                 + ("l" if event.user_left else "") + ("k" if event.user_kicked else ""))
+        if not flags:
+            return
+        self._buf.append(["a", self._t(), chat_id, getattr(event, "user_id", None), flags])
+        self.recorded += 1
+
+    def flush(self):
+        batch, self._buf = self._buf, []
+        if not batch:
+            return
+        data = ("\n".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) for r in batch) + "\n").encode("utf-8")
+        with self._write_lock:
+            try:
+                if self.path.endswith(".gz"):
+                    # each flush appends a gzip member; readers see one continuous stream
+                    with gzip.open(self.path, "ab") as f:
+                        f.write(data)
+                else:
+                    with open(self.path, "ab") as f:
+                        f.write(data)
+            except Exception as e:
+                print(f"⚠️ Recorder: failed to write {self.path}: {e}")
+
+    async def run_flusher(self, stop_event: asyncio.Event, interval_seconds: float = EVENTS_FLUSH_SECONDS):
+        try:
+            while not stop_event.is_set():
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                await asyncio.to_thread(self.flush)
+        finally:
+            self.flush()
+
+def read_update_recording(path: str):
+    """
+    Yields the records of an UpdateRecorder file (header dict first, then lists).
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+# --- Metrics (counters / gauges / histograms) ---
+METRICS_SUMMARY_SECONDS = 5 * 60   # periodic summary line in Overwatch (0 = off)
+METRICS_HTTP_HOST = "127.0.0.1"
+
+# Upper bounds in seconds; an implicit +Inf bucket follows.
+_HIST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+
+def _labels_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _render_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in items)
+    return "{" + body + "}"
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(_HIST_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = 0
+        for i, ub in enumerate(_HIST_BUCKETS):
+            if value <= ub:
+                break
+        else:
+            i = len(_HIST_BUCKETS)
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Bucket upper bound that covers quantile q (coarse, but cheap)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target:
+                return _HIST_BUCKETS[i] if i < len(_HIST_BUCKETS) else float("inf")
+        return float("inf")
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "t0")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics: counters, gauges and fixed-bucket histograms.
+    Rendered as a summary line for the terminal or as Prometheus text.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = defaultdict(dict)
+        self.gauges: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = defaultdict(dict)
+        self.histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], _Histogram]] = defaultdict(dict)
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters[name]
+        key = _labels_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges[name][_labels_key(labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        series = self.gauges[name]
+        key = _labels_key(labels)
+        series[key] = series.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms[name]
+        key = _labels_key(labels)
+        h = series.get(key)
+        if h is None:
+            h = series[key] = _Histogram()
+        h.observe(value)
+
+    def time(self, name: str, **labels) -> _Timer:
+        return _Timer(self, name, labels)
+
+    def counter_total(self, name: str, **match) -> float:
+        want = set(_labels_key(match))
+        return sum(v for k, v in self.counters.get(name, {}).items() if want <= set(k))
+
+    def gauge_total(self, name: str) -> float:
+        return sum(self.gauges.get(name, {}).values())
+
+    def histogram(self, name: str, **labels) -> Optional[_Histogram]:
+        return self.histograms.get(name, {}).get(_labels_key(labels))
+
+    def render_prometheus(self) -> str:
+        out: List[str] = []
+        for name in sorted(self.counters):
+            out.append(f"# TYPE {name} counter")
+            for key, v in sorted(self.counters[name].items()):
+                out.append(f"{name}{_render_labels(key)} {v}")
+        for name in sorted(self.gauges):
+            out.append(f"# TYPE {name} gauge")
+            for key, v in sorted(self.gauges[name].items()):
+                out.append(f"{name}{_render_labels(key)} {v}")
+        for name in sorted(self.histograms):
+            out.append(f"# TYPE {name} histogram")
+            for key, h in sorted(self.histograms[name].items()):
+                running = 0
+                for i, ub in enumerate(_HIST_BUCKETS):
+                    running += h.counts[i]
+                    out.append(f"{name}_bucket{_render_labels(key, ('le', repr(ub)))} {running}")
+                out.append(f"{name}_bucket{_render_labels(key, ('le', '+Inf'))} {h.count}")
+                out.append(f"{name}_sum{_render_labels(key)} {h.total}")
+                out.append(f"{name}_count{_render_labels(key)} {h.count}")
+        out.append("# TYPE scamscan_uptime_seconds gauge")
+        out.append(f"scamscan_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(out) + "\n"
+
+METRICS = MetricsRegistry()
+
+def _fmt_ms(v: Optional[float]) -> str:
+    if v is None:
+        return "-"
+    if v == float("inf"):
+        return ">120s"
+    return f"{v * 1000:.1f}ms" if v < 1 else f"{v:.1f}s"
+
+async def _metrics_summary_periodically(
+    stop_event: asyncio.Event,
+    interval_seconds: int = METRICS_SUMMARY_SECONDS,
+):
+    """
+    Prints one metrics line every interval_seconds.
+    """
+    last_events = METRICS.counter_total("scamscan_events_total")
+    last_rpc = METRICS.counter_total("scamscan_rpc_total")
+    last_t = time.perf_counter()
+    while not stop_event.is_set():
         try:
-            await client.send_message(chat, report_text)
-            await asyncio.sleep(2)
+            await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+            break
+        except asyncio.TimeoutError:
+            pass
+
+        now = time.perf_counter()
+        events_total = METRICS.counter_total("scamscan_events_total")
+        rpc_total = METRICS.counter_total("scamscan_rpc_total")
+        eps = (events_total - last_events) / max(1e-9, now - last_t)
+        h_msg = METRICS.histogram("scamscan_handler_seconds", handler="on_new_message") or _Histogram()
+        h_lock = METRICS.histogram("scamscan_lock_wait_seconds", lock="state_lock") or _Histogram()
+        h_ref = METRICS.histogram("scamscan_scammer_refresh_seconds") or _Histogram()
+        print(
+            f"📈 Metrics: {eps:.2f} ev/s | on_new_message p50={_fmt_ms(h_msg.quantile(0.5))} "
+            f"p99={_fmt_ms(h_msg.quantile(0.99))} | lock wait p99={_fmt_ms(h_lock.quantile(0.99))} | "
+            f"rpc +{rpc_total - last_rpc:.0f} (total {rpc_total:.0f}) | "
+            f"floodwait slept {METRICS.counter_total('scamscan_floodwait_seconds_total'):.0f}s | "
+            f"alerts in flight {METRICS.gauge_total('scamscan_alerts_inflight'):.0f} | "
+            f"queue {METRICS.gauge_total('scamscan_event_queue_depth'):.0f} "
+            f"(shed {METRICS.counter_total('scamscan_events_shed_total'):.0f}) | "
+            f"list refresh avg={_fmt_ms(h_ref.total / h_ref.count if h_ref.count else None)}"
+        )
+        last_events, last_rpc, last_t = events_total, rpc_total, now
+
+def _local_http_handler(lookup_provider=None):
+    """
+    Request handler for the local endpoints:
+      /metrics (or /)                    Prometheus text
+      /lookup?q=...&by=...&limit=...     scammer lookup as JSON (only with lookup_provider,
+                                         an async callable returning the current ScammerLookup)
+    Keep-alive is supported so local tools can query the lookup at high rates over one connection.
+    Lookups run in worker threads, at most LOOKUP_CONCURRENCY at once, so a slow query never
+    blocks the event loop (and with it Overwatch's alert handling).
+    """
+    lookup_slots = asyncio.Semaphore(LOOKUP_CONCURRENCY)
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), timeout=30)
+                if not request_line:
+                    break
+                keep_alive = request_line.rstrip().endswith(b"HTTP/1.1")
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), timeout=5)
+                    if not line or line in (b"\r\n", b"\n"):
+                        break
+                    if line.lower().startswith(b"connection:"):
+                        keep_alive = b"close" not in line.lower()
+                parts = request_line.decode("latin-1").split()
+                url = urlsplit(parts[1] if len(parts) > 1 else "/")
+                if url.path in ("/metrics", "/"):
+                    body = METRICS.render_prometheus().encode("utf-8")
+                    status = "200 OK"
+                    ctype = "text/plain; version=0.0.4; charset=utf-8"
+                elif url.path == "/lookup" and lookup_provider is not None:
+                    qs = parse_qs(url.query)
+                    by = (qs.get("by") or ["auto"])[0]
+                    query = (qs.get("q") or [""])[0]
+                    if by not in LOOKUP_BY or not query:
+                        body = json.dumps({"error": f"need q=... and by in {list(LOOKUP_BY)}"}).encode("utf-8")
+                        status = "400 Bad Request"
+                    else:
+                        try:
+                            limit = int((qs.get("limit") or [LOOKUP_DEFAULT_LIMIT])[0])
+                        except ValueError:
+                            limit = LOOKUP_DEFAULT_LIMIT
+                        lookup = await lookup_provider()
+                        async with lookup_slots:
+                            res = await asyncio.to_thread(lookup_response, lookup, query, by, limit)
+                        body = json.dumps(res, ensure_ascii=False).encode("utf-8")
+                        status = "200 OK"
+                    ctype = "application/json; charset=utf-8"
+                    METRICS.inc("scamscan_lookup_requests_total", status=status.split()[0])
+                else:
+                    body = b"not found\n"
+                    status = "404 Not Found"
+                    ctype = "text/plain"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    return _handle
+
+async def start_metrics_http_server(port: int, host: str = METRICS_HTTP_HOST, lookup_provider=None):
+    """
+    Serves METRICS as Prometheus text on http://host:port/metrics (and /lookup, see _local_http_handler).
+    Returns the asyncio server (close() it to stop).
+    """
+    server = await asyncio.start_server(_local_http_handler(lookup_provider), host, port)
+    print(f"📈 Metrics endpoint: http://{host}:{port}/metrics")
+    if lookup_provider is not None:
+        print(f"🔎 Lookup endpoint: http://{host}:{port}/lookup?q=...")
+    return server
+
+async def start_lookup_unix_server(path: str, lookup_provider):
+    """Same endpoints as the metrics server, on a Unix socket (file mode 0660)."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    server = await asyncio.start_unix_server(_local_http_handler(lookup_provider), path)
+    os.chmod(path, 0o660)
+    print(f"🔎 Lookup endpoint: unix:{path} /lookup?q=...")
+    return server
+
+@contextlib.asynccontextmanager
+async def _timed_lock(lock: asyncio.Lock, name: str = "state_lock"):
+    """
+    async with _timed_lock(state_lock): ...  — records time spent waiting for the lock.
+    """
+    t0 = time.perf_counter()
+    async with lock:
+        METRICS.observe("scamscan_lock_wait_seconds", time.perf_counter() - t0, lock=name)
+        yield
+
+async def _sleep_floodwait(e: FloodWaitError, where: str):
+    METRICS.inc("scamscan_floodwait_total", where=where)
+    METRICS.inc("scamscan_floodwait_seconds_total", e.seconds, where=where)
+    await asyncio.sleep(e.seconds)
+
+class ScamScanClient(TelegramClient):
+    """
+    TelegramClient that counts every RPC by request type (scamscan_rpc_total{method=...}).
+    """
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        method = type(request).__name__ if not isinstance(request, list) else "batch"
+        METRICS.inc("scamscan_rpc_total", method=method)
+        try:
+            return await super().__call__(request, ordered=ordered, flood_sleep_threshold=flood_sleep_threshold)
+        except FloodWaitError:
+            METRICS.inc("scamscan_rpc_errors_total", method=method, error="FloodWait")
+            raise
         except Exception as e:
-            print(f"❌ Failed to send message to chat '{getattr(chat, 'title', chat)}': {e}")
+            METRICS.inc("scamscan_rpc_errors_total", method=method, error=type(e).__name__)
+            raise
 
 # --- Github Auto Update ---
 _VERSION_RE = re.compile(r'^\s*__version__\s*=\s*["\']([^"\']+)["\']\s*$', re.MULTILINE)
@@ -267,7 +2416,7 @@ def fetch_remote_script_text(url: str) -> Optional[str]:
     Downloads the raw script text. Returns None on failure.
     """
     try:
-        r = requests.get(
+        r = http_session().get(
             url + "?" + str(time.time()),
             timeout=15,
             headers={"User-Agent": "ScamScan-Overwatch", 'Cache-Control': 'no-cache'},
@@ -278,6 +2427,23 @@ def fetch_remote_script_text(url: str) -> Optional[str]:
     except Exception:
         return None
 
+async def fetch_remote_script_text_async(url: str) -> Optional[str]:
+    """fetch_remote_script_text over the shared aiohttp session (or a worker thread without aiohttp)."""
+    session = await aiohttp_session()
+    if session is None:
+        return await asyncio.to_thread(fetch_remote_script_text, url)
+    try:
+        async with session.get(
+            url + "?" + str(time.time()),
+            timeout=aiohttp.ClientTimeout(total=15),
+            headers={"User-Agent": "ScamScan-Overwatch", 'Cache-Control': 'no-cache'},
+        ) as r:
+            if r.status != 200:
+                return None
+            return await r.text()
+    except Exception:
+        return None
+
 def check_for_update_once(
     local_version: str,
     local_force: bool,
@@ -290,6 +2456,36 @@ def check_for_update_once(
     Always returns a dict describing status.
     May call sys.exit if remote has force=True and local is behind.
     """
+    text = fetch_remote_script_text(raw_url)
+    return _update_check_result(text, local_version, local_force, raw_url, print_prefix=print_prefix)
+
+async def check_for_update_once_async(
+    local_version: str,
+    local_force: bool,
+    raw_url: str,
+    *,
+    print_prefix: str = "🔎 Update check",
+    exit_on_force: bool = True,
+) -> dict:
+    """
+    check_for_update_once without a worker thread. exit_on_force=False returns the result
+    (forced_update_required=True) instead of calling sys.exit, for callers running it
+    concurrently with startup that want to stop cleanly.
+    """
+    text = await fetch_remote_script_text_async(raw_url)
+    return _update_check_result(
+        text, local_version, local_force, raw_url, print_prefix=print_prefix, exit_on_force=exit_on_force,
+    )
+
+def _update_check_result(
+    text: Optional[str],
+    local_version: str,
+    local_force: bool,
+    raw_url: str,
+    *,
+    print_prefix: str,
+    exit_on_force: bool = True,
+) -> dict:
     result = {
         "ok": False,
         "local_version": local_version,
@@ -302,7 +2498,6 @@ def check_for_update_once(
         "url": raw_url,
     }
 
-    text = fetch_remote_script_text(raw_url)
     if not text:
         result["error"] = "fetch_failed"
         print(f"{print_prefix}: ⚠️ unable to fetch remote version info ({raw_url})")
@@ -338,7 +2533,8 @@ def check_for_update_once(
         print(f"   • Your version:  {local_version}")
         print(f"   • Required:      {remote_version}")
         print(f"   • Update from:   {raw_url}\n")
-        sys.exit(3)
+        if exit_on_force:
+            sys.exit(EXIT_FORCED_UPDATE)
 
     return result
 
@@ -352,11 +2548,9 @@ async def periodic_update_checker(
 ):
     """
     Runs update checks every interval_seconds until stop_event is set.
-    Uses asyncio.to_thread to keep requests off the event loop.
     """
     # Check immediately on start of this task too (optional but useful)
-    await asyncio.to_thread(
-        check_for_update_once,
+    await check_for_update_once_async(
         local_version,
         local_force,
         raw_url,
@@ -370,8 +2564,7 @@ async def periodic_update_checker(
         except asyncio.TimeoutError:
             pass
 
-        await asyncio.to_thread(
-            check_for_update_once,
+        await check_for_update_once_async(
             local_version,
             local_force,
             raw_url,
@@ -411,8 +2604,18 @@ async def scan_chat_for_scammers(
     chat,
     scammer_ids: Set[str],
     scammer_map: Dict[str, Dict[str, Any]],
-    report_mode: int
-):
+    report_mode: int,
+    sink: Optional[JsonlEventSink] = None,
+    observed: Optional[ObservedUsers] = None,
+    alerts: Optional[AlertRenderer] = None,
+    reports: Optional[ReportWriter] = None,
+    chat_stats: Optional[Dict[str, Any]] = None,
+) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+    """
+    Scans one chat's participant list.
+    Returns the list of (uid, display, topic_link) hits, or None if participants couldn't be read.
+    chat_stats, if given, is filled with {"participants": count, "sketch": _member_sketch(...)}.
+    """
     chat_title = getattr(chat, "title", str(chat))
     print(f"\n➡️ Checking chat: '{chat_title}' (ID: {chat.id})")
 
@@ -421,73 +2624,558 @@ async def scan_chat_for_scammers(
         participants = await client.get_participants(chat)
     except Exception as e:
         print(f"❌ Could not retrieve participants for '{chat_title}': {e}")
-        return
+        if sink is not None:
+            sink.emit("scan_chat_failed", chat_id=chat.id, chat_title=chat_title, error=str(e))
+        return None
+    if chat_stats is not None:
+        chat_stats["participants"] = len(participants)
+        chat_stats["sketch"] = _member_sketch(getattr(u, "id", 0) for u in participants)
 
+    alerts = alerts or AlertRenderer()
     scammers_found: List[Tuple[str, str, Optional[str]]] = []
     for user in participants:
         uid_str = str(user.id)
         if uid_str in scammer_ids:
-            info = scammer_map.get(uid_str, {})
-            display = scammer_display_name_from_v2(info) if info else name_for_telegram_user_fallback(user)
-            tlink = topic_link_for_scammer(info) if info else None
+            _observe_scammer(observed, user, "scan")
+            display, tlink, _, _ = alerts.scammer(uid_str, scammer_map, observed, name_for_telegram_user_fallback(user))
             scammers_found.append((uid_str, display, tlink))
 
-    if scammers_found:
-        print(f"🚨 Known scammer(s) found in '{chat_title}':")
-        for uid, display, tlink in scammers_found:
-            if tlink:
-                print(f"    ⚠️ {display} (id {uid}) topic: {tlink}")
-            else:
-                print(f"    ⚠️ {display} (id {uid})")
+    await _report_scan_hits(client, chat, scammers_found, report_mode, sink=sink, alerts=alerts, reports=reports)
+    return scammers_found
 
-        report = format_scammer_report(chat_title, scammers_found)
-        await send_report(client, report_mode, chat, report)
-    else:
+async def _report_scan_hits(
+    client: TelegramClient,
+    chat,
+    scammers_found: List[Tuple[str, str, Optional[str]]],
+    report_mode: int,
+    sink: Optional[JsonlEventSink] = None,
+    links: Optional[Dict[str, str]] = None,
+    source: str = "participants",
+    alerts: Optional[AlertRenderer] = None,
+    reports: Optional[ReportWriter] = None,
+):
+    """
+    Prints, emits and sends the report for one scanned chat. links: uid -> message link (history scans).
+    reports: the scan's ReportWriter (shared pacing, summary); default: a one-off writer for report_mode.
+    """
+    chat_title = getattr(chat, "title", str(chat))
+    if not scammers_found:
         print(f"✅ No scammers found in '{chat_title}'.")
+        return
+
+    if sink is not None:
+        extra = {} if source == "participants" else {"source": source}
+        for uid, display, tlink in scammers_found:
+            link = (links or {}).get(uid) or _chat_link(chat, chat.id)
+            sink.emit("scan_hit", chat_id=chat.id, chat_title=chat_title, user_id=uid,
+                      display=display, topic_link=tlink, link=link, **extra)
+
+    print(f"🚨 Known scammer(s) found in '{chat_title}':")
+    for uid, display, tlink in scammers_found:
+        if tlink:
+            print(f"    ⚠️ {display} (id {uid}) topic: {tlink}")
+        else:
+            print(f"    ⚠️ {display} (id {uid})")
+
+    await (reports or ReportWriter(client, report_mode, alerts=alerts)).chat_report(chat, scammers_found)
+
+# --- History scan (message senders + join/add service messages) ---
+SCAN_HISTORY_FILE = "scan_history.json"
+SCAN_HISTORY_LIMIT = 1000  # messages read per chat and run
+SCAN_SOURCES = ("participants", "history", "auto")
+
+def load_scan_history_cursors(path: str = SCAN_HISTORY_FILE) -> Dict[int, int]:
+    """chat id -> newest message id already scanned. Missing/corrupt file => {}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return {int(k): int(v) for k, v in (payload.get("chats", {}) or {}).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️ Failed to read history cursors ({path}); scanning from the newest messages: {e}")
+        return {}
+
+def save_scan_history_cursors(cursors: Dict[int, int], path: str = SCAN_HISTORY_FILE):
+    try:
+        payload = {"version": 1, "saved_at": int(time.time()),
+                   "chats": {str(k): v for k, v in sorted(cursors.items())}}
+        _write_file_atomic(path, json.dumps(payload, indent=2).encode("utf-8"))
+    except Exception as e:
+        print(f"⚠️ Failed to save history cursors: {e}")
+
+async def scan_chat_history_for_scammers(
+    client: TelegramClient,
+    chat,
+    scammer_ids: Set[str],
+    scammer_map: Dict[str, Dict[str, Any]],
+    report_mode: int,
+    sink: Optional[JsonlEventSink] = None,
+    cursors: Optional[Dict[int, int]] = None,
+    limit: int = SCAN_HISTORY_LIMIT,
+    observed: Optional[ObservedUsers] = None,
+    alerts: Optional[AlertRenderer] = None,
+    reports: Optional[ReportWriter] = None,
+) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+    """
+    Scans one chat's message history: senders plus users named in join/add service messages.
+    Works where the participant list is hidden (channels, restricted supergroups) and finds
+    scammers who posted and then left.
+
+    Without a cursor, reads the newest limit messages and sets cursors[chat.id] to the newest.
+    With one, reads at most limit messages after it, oldest first, and moves the cursor to the last
+    message read, so a rerun picks up where this one stopped and a backlog longer than limit is
+    covered over several runs instead of skipped.
+    Returns hits like scan_chat_for_scammers, or None if the history couldn't be read.
+    """
+    chat_title = getattr(chat, "title", str(chat))
+    min_id = (cursors or {}).get(chat.id, 0)
+    forward = min_id > 0  # from the cursor up; a first look starts at the newest messages
+    print(f"\n➡️ Checking chat history: '{chat_title}' (ID: {chat.id})"
+          + (f", messages after #{min_id}" if min_id else ""))
+
+    alerts = alerts or AlertRenderer()
+    scammers_found: List[Tuple[str, str, Optional[str]]] = []
+    links: Dict[str, str] = {}
+    last_id = min_id
+    read = 0
+    try:
+        async for msg in client.iter_messages(chat, limit=limit, min_id=min_id, reverse=forward):
+            read += 1
+            last_id = msg.id if forward else max(last_id, msg.id)
+            uids = _extract_action_user_ids(msg)
+            sender_id = getattr(msg, "sender_id", None)
+            if sender_id is not None:
+                uids = uids + [sender_id]
+            for uid in uids:
+                uid_str = str(uid)
+                if uid_str not in scammer_ids or uid_str in links:
+                    continue
+                sender = getattr(msg, "sender", None) if uid == sender_id else None
+                _observe_scammer(observed, sender, "history scan")
+                display, tlink, _, _ = alerts.scammer(
+                    uid_str, scammer_map, observed,
+                    name_for_telegram_user_fallback(sender) if sender is not None else None,
+                )
+                scammers_found.append((uid_str, display, tlink))
+                links[uid_str] = alerts.message_link(chat, chat.id, msg.id)
+    except Exception as e:
+        print(f"❌ Could not read message history for '{chat_title}': {e}")
+        if sink is not None:
+            sink.emit("scan_chat_failed", chat_id=chat.id, chat_title=chat_title, error=str(e), source="history")
+        return None
+
+    print(f"📜 Read {read} message(s) in '{chat_title}'"
+          + (" (limit reached; the rest next run)." if forward and read >= limit else "."))
+    if cursors is not None and last_id > min_id:
+        cursors[chat.id] = last_id
+
+    await _report_scan_hits(client, chat, scammers_found, report_mode, sink=sink, links=links, source="history",
+                            alerts=alerts, reports=reports)
+    return scammers_found
+
+# --- Scan checkpoints (resume an interrupted scan, chat order) ---
+SCAN_CHECKPOINT_FILE = "scan_checkpoint.json"
+SCAN_ORDERS = ("dialog", "size", "stale", "risk")
+
+class ScanCheckpoint:
+    """
+    Progress of the current scan plus what we know about each chat, in one JSON file:
+
+      run:   the scan in progress, None once it completed:
+             {"filter", "source", "started_at", "done": {chat_id: result or None}, "failed": [chat_id]}
+             result is the summary entry for a chat with hits (None: scanned, no hits)
+      chats: chat_id -> {"title", "last_scan", "participants", "scans", "hit_scans", "hits",
+             "churn", "seconds", "sketch"}, kept across runs for ordering and scheduling
+             (see _update_chat_meta)
+
+    Saved atomically after every chat, so a crash, FloodWait storm or Ctrl-C loses at most
+    the chats in flight. path=None keeps everything in memory.
+    """
+
+    def __init__(self, path: Optional[str] = SCAN_CHECKPOINT_FILE):
+        self.path = path
+        self.run: Optional[Dict[str, Any]] = None
+        self.chats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str = SCAN_CHECKPOINT_FILE) -> "ScanCheckpoint":
+        cp = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            cp.run = payload.get("run") or None
+            cp.chats = {str(k): v for k, v in (payload.get("chats") or {}).items() if isinstance(v, dict)}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to read scan checkpoint {path}; starting fresh: {e}")
+        return cp
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            payload = {"version": 1, "saved_at": int(time.time()), "run": self.run, "chats": self.chats}
+            _write_file_atomic(self.path, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        except Exception as e:
+            print(f"⚠️ Failed to save scan checkpoint: {e}")
+
+    def unfinished(self, chat_filter: str, source: str) -> bool:
+        """True if an interrupted run with the same chat filter and source can be resumed."""
+        return bool(self.run and self.run.get("filter") == chat_filter and self.run.get("source") == source)
+
+    def begin(self, chat_filter: str, source: str, resume: bool) -> int:
+        """Starts (or with resume, continues) a run. Returns how many chats are already done."""
+        if resume and self.unfinished(chat_filter, source):
+            self.run["failed"] = []  # failed chats are retried
+            return len(self.run["done"])
+        if resume:
+            print("ℹ️ No interrupted scan with this chat filter and source to resume; starting a new one.")
+        self.run = {"filter": chat_filter, "source": source, "started_at": int(time.time()), "done": {}, "failed": []}
+        self.save()
+        return 0
+
+    def is_done(self, chat_id: int) -> bool:
+        return self.run is not None and str(chat_id) in self.run["done"]
+
+    def record(self, chat, result: Optional[Dict[str, Any]], failed: bool = False,
+               chat_stats: Optional[Dict[str, Any]] = None):
+        key = str(chat.id)
+        if failed:
+            self.run["failed"].append(chat.id)
+        else:
+            self.run["done"][key] = result
+            hits = len(result["scammers"]) if result else 0
+            _update_chat_meta(self.chats.setdefault(key, {}), chat, hits, chat_stats or {})
+        self.save()
+
+    def results(self) -> List[Dict[str, Any]]:
+        return [r for r in (self.run or {}).get("done", {}).values() if r]
+
+    def finish(self):
+        self.run = None
+        self.save()
+
+# --- Scan scheduling (risk x staleness per cost, time / RPC budgets) ---
+SCAN_CHURN_SKETCH = 32              # member hashes kept per chat to estimate churn between scans
+SCAN_STALE_SECONDS = 7 * 86400      # a chat is "fully stale" a week after its last scan
+SCAN_PARTICIPANTS_PAGE = 200        # GetParticipants page size => RPCs per participant scan
+SCAN_RPC_SECONDS = 0.5              # assumed seconds per RPC until a chat has a measured scan time
+
+def _member_sketch(user_ids) -> List[int]:
+    """Bottom-k hash sketch of a member list: the SCAN_CHURN_SKETCH smallest 32-bit hashes of the ids."""
+    return heapq.nsmallest(SCAN_CHURN_SKETCH, {(int(uid) * 0x9E3779B1) & 0xFFFFFFFF for uid in user_ids})
+
+def _sketch_churn(old: List[int], new: List[int]) -> Optional[float]:
+    """1 - Jaccard similarity of two member lists, estimated from their sketches (None if unknown)."""
+    if not old or not new:
+        return None
+    a, b = set(old), set(new)
+    union = heapq.nsmallest(SCAN_CHURN_SKETCH, a | b)
+    return 1.0 - sum(1 for h in union if h in a and h in b) / len(union)
+
+def _update_chat_meta(meta: Dict[str, Any], chat, hits: int, chat_stats: Dict[str, Any]):
+    """
+    Folds one finished scan into a chat's metadata:
+      scans / hit_scans: how many scans ran / found someone (the historical hit rate)
+      hits: scammers found by the last scan; churn: share of members that changed since the
+      previous scan (participant scans only); seconds: how long the last scan took
+    """
+    meta["title"] = getattr(chat, "title", None)
+    meta["last_scan"] = int(time.time())
+    meta["scans"] = meta.get("scans", 0) + 1
+    meta["hit_scans"] = meta.get("hit_scans", 0) + (1 if hits else 0)
+    meta["hits"] = hits
+    if chat_stats.get("seconds") is not None:
+        meta["seconds"] = round(chat_stats["seconds"], 2)
+    if chat_stats.get("participants") is not None:
+        meta["participants"] = chat_stats["participants"]
+    if chat_stats.get("sketch") is not None:
+        churn = _sketch_churn(meta.get("sketch") or [], chat_stats["sketch"])
+        if churn is not None:
+            meta["churn"] = round(churn, 3)
+        meta["sketch"] = chat_stats["sketch"]
+
+def _chat_size(chat, checkpoint: ScanCheckpoint) -> int:
+    n = getattr(chat, "participants_count", None)
+    if n is None:
+        n = checkpoint.chats.get(str(chat.id), {}).get("participants")
+    return int(n or 0)
+
+def estimate_scan_cost(chat, checkpoint: ScanCheckpoint) -> Tuple[float, int]:
+    """(seconds, RPCs) one participant scan of chat is expected to take."""
+    rpcs = max(1, math.ceil(_chat_size(chat, checkpoint) / SCAN_PARTICIPANTS_PAGE))
+    seconds = checkpoint.chats.get(str(chat.id), {}).get("seconds")
+    return (float(seconds) if seconds is not None else rpcs * SCAN_RPC_SECONDS), rpcs
+
+def chat_scan_priority(chat, checkpoint: ScanCheckpoint, now: Optional[float] = None) -> float:
+    """
+    Expected value of scanning chat now, per RPC:
+      risk       (hit_scans + 1) / (scans + 2): chats where scammers turned up before come first
+      staleness  time since the last scan / SCAN_STALE_SECONDS, capped at 1 (never scanned: 1)
+      churn      members replaced between the last two scans (unknown: 0.5); busy chats let in more
+      size       log2(2 + participants): more members, more chances, with diminishing returns
+    """
+    now = now or time.time()
+    meta = checkpoint.chats.get(str(chat.id), {})
+    risk = (meta.get("hit_scans", 0) + 1) / (meta.get("scans", 0) + 2)
+    last = meta.get("last_scan")
+    staleness = 1.0 if last is None else min(1.0, max(0.0, now - last) / SCAN_STALE_SECONDS)
+    churn = meta.get("churn", 0.5)
+    value = (0.5 + risk) * staleness * (0.5 + churn) * math.log2(2 + _chat_size(chat, checkpoint))
+    return value / estimate_scan_cost(chat, checkpoint)[1]
+
+def plan_scan(
+    chats: List[Any],
+    checkpoint: ScanCheckpoint,
+    budget_seconds: Optional[float] = None,
+    budget_rpcs: Optional[int] = None,
+) -> Tuple[List[Any], List[Any]]:
+    """
+    Picks chats by chat_scan_priority until the estimated cost would exceed a budget
+    (chats that don't fit are skipped, smaller ones after them may still fit).
+    Returns (chats to scan, highest priority first; chats deferred to a later run).
+    """
+    now = time.time()
+    ranked = sorted(chats, key=lambda c: -chat_scan_priority(c, checkpoint, now))
+    if budget_seconds is None and budget_rpcs is None:
+        return ranked, []
+    selected, deferred = [], []
+    spent_seconds, spent_rpcs = 0.0, 0
+    for chat in ranked:
+        seconds, rpcs = estimate_scan_cost(chat, checkpoint)
+        if ((budget_seconds is not None and spent_seconds + seconds > budget_seconds)
+                or (budget_rpcs is not None and spent_rpcs + rpcs > budget_rpcs)):
+            deferred.append(chat)
+            continue
+        selected.append(chat)
+        spent_seconds += seconds
+        spent_rpcs += rpcs
+    return selected, deferred
+
+def order_chats_for_scan(chats: List[Any], order: str, checkpoint: ScanCheckpoint) -> List[Any]:
+    """
+    dialog: as listed; size: biggest first; stale: never/longest-ago scanned first (bigger first on ties);
+    risk: by chat_scan_priority (see plan_scan).
+    Sizes come from the entity's participants_count, else the last scan's participant count.
+    """
+    if order == "size":
+        return sorted(chats, key=lambda c: -_chat_size(c, checkpoint))
+    if order == "stale":
+        return sorted(chats, key=lambda c: (checkpoint.chats.get(str(c.id), {}).get("last_scan", 0),
+                                            -_chat_size(c, checkpoint)))
+    if order == "risk":
+        return plan_scan(chats, checkpoint)[0]
+    return list(chats)
+
+def _describe_budget(budget_seconds: Optional[float], budget_rpcs: Optional[int]) -> str:
+    parts = []
+    if budget_seconds is not None:
+        parts.append(f"{budget_seconds:.0f}s")
+    if budget_rpcs is not None:
+        parts.append(f"{budget_rpcs} RPCs")
+    return ", ".join(parts)
 
 async def check_chats_for_scammers(
     client: TelegramClient,
     chat_name: str,
     scammer_ids: Set[str],
     scammer_map: Dict[str, Dict[str, Any]],
-    report_mode: int
-):
+    report_mode: int,
+    concurrency: int = 1,
+    sink: Optional[JsonlEventSink] = None,
+    pause_seconds: float = 0.2,
+    source: str = "participants",
+    history_file: Optional[str] = SCAN_HISTORY_FILE,
+    history_limit: int = SCAN_HISTORY_LIMIT,
+    observed: Optional[ObservedUsers] = None,
+    alerts: Optional[AlertRenderer] = None,
+    reports: Optional[ReportWriter] = None,
+    checkpoint_file: Optional[str] = None,
+    resume: bool = False,
+    order: str = "dialog",
+    budget_seconds: Optional[float] = None,
+    budget_rpcs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Scans every chat matching chat_name.
+    concurrency > 1 scans that many chats at once (more FloodWait risk).
+    pause_seconds is slept after each chat.
+    source: "participants" (member lists), "history" (message senders and join/add service
+      messages, see scan_chat_history_for_scammers) or "auto" (history only where the member
+      list can't be read). History cursors are kept in history_file (None: not persisted).
+    observed: store that learns scammers' current usernames/names from what the scan sees.
+    alerts: AlertRenderer for the reports (default: built-in English templates).
+    reports: ReportWriter sending the reports (default: one for report_mode, without summary);
+      with summary=True its account-wide summary is sent once the scan is done.
+    checkpoint_file: ScanCheckpoint path, written after every chat (None: no checkpoint).
+      resume=True skips chats an interrupted run with the same chat_name/source already did
+      and merges their results into this summary; failed chats are retried.
+    order: "dialog", "size" (biggest first), "stale" (longest since last scan first) or
+      "risk" (chat_scan_priority: hit history x staleness x churn per RPC).
+    budget_seconds / budget_rpcs: scan only the highest-priority chats whose estimated cost
+      fits (plan_scan), and stop starting new chats once the real time / RPC count reaches it.
+      The rest is reported as chats_deferred; a budgeted run counts as complete.
+
+    Returns a summary:
+      { "chats_matched": int, "chats_scanned": int, "chats_failed": int, "chats_resumed": int,
+        "chats_deferred": int,
+        "results": [ {"chat_id", "chat_title", "scammers": [{"user_id", "display", "topic_link"}]} ] }
+    chats_scanned and results include the chats done by the resumed run.
+    """
+    summary: Dict[str, Any] = {
+        "chats_matched": 0,
+        "chats_scanned": 0,
+        "chats_failed": 0,
+        "chats_resumed": 0,
+        "chats_deferred": 0,
+        "results": [],
+    }
+
     matching_chats = await dialogs_matching(client, chat_name)
     if not matching_chats:
-        return
+        return summary
+    summary["chats_matched"] = len(matching_chats)
+
+    checkpoint = ScanCheckpoint.load(checkpoint_file) if checkpoint_file else ScanCheckpoint(None)
+    already = checkpoint.begin(chat_name, source, resume)
+    pending = [c for c in matching_chats if not checkpoint.is_done(c.id)]
+    done = len(matching_chats) - len(pending)  # before planning: deferred chats aren't done
+    budgeted = budget_seconds is not None or budget_rpcs is not None
+    deferred: List[Any] = []
+    if budgeted:
+        pending, deferred = plan_scan(pending, checkpoint, budget_seconds, budget_rpcs)
+        print(f"🗓️ Budget ({_describe_budget(budget_seconds, budget_rpcs)}): scanning {len(pending)} chat(s) "
+              f"by risk and staleness, {len(deferred)} deferred.")
+    else:
+        pending = order_chats_for_scan(pending, order, checkpoint)
+    if already:
+        summary["chats_resumed"] = done
+        print(f"⏯️ Resuming: {done} chat(s) already scanned, {len(matching_chats) - done} to go.")
+
+    cursors: Optional[Dict[int, int]] = None
+    if source != "participants":
+        cursors = load_scan_history_cursors(history_file) if history_file else {}
+    alerts = alerts or AlertRenderer()
+    reports = reports or ReportWriter(client, report_mode, alerts=alerts)
+
+    if already:
+        for r in checkpoint.results():
+            reports.collect(r["chat_title"], [(s["user_id"], s["display"], s["topic_link"]) for s in r["scammers"]])
+
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    offset = done
+
+    started = time.monotonic()
+    rpcs_at_start = METRICS.counter_total("scamscan_rpc_total")
+
+    def _budget_spent() -> bool:
+        if budget_seconds is not None and time.monotonic() - started >= budget_seconds:
+            return True
+        return budget_rpcs is not None and METRICS.counter_total("scamscan_rpc_total") - rpcs_at_start >= budget_rpcs
+
+    async def _scan_one(idx: int, chat):
+        chat_stats: Dict[str, Any] = {}
+        async with sem:
+            if budgeted and _budget_spent():
+                deferred.append(chat)
+                return
+            print(f"[{offset + idx + 1}/{len(matching_chats)}]")
+            t0 = time.monotonic()
+            found = None
+            if source != "history":
+                found = await scan_chat_for_scammers(client, chat, scammer_ids, scammer_map, report_mode, sink=sink,
+                                                     observed=observed, alerts=alerts, reports=reports,
+                                                     chat_stats=chat_stats)
+            if source == "history" or (source == "auto" and found is None):
+                if source == "auto":
+                    print("↪️ Falling back to message history.")
+                found = await scan_chat_history_for_scammers(client, chat, scammer_ids, scammer_map, report_mode,
+                                                             sink=sink, cursors=cursors, limit=history_limit,
+                                                             observed=observed, alerts=alerts, reports=reports)
+                if history_file and cursors is not None:
+                    save_scan_history_cursors(cursors, history_file)
+            chat_stats["seconds"] = time.monotonic() - t0
+            if pause_seconds:
+                await asyncio.sleep(pause_seconds)
+
+        if found is None:
+            checkpoint.record(chat, None, failed=True)
+            return
+        result = None
+        if found:
+            result = {
+                "chat_id": chat.id,
+                "chat_title": getattr(chat, "title", str(chat)),
+                "scammers": [
+                    {"user_id": uid, "display": display, "topic_link": tlink}
+                    for uid, display, tlink in found
+                ],
+            }
+        checkpoint.record(chat, result, chat_stats=chat_stats)
 
     print("\n📋 Starting scan...\n")
-    for idx, chat in enumerate(matching_chats, 1):
-        print(f"[{idx}/{len(matching_chats)}]")
-        await scan_chat_for_scammers(client, chat, scammer_ids, scammer_map, report_mode)
-        await asyncio.sleep(0.2)
+    completed = False
+    try:
+        if concurrency <= 1:
+            for idx, chat in enumerate(pending):
+                await _scan_one(idx, chat)
+        else:
+            await asyncio.gather(*(_scan_one(idx, chat) for idx, chat in enumerate(pending)))
+        completed = True
+    finally:
+        if not completed and checkpoint.path:
+            print(f"\n⏸️ Scan stopped after {len(checkpoint.run['done'])}/{len(matching_chats)} chat(s); "
+                  f"progress is in {checkpoint.path}, `scan --resume` continues.")
+
+    if deferred:
+        print(f"🗓️ {len(deferred)} chat(s) left for a later run (budget).")
+    summary["chats_scanned"] = len(checkpoint.run["done"])
+    summary["chats_failed"] = len(checkpoint.run["failed"])
+    summary["chats_deferred"] = len(deferred)
+    summary["results"] = checkpoint.results()
+    checkpoint.finish()
+    await reports.send_summary(summary["chats_scanned"], summary["chats_failed"])
+    return summary
 
 # --- Immunize mode (block scammers via usernames from unified API v2) ---
+def _normalize_username(u: Optional[str]) -> Optional[str]:
+    """'name' / '@name' -> '@name'; None / "" / "None" / "DELETED" -> None."""
+    u = (u or "").strip()
+    if not u or u.lower() in ("none", "deleted", "@"):
+        return None
+    return u if u.startswith("@") else "@" + u
+
 def build_usernames_to_block_from_v2(
     scammer_ids: Set[str],
-    scammer_map: Dict[str, Dict[str, Any]]
+    scammer_map: Dict[str, Dict[str, Any]],
+    observed: Optional[ObservedUsers] = None,
 ) -> List[str]:
     """
     Build a de-duped list of @usernames to block from v2 data.
     - Ignores username values that are None / "" / "None" / "DELETED"
     - Normalizes to "@username"
     - Dedupes case-insensitively
+    - With observed: the username we last saw the user under wins over the listed one
+      (a user seen without any username is skipped), and usernames that recently
+      failed to resolve are skipped
     """
     out: List[str] = []
     seen: Set[str] = set()
 
     for uid_str in scammer_ids:
         info = scammer_map.get(uid_str) or {}
-        u = (info.get("username") or "").strip()
-
-        if not u:
+        rec = observed.current(uid_str) if observed is not None else None
+        if rec is not None:
+            u = _normalize_username(rec.get("username"))
+        else:
+            u = _normalize_username(info.get("username"))
+        if u is None:
             continue
-        if u.lower() in ("none", "deleted"):
+        if observed is not None and observed.is_dead(u):
             continue
 
-        if not u.startswith("@"):
-            u = "@" + u
-
         key = u.lower()
         if key in seen:
             continue
@@ -497,9 +3185,18 @@ def build_usernames_to_block_from_v2(
     out.sort(key=lambda x: x.lower())
     return out
 
-async def block_usernames_slowly(client: TelegramClient, usernames: List[str], delay_seconds: int = 30):
+async def block_usernames_slowly(
+    client: TelegramClient,
+    usernames: List[str],
+    delay_seconds: int = 30,
+    observed: Optional[ObservedUsers] = None,
+    scammer_ids: Optional[Set[str]] = None,
+):
     """
     Tries to block each username, one every delay_seconds seconds.
+    With scammer_ids, a username that now resolves to an unlisted account (scammers
+    drop usernames and others pick them up) is not blocked. Resolved scammers are fed
+    into observed; usernames that don't resolve are remembered there as dead.
     """
     if not usernames:
         print("✅ No usernames qualified for blocking (recent + non-deleted).")
@@ -512,13 +3209,19 @@ async def block_usernames_slowly(client: TelegramClient, usernames: List[str], d
         print(f"[{idx}/{len(usernames)}] 🚫 Blocking {uname} ...")
         try:
             ent = await client.get_entity(uname)
-            await client(functions.contacts.BlockRequest(id=ent))
-            print(f"   ✅ Blocked {uname}")
+            if scammer_ids is not None and str(getattr(ent, "id", "")) not in scammer_ids:
+                print(f"   ⚠️ {uname} now belongs to an unlisted account ({getattr(ent, 'id', '?')}); not blocking")
+            else:
+                _observe_scammer(observed, ent, "immunize")
+                await client(functions.contacts.BlockRequest(id=ent))
+                print(f"   ✅ Blocked {uname}")
         except FloodWaitError as e:
             print(f"   ⏳ FloodWait: sleeping {e.seconds}s then continuing...")
-            await asyncio.sleep(e.seconds)
+            await _sleep_floodwait(e, "block")
         except (UsernameNotOccupiedError, UsernameInvalidError):
             print(f"   ⚠️ Username not resolvable/invalid: {uname} (skipping)")
+            if observed is not None:
+                observed.mark_dead(uname)
         except Exception as e:
             print(f"   ❌ Failed to block {uname}: {e}")
 
@@ -536,9 +3239,189 @@ async def immunize_against_scammers(
       - Block them one every 30 seconds
     """
     print("🛡️ Immunize mode selected (using unified API v2 usernames).")
-    usernames = build_usernames_to_block_from_v2(scammer_ids, scammer_map)
+    observed = ObservedUsers.load(OBSERVED_USERS_FILE)
+    usernames = build_usernames_to_block_from_v2(scammer_ids, scammer_map, observed)
     print(f"🧾 Usernames extracted from v2: {len(usernames)} (ignored None/DELETED/etc.)\n")
-    await block_usernames_slowly(client, usernames, delay_seconds=30)
+    try:
+        await block_usernames_slowly(client, usernames, delay_seconds=30, observed=observed, scammer_ids=scammer_ids)
+    finally:
+        observed.save()
+
+# --- Scammer lookup (id / username / name / topic) ---
+LOOKUP_BY = ("auto", "id", "username", "name", "topic")
+LOOKUP_DEFAULT_LIMIT = 10
+LOOKUP_MAX_LIMIT = 100
+LOOKUP_NAME_CANDIDATES = 2000   # fuzzy scoring is capped at this many token matches
+LOOKUP_FUZZY_VOCAB = 2000       # typo fallback compares against at most this many vocabulary words per token
+LOOKUP_CONCURRENCY = 2          # lookups computed at once (in worker threads) per local server
+_NAME_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def _name_tokens(text: Optional[str]) -> List[str]:
+    return _NAME_TOKEN_RE.findall((text or "").casefold())
+
+class ScammerLookup:
+    """
+    Read-only search indexes over one loaded scammer list (dict or CompactScammerIndex).
+
+      by id        -> the list itself
+      by username  -> case-insensitive, normalized like build_usernames_to_block_from_v2
+      by topic_id  -> int -> user ids
+      by name      -> token -> user ids; prefix match on tokens, ranked by difflib similarity
+
+    Built once per list object (source); callers rebuild when the list is swapped.
+    """
+
+    def __init__(self, scammer_map):
+        self.source = scammer_map
+        self._by_username: Dict[str, str] = {}
+        self._by_topic: Dict[int, List[str]] = defaultdict(list)
+        self._by_token: Dict[str, List[str]] = defaultdict(list)
+        for uid, info in scammer_map.items():
+            u = _normalize_username(info.get("username"))
+            if u is not None:
+                self._by_username[u[1:].casefold()] = uid
+            tid = info.get("topic_id")
+            if tid is not None:
+                try:
+                    self._by_topic[int(tid)].append(uid)
+                except (TypeError, ValueError):
+                    pass
+            for tok in set(_name_tokens(info.get("full_name"))):
+                self._by_token[sys.intern(tok)].append(uid)
+        self._vocab = sorted(self._by_token)
+
+    def _result(self, uid: str, match: str, score: float = 1.0) -> Optional[Dict[str, Any]]:
+        info = self.source.get(uid)
+        if info is None:
+            return None
+        return {
+            "user_id": uid,
+            "username": _normalize_username(info.get("username")),
+            "full_name": info.get("full_name"),
+            "display": scammer_display_name_from_v2(info),
+            "topic_id": info.get("topic_id"),
+            "topic_link": topic_link_for_scammer(info),
+            "reason": info.get("reason"),
+            "match": match,
+            "score": round(score, 3),
+        }
+
+    def by_id(self, uid) -> List[Dict[str, Any]]:
+        r = self._result(str(uid).strip(), "id")
+        return [r] if r else []
+
+    def by_username(self, name: str) -> List[Dict[str, Any]]:
+        uid = self._by_username.get((name or "").strip().lstrip("@").casefold())
+        r = self._result(uid, "username") if uid else None
+        return [r] if r else []
+
+    def by_topic(self, topic_id) -> List[Dict[str, Any]]:
+        try:
+            uids = self._by_topic.get(int(str(topic_id).strip().rstrip("/").rsplit("/", 1)[-1]), [])
+        except ValueError:
+            return []
+        return [r for r in (self._result(uid, "topic") for uid in uids) if r]
+
+    def by_name(self, query: str, limit: int = LOOKUP_DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        import difflib
+
+        q_tokens = _name_tokens(query)
+        if not q_tokens:
+            return []
+        # Start from the rarest query token (prefix match on the vocabulary), then keep narrowing
+        # by the other tokens as long as something is left, so "Bench Scammer 99" isn't drowned
+        # by thousands of "bench scammer"s and a partial name still finds something.
+        ranges = []
+        for tok in q_tokens:
+            lo = hi = bisect.bisect_left(self._vocab, tok)
+            size = 0
+            while hi < len(self._vocab) and self._vocab[hi].startswith(tok):
+                size += len(self._by_token[self._vocab[hi]])
+                hi += 1
+            if size:
+                ranges.append((size, tok, lo, hi))
+        ranges.sort()
+        candidates: Set[str] = set()
+        if ranges:
+            _, _, lo, hi = ranges[0]
+            for word in self._vocab[lo:hi]:
+                candidates.update(self._by_token[word])
+                if len(candidates) >= LOOKUP_NAME_CANDIDATES:
+                    break
+            names = {uid: _name_tokens((self.source.get(uid) or {}).get("full_name")) for uid in candidates}
+            for _, tok, _, _ in ranges[1:]:
+                narrowed = {uid for uid in candidates if any(t.startswith(tok) for t in names[uid])}
+                if not narrowed:
+                    break
+                candidates = narrowed
+        if not candidates:
+            # typo: nearest vocabulary words, only when prefixes found nothing. Bounded: just the
+            # words with the same first letter and about the same length (a typo in the first
+            # letter isn't found), at most LOOKUP_FUZZY_VOCAB of them per token.
+            for tok in q_tokens:
+                lo = bisect.bisect_left(self._vocab, tok[0])
+                pool = []
+                for word in itertools.islice(self._vocab, lo, None):
+                    if not word.startswith(tok[0]) or len(pool) >= LOOKUP_FUZZY_VOCAB:
+                        break
+                    if abs(len(word) - len(tok)) <= 2:
+                        pool.append(word)
+                for close in difflib.get_close_matches(tok, pool, n=3, cutoff=0.8):
+                    candidates.update(self._by_token[close])
+
+        needle = " ".join(q_tokens)
+        scored = []
+        for uid in list(candidates)[:LOOKUP_NAME_CANDIDATES]:
+            info = self.source.get(uid) or {}
+            name = " ".join(_name_tokens(info.get("full_name")))
+            scored.append((difflib.SequenceMatcher(None, needle, name).ratio(), uid))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [r for r in (self._result(uid, "name", score) for score, uid in scored[:limit]) if r]
+
+    def search(self, query: str, by: str = "auto", limit: int = LOOKUP_DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        by="auto": digits -> id, "@name" -> username, "topic:N" or a topic link -> topic,
+        otherwise an exact username, then a fuzzy name match.
+        """
+        query = (query or "").strip()
+        limit = max(1, min(int(limit), LOOKUP_MAX_LIMIT))
+        if by == "id":
+            return self.by_id(query)
+        if by == "username":
+            return self.by_username(query)
+        if by == "topic":
+            return self.by_topic(query.split(":", 1)[-1])[:limit]
+        if by == "name":
+            return self.by_name(query, limit)
+        if query.isdigit():
+            return self.by_id(query)
+        if query.startswith("@"):
+            return self.by_username(query)
+        if query.lower().startswith("topic:") or query.startswith(SCAMMER_TOPIC_BASE):
+            return self.by_topic(query.split(":", 1)[-1] if query.lower().startswith("topic:") else query)[:limit]
+        return self.by_username(query) or self.by_name(query, limit)
+
+async def shared_scammer_lookup(shared: Dict[str, Any]) -> ScammerLookup:
+    """
+    The lookup for the list currently in shared["scammer_map"]; rebuilt (off the loop) after a swap.
+    shared["lookup_lock"] makes concurrent first requests wait for one rebuild instead of each starting one.
+    """
+    lookup = shared.get("lookup")
+    if lookup is not None and lookup.source is shared["scammer_map"]:
+        return lookup
+    async with shared.setdefault("lookup_lock", asyncio.Lock()):
+        lookup = shared.get("lookup")
+        scammer_map = shared["scammer_map"]
+        if lookup is None or lookup.source is not scammer_map:
+            lookup = await asyncio.to_thread(ScammerLookup, scammer_map)
+            shared["lookup"] = lookup
+    return lookup
+
+def lookup_response(lookup: ScammerLookup, query: str, by: str = "auto", limit: int = LOOKUP_DEFAULT_LIMIT) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    results = lookup.search(query, by, limit)
+    METRICS.observe("scamscan_lookup_seconds", time.perf_counter() - t0, by=by)
+    return {"query": query, "by": by, "count": len(results), "results": results}
 
 # --- Overwatch mode helpers ---
 def _extract_action_user_ids(msg) -> list[int]:
@@ -571,13 +3454,11 @@ def _chat_link(entity, chat_id: int) -> str:
         return f"https://t.me/{uname}"
     return f"https://t.me/c/{_internal_id_from_peer(chat_id)}"
 
-def _chat_link_for_message(entity, chat_id: int, msg_id: int) -> str:
-    uname = getattr(entity, "username", None)
-    if uname:
-        return f"https://t.me/{uname}/{msg_id}"
-    return f"https://t.me/c/{_internal_id_from_peer(chat_id)}/{msg_id}"
-
-async def _build_group_allowlist(client: TelegramClient) -> Set[int]:
+async def _build_group_allowlist(client: TelegramClient, admin_chats: Optional[Dict[int, Any]] = None) -> Set[int]:
+    """
+    Chat ids of groups with >2 users. admin_chats, if given, is filled with chat id -> entity
+    for the supergroups among them whose admin log we can read (creator or admin).
+    """
     allow = set()
     dialogs = await client.get_dialogs()
     for d in dialogs:
@@ -589,6 +3470,8 @@ async def _build_group_allowlist(client: TelegramClient) -> Set[int]:
         pc = getattr(ent, "participants_count", None)
         if isinstance(pc, int) and pc > 2:
             allow.add(d.id)
+            if admin_chats is not None and isinstance(ent, Channel) and (ent.creator or ent.admin_rights):
+                admin_chats[d.id] = ent
     return allow
 
 async def _is_user_still_in_chat_via_common_chats(client: TelegramClient, user_id: int, chat_id: int) -> Optional[bool]:
@@ -609,7 +3492,7 @@ async def _is_user_still_in_chat_via_common_chats(client: TelegramClient, user_i
         return False
     except FloodWaitError as e:
         print(f"   ⏳ FloodWait in common chats check: sleeping {e.seconds}s")
-        await asyncio.sleep(e.seconds)
+        await _sleep_floodwait(e, "common_chats")
         return None
     except Exception as e:
         print('E-userfind', e)
@@ -631,7 +3514,7 @@ async def _send_saved_message_reminder_in_xm(client: TelegramClient, text: str):
         ))
     except FloodWaitError as e:
         print(f"   ⏳ FloodWait while scheduling reminder: sleeping {e.seconds}s then retrying once")
-        await asyncio.sleep(e.seconds)
+        await _sleep_floodwait(e, "saved_reminder")
         try:
             me_peer = await client.get_input_entity("me")
             schedule_date = datetime.now() + timedelta(minutes=5)
@@ -701,7 +3584,7 @@ async def _recent_participants_contains_user(
         return False
     except FloodWaitError as e:
         print(f"   ⏳ FloodWait in recent participants: sleeping {e.seconds}s")
-        await asyncio.sleep(e.seconds)
+        await _sleep_floodwait(e, "recent_participants")
         return None
     except Exception as e:
         # Often "CHAT_ADMIN_REQUIRED" or "CHANNEL_INVALID" or "not a channel"
@@ -760,7 +3643,7 @@ async def _verify_user_presence_stepped(
 
     except FloodWaitError as e:
         print(f"   ⏳ FloodWait in common chats check: sleeping {e.seconds}s")
-        await asyncio.sleep(e.seconds)
+        await _sleep_floodwait(e, "common_chats")
         return None, f"common_chats:floodwait ({how})"
 
     except Exception as e:
@@ -774,6 +3657,109 @@ async def _verify_user_presence_stepped(
             return None, f"common_chats:error ({how}) {e!r} -> recent_participants:unavailable"
         return None, f"common_chats:error ({how}) {e!r}"
 
+# --- Overwatch admin log (groups we moderate) ---
+OVERWATCH_ADMIN_LOG_SECONDS = 60     # poll interval
+OVERWATCH_ADMIN_LOG_LIMIT = 100      # events per page
+OVERWATCH_ADMIN_LOG_MAX_PAGES = 5    # per chat and poll
+
+ADMIN_LOG_MEMBERSHIP_FILTER = ChannelAdminLogEventsFilter(join=True, leave=True, invite=True, kick=True)
+
+def _participant_user_id(participant) -> Optional[int]:
+    uid = getattr(participant, "user_id", None)
+    if uid is None:
+        uid = getattr(getattr(participant, "peer", None), "user_id", None)
+    return uid
+
+def _admin_log_membership(event) -> List[Tuple[int, bool]]:
+    """
+    (user_id, is_member_afterwards) pairs for one admin log event; [] if it isn't a membership change.
+    """
+    action = event.action
+    if isinstance(action, (ChannelAdminLogEventActionParticipantJoin,
+                           ChannelAdminLogEventActionParticipantJoinByInvite,
+                           ChannelAdminLogEventActionParticipantJoinByRequest)):
+        return [(event.user_id, True)]
+    if isinstance(action, ChannelAdminLogEventActionParticipantLeave):
+        return [(event.user_id, False)]
+    if isinstance(action, ChannelAdminLogEventActionParticipantInvite):
+        uid = _participant_user_id(action.participant)
+        return [(uid, True)] if uid else []
+    if isinstance(action, ChannelAdminLogEventActionParticipantToggleBan):
+        new = action.new_participant
+        uid = _participant_user_id(new)
+        if not uid:
+            return []
+        if isinstance(new, ChannelParticipantLeft):
+            return [(uid, False)]
+        if isinstance(new, ChannelParticipantBanned):
+            rights = getattr(new, "banned_rights", None)
+            return [(uid, not (new.left or getattr(rights, "view_messages", False)))]
+    return []
+
+async def _fetch_admin_log_membership(client: TelegramClient, chat_entity, min_id: int,
+                                      max_id: int = 0) -> Tuple[List[Any], Dict[int, Any], bool]:
+    """
+    Membership events with min_id < id < max_id (max_id 0: up to the newest), oldest first, plus
+    the users they mention (id -> User) and whether the range was read down to min_id.
+    The log only pages newest-first, so after OVERWATCH_ADMIN_LOG_MAX_PAGES the older part of the
+    range is left unread (complete=False) for the caller to fetch next time.
+    """
+    events_: List[Any] = []
+    users: Dict[int, Any] = {}
+    complete = False
+    for _ in range(OVERWATCH_ADMIN_LOG_MAX_PAGES):
+        res = await client(functions.channels.GetAdminLogRequest(
+            channel=chat_entity, q="", max_id=max_id, min_id=min_id,
+            limit=OVERWATCH_ADMIN_LOG_LIMIT, events_filter=ADMIN_LOG_MEMBERSHIP_FILTER,
+        ))
+        page = list(getattr(res, "events", None) or [])
+        for u in getattr(res, "users", None) or []:
+            users[u.id] = u
+        events_.extend(page)
+        if len(page) < OVERWATCH_ADMIN_LOG_LIMIT:
+            complete = True
+            break
+        max_id = min(e.id for e in page)
+    events_.sort(key=lambda e: e.id)
+    return events_, users, complete
+
+async def _admin_log_head(client: TelegramClient, chat_entity) -> int:
+    """Id of the newest membership event in the chat's admin log (0 if it has none)."""
+    res = await client(functions.channels.GetAdminLogRequest(
+        channel=chat_entity, q="", max_id=0, min_id=0,
+        limit=1, events_filter=ADMIN_LOG_MEMBERSHIP_FILTER,
+    ))
+    page = list(getattr(res, "events", None) or [])
+    return page[0].id if page else 0
+
+async def _is_channel_participant(client: TelegramClient, chat_entity, user) -> Optional[bool]:
+    """Exact membership check (channels.GetParticipant); None if it can't be answered."""
+    try:
+        res = await client(functions.channels.GetParticipantRequest(channel=chat_entity, participant=user))
+    except UserNotParticipantError:
+        return False
+    except FloodWaitError as e:
+        await _sleep_floodwait(e, "get_participant")
+        return None
+    except Exception:
+        return None
+    p = getattr(res, "participant", None)
+    if isinstance(p, ChannelParticipantLeft):
+        return False
+    if isinstance(p, ChannelParticipantBanned):
+        return not (p.left or getattr(getattr(p, "banned_rights", None), "view_messages", False))
+    return True
+
+# --- Overwatch event pipeline ---
+OVERWATCH_EVENT_WORKERS = 4
+OVERWATCH_LOW_PRIORITY_MAX_QUEUED = 2000   # queued housekeeping events before new ones are shed
+OVERWATCH_DRAIN_SECONDS = 5.0              # on shutdown, time given to events still queued
+
+EVENT_PRIORITY_HIT = 0           # listed scammer posted / was added / joined / left
+EVENT_PRIORITY_MEMBERSHIP = 1    # membership change whose user still has to be resolved
+EVENT_PRIORITY_HOUSEKEEPING = 2  # someone else's scam alert: duplicate cleanup (report mode 3)
+EVENT_PRIORITY_NAMES = ("hit", "membership", "housekeeping")
+
 # --- Overwatch duplicate detection (mode 3) ---
 DUPLICATE_WINDOW_SECONDS = 10 * 60   # 10 minutes
 DUPLICATE_PRUNE_SECONDS  = 12 * 60   # prune slightly beyond window
@@ -795,6 +3781,40 @@ def _extract_uids_from_text(text: str) -> Set[str]:
 def _now_ts() -> float:
     return time.time()
 
+def _message_ts(msg) -> Optional[float]:
+    try:
+        return msg.date.timestamp() if msg is not None and msg.date else None
+    except Exception:
+        return None
+
+# --- Overwatch catch-up after downtime ---
+OVERWATCH_CATCH_UP_PER_CHAT = 300          # newest N missed messages per chat (3 history pages)
+OVERWATCH_CATCH_UP_MAX_MESSAGES = 5000     # total per start
+OVERWATCH_CATCH_UP_CHAT_DELAY = 1.0        # seconds between chats
+
+class _HistoryMessageEvent:
+    """
+    A Message from iter_messages() dressed up as a NewMessage event, so catch-up reuses
+    the live handler path.
+    """
+
+    def __init__(self, client, chat_id: int, message):
+        self.client = client
+        self.chat_id = chat_id
+        self.message = message
+        self.raw_text = getattr(message, "raw_text", None) or getattr(message, "message", "") or ""
+
+    async def get_chat(self):
+        chat = getattr(self.message, "chat", None)
+        return chat if chat is not None else await self.client.get_entity(self.chat_id)
+
+    async def get_sender(self):
+        sender = getattr(self.message, "sender", None)
+        if sender is not None:
+            return sender
+        sender_id = getattr(self.message, "sender_id", None)
+        return await self.client.get_entity(sender_id) if sender_id is not None else None
+
 # --- Overwatch auto-refresh helpers ---
 OVERWATCH_DIALOG_REFRESH_SECONDS = 12 * 60 * 60  # 12 hours
 OVERWATCH_SCAMMER_REFRESH_SECOND = 60 * 60  # 1 hour
@@ -806,72 +3826,442 @@ async def _refresh_scammer_data_periodically(
     refresh_seconds: int = OVERWATCH_SCAMMER_REFRESH_SECOND,
 ):
     """
-    Periodically refresh scammer_map + scammer_ids from Unified API v2.
-    Uses asyncio.to_thread so requests.get() doesn't block the event loop.
+    Periodically refresh scammer_map + scammer_ids from Unified API v2.
+    Uses a worker thread (or a worker process if state["parse_in_subprocess"]) so the
+    download and parse don't block the event loop.
+
+    With state["index_file"] set, the file is also checked every SHARED_INDEX_WATCH_SECONDS:
+    a version published by another process (atomic rename) is mapped without downloading.
+    """
+    index_file = state.get("index_file")
+    tick = min(SHARED_INDEX_WATCH_SECONDS, refresh_seconds) if index_file else refresh_seconds
+    next_fetch = time.monotonic() + refresh_seconds
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=tick)
+            break
+        except asyncio.TimeoutError:
+            pass
+
+        if index_file:
+            ident = index_file_identity(index_file)
+            current = getattr(state.get("scammer_map"), "identity", None)
+            if ident is not None and ident != current:
+                try:
+                    new_index = await asyncio.to_thread(CompactScammerIndex.open, index_file)
+                    async with _timed_lock(state_lock):
+                        state["scammer_map"] = new_index
+                        state["scammer_ids"] = new_index
+                    METRICS.inc("scamscan_scammer_refresh_total", result="reopened")
+                    METRICS.set_gauge("scamscan_scammer_list_size", len(new_index))
+                    print(f"🔁 Overwatch refresh: picked up new shared index: {len(new_index)} scammers.")
+                except Exception as e:
+                    print(f"⚠️ Overwatch refresh: couldn't open new shared index: {e}")
+            age = index_file_age(index_file)
+            if age is not None and age < refresh_seconds:
+                continue
+            if time.monotonic() < next_fetch:
+                continue  # stale, but our last attempt was recent
+        next_fetch = time.monotonic() + refresh_seconds
+
+        print("🔄 Overwatch refresh: fetching updated scammer list (v2) ...")
+        try:
+            with METRICS.time("scamscan_scammer_refresh_seconds"):
+                new_map, new_ids = await fetch_scammer_list(state.get("parse_in_subprocess", False), index_file)
+            if not new_ids:
+                METRICS.inc("scamscan_scammer_refresh_total", result="empty")
+                print("⚠️ Overwatch refresh: scammer list refresh returned empty; keeping old list.")
+                continue
+
+            async with _timed_lock(state_lock):
+                old_map = state.get("scammer_map")
+                if index_file and getattr(new_map, "identity", None) == getattr(old_map, "identity", False):
+                    new_map = new_ids = old_map  # unchanged file (304): keep the mapping and everything cached on it
+                changed = new_map is not old_map
+                state["scammer_map"] = new_map
+                state["scammer_ids"] = new_ids
+            if changed:
+                await refresh_scammer_cache(state.get("cache_file"), new_map)
+
+            METRICS.inc("scamscan_scammer_refresh_total", result="ok")
+            METRICS.set_gauge("scamscan_scammer_list_size", len(new_ids))
+            print(f"✅ Overwatch refresh: updated scammer list: {len(new_ids)} scammers.")
+        except Exception as e:
+            METRICS.inc("scamscan_scammer_refresh_total", result="error")
+            print(f"❌ Overwatch refresh: failed to update scammer list: {e}")
+
+async def _refresh_allowlist_periodically(
+    client: TelegramClient,
+    state: Dict[str, Any],
+    state_lock: asyncio.Lock,
+    stop_event: asyncio.Event,
+    refresh_seconds: int = OVERWATCH_DIALOG_REFRESH_SECONDS,
+    on_refresh=None,
+):
+    """
+    Periodically refresh the allowlist based on latest dialogs (>2 users).
+    on_refresh: optional coroutine function called with the new allowlist.
+    """
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=refresh_seconds)
+            break
+        except asyncio.TimeoutError:
+            pass
+
+        print("🔄 Overwatch refresh: fetching updated dialogs / allowlist ...")
+        try:
+            admin_chats: Dict[int, Any] = {}
+            new_allow = await _build_group_allowlist(client, admin_chats)
+            async with _timed_lock(state_lock):
+                state["allowlist"] = new_allow
+                state["admin_chats"] = admin_chats
+            METRICS.set_gauge("scamscan_allowlist_size", len(new_allow))
+            if on_refresh is not None:
+                await on_refresh(new_allow)
+            print(f"✅ Overwatch refresh: updated allowlist: {len(new_allow)} chats.")
+        except Exception as e:
+            print(f"❌ Overwatch refresh: failed to update allowlist: {e}")
+
+# --- Cross-process chat leases (SQLite) ---
+CHAT_LEASE_TTL_SECONDS = 90
+CHAT_LEASE_RENEW_SECONDS = 30
+REMOTE_OWNER = "<other process>"
+
+class ChatLeaseStore:
+    """
+    Lease table in a local SQLite file, shared by every scamscan process on the host.
+
+    Each (process, account) holder leases the chats in its allowlist for ttl seconds and
+    renews them periodically. A chat is leased by exactly one holder; when a holder stops
+    renewing (crash) its leases expire and another holder takes them over on its next
+    renewal. release() hands chats over immediately on a clean shutdown.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = CHAT_LEASE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        db = self._connect()
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_leases ("
+                " chat_id INTEGER PRIMARY KEY,"
+                " holder TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+        finally:
+            db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    @staticmethod
+    def holder_for(account: str) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{account}"
+
+    def sync(self, holder: str, chat_ids: Set[int]) -> Set[int]:
+        """
+        Claims/renews leases on chat_ids (free or expired ones only), drops this holder's
+        leases on chats no longer listed, and returns the chats this holder now owns.
+        """
+        now = time.time()
+        expires = now + self.ttl_seconds
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT INTO chat_leases (chat_id, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE chat_leases.holder = excluded.holder OR chat_leases.expires_at < ?",
+                [(int(c), holder, expires, now) for c in chat_ids],
+            )
+            held = {row[0] for row in db.execute("SELECT chat_id FROM chat_leases WHERE holder = ?", (holder,))}
+            stale = held - set(int(c) for c in chat_ids)
+            if stale:
+                db.executemany("DELETE FROM chat_leases WHERE chat_id = ? AND holder = ?",
+                               [(c, holder) for c in stale])
+            db.execute("COMMIT")
+            return held - stale
+        except Exception:
+            try:
+                db.execute("ROLLBACK")
+            except Exception:
+                pass
+            raise
+        finally:
+            db.close()
+
+    def release(self, holder: str):
+        db = self._connect()
+        try:
+            db.execute("DELETE FROM chat_leases WHERE holder = ?", (holder,))
+        finally:
+            db.close()
+
+# --- Overwatch startup timeline ---
+class StartupTimeline:
+    """
+    Start offset and duration of each startup step, relative to process start-up of Overwatch.
+    Steps run concurrently, so offsets matter as much as durations; "protecting" marks the
+    moment an account's handlers are live. Durations also go to scamscan_startup_seconds{step,account}.
     """
-    while not stop_event.is_set():
-        try:
-            await asyncio.wait_for(stop_event.wait(), timeout=refresh_seconds)
-            break
-        except asyncio.TimeoutError:
-            pass
 
-        print("🔄 Overwatch refresh: fetching updated scammer list (v2) ...")
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.steps: Dict[Tuple[str, Optional[str]], Tuple[float, float]] = {}
+
+    async def run(self, step: str, aw, account: Optional[str] = None):
+        start = time.perf_counter()
         try:
-            new_map, new_ids = await asyncio.to_thread(load_scammer_data_v2)
-            if not new_ids:
-                print("⚠️ Overwatch refresh: scammer list refresh returned empty; keeping old list.")
-                continue
+            return await aw
+        finally:
+            self.record(step, start, account)
+
+    def record(self, step: str, start: float, account: Optional[str] = None):
+        end = time.perf_counter()
+        self.steps[(step, account)] = (start - self.t0, end - start)
+        labels = {"step": step}
+        if account is not None:
+            labels["account"] = account
+        METRICS.set_gauge("scamscan_startup_seconds", end - start, **labels)
+
+    def mark(self, step: str, account: Optional[str] = None):
+        self.record(step, time.perf_counter(), account)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def format(self, account: Optional[str] = None) -> str:
+        """'step dur@offset' for process-wide steps plus this account's, in start order."""
+        rows = sorted(
+            ((off, dur, step) for (step, acc), (off, dur) in self.steps.items() if acc is None or acc == account),
+        )
+        return " · ".join(
+            f"{step} @{off:.2f}s" if dur < 0.0005 else f"{step} {dur:.2f}s (@{off:.2f}s)"
+            for off, dur, step in rows
+        )
 
-            async with state_lock:
-                state["scammer_map"] = new_map
-                state["scammer_ids"] = new_ids
+# --- Overwatch shared hub (several accounts, one process) ---
+def new_overwatch_shared(
+    scammer_map: Dict[str, Dict[str, Any]],
+    scammer_ids: Set[str],
+    leases: Optional[ChatLeaseStore] = None,
+    *,
+    ready: bool = True,
+) -> Dict[str, Any]:
+    """
+    State shared by every Overwatch account in this process:
+      - lock: guards the keys below
+      - scammer_map / scammer_ids: one copy of the list, refreshed once for everyone
+      - accounts: account name -> {"allowlist": Set[int], "client": TelegramClient}
+      - chat_owner: chat_id -> account name that watches it (each shared group is watched once);
+        REMOTE_OWNER if another process holds the lease
+      - leases: optional ChatLeaseStore coordinating ownership with other processes
+      - primary: account whose Saved Messages receive reminders
+      - login_lock: serializes interactive logins so prompts don't interleave
+      - lookup / lookup_lock: ScammerLookup over the current list (see shared_scammer_lookup)
+      - ready: set once handlers may act (update check passed and some list is loaded);
+        accounts connect and warm up before that. ready=False leaves it for the caller to set.
+      - timeline: StartupTimeline shared by the accounts
+      - cache_file: where refreshed lists are saved for the next start (None = don't)
+      - observed: ObservedUsers learning scammers' current usernames/names (None = don't track)
+      - alerts: AlertRenderer (templates + cached per-scammer / per-chat fragments)
+    """
+    ready_event = asyncio.Event()
+    if ready:
+        ready_event.set()
+    return {
+        "lock": asyncio.Lock(),
+        "scammer_map": scammer_map,
+        "scammer_ids": scammer_ids,
+        "accounts": {},
+        "chat_owner": {},
+        "leases": leases,
+        "primary": None,
+        "login_lock": asyncio.Lock(),
+        "lookup": None,
+        "lookup_lock": asyncio.Lock(),
+        "ready": ready_event,
+        "timeline": StartupTimeline(),
+        "cache_file": None,
+        "observed": None,
+        "alerts": AlertRenderer(),
+    }
 
-            print(f"✅ Overwatch refresh: updated scammer list: {len(new_ids)} scammers.")
-        except Exception as e:
-            print(f"❌ Overwatch refresh: failed to update scammer list: {e}")
+def overwatch_state_file_for(session: str) -> str:
+    """The default session keeps the historical file name; other sessions get their own file."""
+    if session == SESSION_NAME:
+        return OVERWATCH_STATE_FILE
+    return f"overwatch_state_{session}.json"
 
-async def _refresh_allowlist_periodically(
-    client: TelegramClient,
-    state: Dict[str, Any],
-    state_lock: asyncio.Lock,
+def _reassign_chat_owners(shared: Dict[str, Any]):
+    """
+    Keeps existing owners while they still list the chat; orphaned chats go to the
+    first remaining account (in registration order) whose allowlist contains them.
+    Caller holds shared["lock"].
+    """
+    accounts = shared["accounts"]
+    owners = shared["chat_owner"]
+    for chat_id, owner in list(owners.items()):
+        if owner not in accounts or chat_id not in accounts[owner]["allowlist"]:
+            owners.pop(chat_id, None)
+    for name, acc in accounts.items():
+        for chat_id in acc["allowlist"]:
+            owners.setdefault(chat_id, name)
+
+    if shared["primary"] not in accounts:
+        shared["primary"] = next(iter(accounts), None)
+
+async def _sync_chat_leases(shared: Dict[str, Any]):
+    """
+    Renews/claims leases for every local account (registration order) and rebuilds
+    chat_owner from the result. Caller holds shared["lock"].
+    If the lease DB fails we fall back to local ownership: duplicate alerts beat missed ones.
+    """
+    store: ChatLeaseStore = shared["leases"]
+    owners: Dict[int, str] = {}
+    try:
+        for name, acc in shared["accounts"].items():
+            owned = await asyncio.to_thread(store.sync, ChatLeaseStore.holder_for(name), acc["allowlist"])
+            for chat_id in owned:
+                owners.setdefault(chat_id, name)
+            for chat_id in acc["allowlist"]:
+                owners.setdefault(chat_id, REMOTE_OWNER)
+    except Exception as e:
+        METRICS.inc("scamscan_lease_errors_total")
+        print(f"⚠️ Chat leases: {e}; falling back to local ownership.")
+        _reassign_chat_owners(shared)
+        return
+
+    shared["chat_owner"] = owners
+    if shared["primary"] not in shared["accounts"]:
+        shared["primary"] = next(iter(shared["accounts"]), None)
+    METRICS.set_gauge("scamscan_chats_remote_owned", sum(1 for o in owners.values() if o == REMOTE_OWNER))
+
+async def _register_overwatch_account(shared: Dict[str, Any], account: str, client, allowlist: Set[int]) -> int:
+    """Adds/updates an account's allowlist; returns how many chats it ends up owning."""
+    async with _timed_lock(shared["lock"], "shared_lock"):
+        shared["accounts"][account] = {"allowlist": set(allowlist), "client": client}
+        if shared.get("leases") is not None:
+            await _sync_chat_leases(shared)
+        else:
+            _reassign_chat_owners(shared)
+        owned = sum(1 for o in shared["chat_owner"].values() if o == account)
+    METRICS.set_gauge("scamscan_chats_owned", owned, account=account)
+    return owned
+
+async def _unregister_overwatch_account(shared: Dict[str, Any], account: str):
+    """Drops an account (disconnect/crash); its chats fail over to other accounts right away."""
+    async with _timed_lock(shared["lock"], "shared_lock"):
+        shared["accounts"].pop(account, None)
+        store = shared.get("leases")
+        if store is not None:
+            try:
+                await asyncio.to_thread(store.release, ChatLeaseStore.holder_for(account))
+            except Exception as e:
+                print(f"⚠️ Chat leases: failed to release leases for '{account}': {e}")
+            await _sync_chat_leases(shared)
+        else:
+            _reassign_chat_owners(shared)
+    METRICS.set_gauge("scamscan_chats_owned", 0, account=account)
+
+async def _renew_chat_leases_periodically(
+    shared: Dict[str, Any],
     stop_event: asyncio.Event,
-    refresh_seconds: int = OVERWATCH_DIALOG_REFRESH_SECONDS,
+    renew_seconds: int = CHAT_LEASE_RENEW_SECONDS,
 ):
     """
-    Periodically refresh the allowlist based on latest dialogs (>2 users).
+    Keeps our leases alive and picks up chats whose holder (in any process) went away.
     """
     while not stop_event.is_set():
         try:
-            await asyncio.wait_for(stop_event.wait(), timeout=refresh_seconds)
+            await asyncio.wait_for(stop_event.wait(), timeout=renew_seconds)
             break
         except asyncio.TimeoutError:
             pass
 
-        print("🔄 Overwatch refresh: fetching updated dialogs / allowlist ...")
-        try:
-            new_allow = await _build_group_allowlist(client)
-            async with state_lock:
-                state["allowlist"] = new_allow
-            print(f"✅ Overwatch refresh: updated allowlist: {len(new_allow)} chats.")
-        except Exception as e:
-            print(f"❌ Overwatch refresh: failed to update allowlist: {e}")
-
-# --- NEW: Overwatch life-check (restart if no messages in 4h) ---
-OVERWATCH_LIFE_CHECK_SECONDS = 5 * 60          # check every 5 minutes
-OVERWATCH_NO_MESSAGE_RESTART_SECONDS = 4 * 60 * 60  # 4 hours
-
-async def _life_check_periodically(
+        async with _timed_lock(shared["lock"], "shared_lock"):
+            before = dict(shared["chat_owner"])
+            await _sync_chat_leases(shared)
+            after = shared["chat_owner"]
+        for name in shared["accounts"]:
+            gained = sum(1 for c, o in after.items() if o == name and before.get(c) != name)
+            lost = sum(1 for c, o in before.items() if o == name and after.get(c) != name)
+            METRICS.set_gauge("scamscan_chats_owned", sum(1 for o in after.values() if o == name), account=name)
+            if gained or lost:
+                print(f"🔀 Chat leases: '{name}' took over {gained} chat(s), handed off {lost}.")
+
+def _alert_client(shared: Dict[str, Any], fallback):
+    """Client of the primary account (Saved Messages reminders all land in one inbox)."""
+    acc = shared["accounts"].get(shared.get("primary"))
+    return acc["client"] if acc else fallback
+
+def _start_overwatch_process_tasks(
+    shared: Dict[str, Any],
+    stop_event: asyncio.Event,
+    *,
+    sink: Optional["JsonlEventSink"],
+    recorder: Optional["UpdateRecorder"],
+    metrics_interval: int,
+    check_updates: bool,
+) -> List[asyncio.Task]:
+    """
+    Once-per-process background work: scammer list refresh, update checks,
+    sink/recorder flushing, saving observed identities and the metrics summary line.
+    """
+    tasks = [asyncio.create_task(_refresh_scammer_data_periodically(shared, shared["lock"], stop_event))]
+    if shared.get("leases") is not None:
+        tasks.append(asyncio.create_task(_renew_chat_leases_periodically(shared, stop_event)))
+    if check_updates:
+        tasks.append(asyncio.create_task(periodic_update_checker(stop_event, local_version=__version__, local_force=__force__, raw_url=GITHUB_RAW_URL, interval_seconds=UPDATE_CHECK_SECONDS)))
+    if sink is not None:
+        tasks.append(asyncio.create_task(sink.run_flusher(stop_event)))
+    if recorder is not None:
+        tasks.append(asyncio.create_task(recorder.run_flusher(stop_event)))
+    if shared.get("observed") is not None:
+        tasks.append(asyncio.create_task(shared["observed"].run_saver(stop_event)))
+    if metrics_interval and metrics_interval > 0:
+        tasks.append(asyncio.create_task(_metrics_summary_periodically(stop_event, metrics_interval)))
+    return tasks
+
+# --- Overwatch liveness (GetState pings, catch up on update gaps) ---
+OVERWATCH_LIFE_CHECK_SECONDS = 5 * 60          # ping every 5 minutes
+OVERWATCH_PING_TIMEOUT_SECONDS = 30
+OVERWATCH_PING_FAILURES_RESTART = 3            # consecutive failed pings => reconnect
+OVERWATCH_CATCH_UP_IDLE_SECONDS = 30 * 60      # no updates for 30 minutes => fetch the difference
+
+async def _liveness_check_periodically(
+    client,
     state: Dict[str, Any],
     state_lock: asyncio.Lock,
     stop_event: asyncio.Event,
     refresh_seconds: int = OVERWATCH_LIFE_CHECK_SECONDS,
-    no_msg_seconds: int = OVERWATCH_NO_MESSAGE_RESTART_SECONDS,
+    ping_timeout: float = OVERWATCH_PING_TIMEOUT_SECONDS,
+    max_failures: int = OVERWATCH_PING_FAILURES_RESTART,
+    idle_catch_up_seconds: int = OVERWATCH_CATCH_UP_IDLE_SECONDS,
+    on_restart=None,
+    account: str = SESSION_NAME,
 ):
     """
-    If no messages (from anyone) have been seen in no_msg_seconds, request restart.
-    We only track NewMessage events (messages), as requested.
+    Watches the connection through MTProto update state instead of chat traffic.
+
+    Every refresh_seconds it pings updates.GetState:
+      - pts/qts moved but no update reached us since the last ping => updates were lost,
+        client.catch_up() fetches the difference so the handlers still see them
+      - no update at all for idle_catch_up_seconds => catch_up() too (a quiet night is not a
+        reason to restart; a stalled channel gets unstuck)
+      - first good ping after failed ones => catch_up() for whatever the blip cost us
+      - max_failures failed pings in a row => request a restart. on_restart is awaited
+        afterwards (Overwatch passes client.disconnect so run_until_disconnected() returns
+        and the caller reconnects in-process).
+    Update arrival is read from state["last_update_ts"] (set by a Raw handler);
+    state["alive_since"] bounds the idle time after a (re)start.
     """
+    last_state: Optional[Tuple[int, int]] = None   # (pts, qts) from the previous good ping
+    last_ping_ts = time.time()
+    last_catch_up_ts = 0.0
+    failures = 0
     while not stop_event.is_set():
         try:
             await asyncio.wait_for(stop_event.wait(), timeout=refresh_seconds)
@@ -879,28 +4269,65 @@ async def _life_check_periodically(
         except asyncio.TimeoutError:
             pass
 
-        now = time.time()
-        async with state_lock:
-            last_msg_ts = state.get("last_message_ts", None)
-            restarting = state.get("restart_requested", False)
+        async with _timed_lock(state_lock):
+            if state.get("restart_requested", False):
+                return
+            last_update_ts = max(float(state.get("last_update_ts") or 0.0),
+                                 float(state.get("last_message_ts") or 0.0),
+                                 float(state.get("alive_since") or 0.0))
 
-        if restarting:
+        try:
+            if not client.is_connected():
+                raise ConnectionError("client is not connected")
+            st = await asyncio.wait_for(client(functions.updates.GetStateRequest()), timeout=ping_timeout)
+        except FloodWaitError as e:
+            # Telegram answered, so the connection is fine; ping again next round
+            METRICS.inc("scamscan_liveness_pings_total", result="flood_wait", account=account)
+            print(f"⚠️ Liveness: GetState hit FloodWait ({e.seconds}s); skipping this ping.")
+            continue
+        except Exception as e:
+            failures += 1
+            METRICS.inc("scamscan_liveness_pings_total", result="failed", account=account)
+            print(f"⚠️ Liveness: GetState ping failed ({failures}/{max_failures}): {e!r}")
+            if failures < max_failures:
+                continue
+            async with _timed_lock(state_lock):
+                state["restart_requested"] = True
+            print(f"🧯 LIVENESS: {failures} pings in a row failed. Requesting restart...")
+            stop_event.set()
+            if on_restart is not None:
+                try:
+                    await on_restart()
+                except Exception as e:
+                    print(f"⚠️ Liveness: restart hook failed: {e}")
             return
 
-        if last_msg_ts is None:
-            # Haven't seen any message since starting; don't immediately restart.
+        METRICS.inc("scamscan_liveness_pings_total", result="ok", account=account)
+        now = time.time()
+        cur_state = (int(getattr(st, "pts", 0) or 0), int(getattr(st, "qts", 0) or 0))
+        reason = None
+        if failures:
+            reason = "recovered"
+        elif (last_state is not None and last_update_ts < last_ping_ts
+              and (cur_state[0] > last_state[0] or cur_state[1] > last_state[1])):
+            reason = "gap"
+        elif now - max(last_update_ts, last_catch_up_ts) >= idle_catch_up_seconds:
+            reason = "idle"
+        failures = 0
+        last_state = cur_state
+        last_ping_ts = now
+        if reason is None:
             continue
 
-        idle = now - float(last_msg_ts)
-        if idle >= no_msg_seconds:
-            async with state_lock:
-                # double-check inside lock
-                if not state.get("restart_requested", False):
-                    state["restart_requested"] = True
-            print(f"🧯 LIFE CHECK: no messages seen for {idle/3600:.2f} hours. Requesting restart...")
-            stop_event.set()
-            return
-            
+        METRICS.inc("scamscan_catch_up_total", reason=reason, account=account)
+        if reason != "idle":
+            print(f"🔄 Liveness: catching up on missed updates ({reason}).")
+        try:
+            await client.catch_up()
+        except Exception as e:
+            print(f"⚠️ Liveness: catch_up failed: {e}")
+        last_catch_up_ts = time.time()
+
 # --- Overwatch persistent state ---
 OVERWATCH_STATE_FILE = "overwatch_state.json"
 OVERWATCH_STATE_SAVE_SECONDS = 60  # save once a minute
@@ -920,25 +4347,29 @@ def _decode_key(s: str, n_parts: int) -> Optional[Tuple[str, ...]]:
     except Exception:
         return None
 
-def load_overwatch_state_from_disk() -> Dict[str, Any]:
+def load_overwatch_state_from_disk(path: str = OVERWATCH_STATE_FILE) -> Dict[str, Any]:
     """
     Returns a dict with keys:
       - allowlist: Set[int]
       - last_message_ts: Optional[float]
       - group_last_sent: Dict[Tuple[int,str], float]
       - last_notified: Dict[Tuple[str,int,str,str], float]
+      - chat_last_seen: Dict[int, Tuple[int, float]]  (chat -> last message id seen, its time)
+      - admin_log_cursors: Dict[int, int]  (chat -> admin log event id everything up to is processed)
     Missing/corrupt file => returns empty defaults.
     """
-    if not os.path.exists(OVERWATCH_STATE_FILE):
+    if not os.path.exists(path):
         return {
             "allowlist": set(),
             "last_message_ts": None,
             "group_last_sent": {},
             "last_notified": {},
+            "chat_last_seen": {},
+            "admin_log_cursors": {},
         }
 
     try:
-        with open(OVERWATCH_STATE_FILE, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             payload = json.load(f)
         if not isinstance(payload, dict):
             raise ValueError("state payload not a dict")
@@ -950,6 +4381,8 @@ def load_overwatch_state_from_disk() -> Dict[str, Any]:
                 "last_message_ts": None,
                 "group_last_sent": {},
                 "last_notified": {},
+                "chat_last_seen": {},
+                "admin_log_cursors": {},
             }
 
         allowlist = set()
@@ -992,10 +4425,25 @@ def load_overwatch_state_from_disk() -> Dict[str, Any]:
             except Exception:
                 continue
 
+        chat_last_seen: Dict[int, Tuple[int, float]] = {}
+        for k, v in (payload.get("chat_last_seen", {}) or {}).items():
+            try:
+                chat_last_seen[int(k)] = (int(v[0]), float(v[1]))
+            except Exception:
+                continue
+
+        admin_log_cursors: Dict[int, int] = {}
+        for k, v in (payload.get("admin_log_cursors", {}) or {}).items():
+            try:
+                admin_log_cursors[int(k)] = int(v)
+            except Exception:
+                continue
+
         print(f"💾 Loaded overwatch state from disk: "
               f"allowlist={len(allowlist)}, "
               f"group_last_sent={len(group_last_sent)}, "
               f"last_notified={len(last_notified)}, "
+              f"chat_last_seen={len(chat_last_seen)}, "
               f"last_message_ts={'set' if last_message_ts else 'None'}")
 
         return {
@@ -1003,6 +4451,8 @@ def load_overwatch_state_from_disk() -> Dict[str, Any]:
             "last_message_ts": last_message_ts,
             "group_last_sent": group_last_sent,
             "last_notified": last_notified,
+            "chat_last_seen": chat_last_seen,
+            "admin_log_cursors": admin_log_cursors,
         }
 
     except Exception as e:
@@ -1012,6 +4462,8 @@ def load_overwatch_state_from_disk() -> Dict[str, Any]:
             "last_message_ts": None,
             "group_last_sent": {},
             "last_notified": {},
+            "chat_last_seen": {},
+            "admin_log_cursors": {},
         }
 
 def save_overwatch_state_to_disk(
@@ -1019,9 +4471,13 @@ def save_overwatch_state_to_disk(
     last_message_ts: Optional[float],
     group_last_sent: Dict[Tuple[int, str], float],
     last_notified: Dict[Tuple[str, int, str, str], float],
+    path: str = OVERWATCH_STATE_FILE,
+    chat_last_seen: Optional[Dict[int, Tuple[int, float]]] = None,
+    admin_log_cursors: Optional[Dict[int, int]] = None,
 ):
     """
-    Writes state to OVERWATCH_STATE_FILE (overwrite, not atomic).
+    Writes state to path (overwrite, not atomic).
+    chat_last_seen / admin_log_cursors are only kept for chats still in the allowlist.
     """
     try:
         payload = {
@@ -1037,8 +4493,18 @@ def save_overwatch_state_to_disk(
                 _encode_key([kind, chat_id, uid_str, extra_key]): ts
                 for (kind, chat_id, uid_str, extra_key), ts in last_notified.items()
             },
+            "chat_last_seen": {
+                str(chat_id): [msg_id, ts]
+                for chat_id, (msg_id, ts) in (chat_last_seen or {}).items()
+                if chat_id in allowlist
+            },
+            "admin_log_cursors": {
+                str(chat_id): event_id
+                for chat_id, event_id in (admin_log_cursors or {}).items()
+                if chat_id in allowlist
+            },
         }
-        with open(OVERWATCH_STATE_FILE, "w", encoding="utf-8") as f:
+        with open(path, "w", encoding="utf-8") as f:
             json.dump(payload, f, indent=2)
     except Exception as e:
         print(f"⚠️ Failed to save overwatch state: {e}")
@@ -1048,6 +4514,7 @@ async def _persist_overwatch_state_periodically(
     state_lock: asyncio.Lock,
     stop_event: asyncio.Event,
     save_seconds: int = OVERWATCH_STATE_SAVE_SECONDS,
+    path: str = OVERWATCH_STATE_FILE,
 ):
     """
     Periodically snapshots state and writes it to disk.
@@ -1060,7 +4527,7 @@ async def _persist_overwatch_state_periodically(
             pass
 
         try:
-            async with state_lock:
+            async with _timed_lock(state_lock):
                 allowlist = set(state.get("allowlist", set()))
                 last_message_ts = state.get("last_message_ts", None)
                 group_last_sent = state.get("group_last_sent", {})
@@ -1069,42 +4536,211 @@ async def _persist_overwatch_state_periodically(
                 # shallow copy so we don't serialize while dict is mutating
                 group_last_sent_copy = dict(group_last_sent)
                 last_notified_copy = dict(last_notified)
+                chat_last_seen_copy = dict(state.get("chat_last_seen", {}))
+                admin_log_cursors_copy = dict(state.get("admin_log_cursors", {}))
 
             save_overwatch_state_to_disk(
                 allowlist=allowlist,
                 last_message_ts=last_message_ts,
                 group_last_sent=group_last_sent_copy,
                 last_notified=last_notified_copy,
+                path=path,
+                chat_last_seen=chat_last_seen_copy,
+                admin_log_cursors=admin_log_cursors_copy,
             )
         except Exception as e:
             print(f"⚠️ Persist task error: {e}")
 
 
-async def run_overwatch_forever(api_id, api_hash, overwatch_report_mode):
+async def run_overwatch_forever(
+    api_id,
+    api_hash,
+    overwatch_report_mode,
+    *,
+    interactive: bool = True,
+    sessions: Optional[List[str]] = None,
+    lease_db: Optional[str] = None,
+    parse_in_subprocess: bool = False,
+    index_file: Optional[str] = None,
+    sink: Optional[JsonlEventSink] = None,
+    recorder: Optional[UpdateRecorder] = None,
+    metrics_port: Optional[int] = None,
+    metrics_host: str = METRICS_HTTP_HOST,
+    metrics_interval: int = METRICS_SUMMARY_SECONDS,
+    startup_update: Optional[asyncio.Task] = None,
+    lookup_socket: Optional[str] = None,
+    alerts: Optional[AlertRenderer] = None,
+):
+    """
+    Keeps Overwatch running, reconnecting with backoff.
+    interactive=False never prompts: returns EXIT_NOT_AUTHORIZED if the session needs a login.
+    sessions: Telethon session names to run on this event loop (default: [SESSION_NAME]).
+      All accounts share one scammer list, refresher, metrics and alert inbox.
+    lease_db: SQLite file used to split shared groups between Overwatch processes on this host.
+    parse_in_subprocess: download/parse/index the list in a worker process (large payloads).
+    index_file: map the host-wide shared index at this path instead of a private copy of the list.
+    metrics_port: if set, serve Prometheus text on http://metrics_host:metrics_port/metrics,
+      plus scammer lookups from the in-memory list on /lookup.
+    lookup_socket: also serve /lookup (and /metrics) on this Unix socket.
+    alerts: AlertRenderer for alert text (default: load_alert_renderer(), i.e. alert_templates.json if present).
+    startup_update: task from _startup_update_check(), awaited while the list downloads;
+      returns EXIT_FORCED_UPDATE if upstream forces an update.
+    """
+    sessions = list(dict.fromkeys(sessions or [SESSION_NAME]))
+
+    leases = None
+    if lease_db:
+        try:
+            leases = ChatLeaseStore(lease_db)
+            print(f"🔐 Chat leases: coordinating shared groups via {lease_db}")
+        except Exception as e:
+            print(f"⚠️ Chat leases unavailable ({lease_db}): {e}; every account watches its own groups.")
+
+    # Startup runs as a pipeline: the update check, the fresh list download and every
+    # account's connect/get_me/state load overlap. Handlers go live ("ready") as soon as
+    # the update check passed and *a* list is there — the cached one if we have it — and
+    # the fresh list / dialog crawl are reconciled in when they land.
+    shared = new_overwatch_shared({}, set(), leases=leases, ready=False)
+    shared["parse_in_subprocess"] = parse_in_subprocess
+    shared["index_file"] = index_file
+    shared["cache_file"] = None if index_file else SCAMMER_CACHE_FILE
+    shared["observed"] = ObservedUsers.load(OBSERVED_USERS_FILE)
+    shared["alerts"] = alerts or load_alert_renderer()
+    timeline = shared["timeline"]
+
+    servers = []
+
+    async def lookup_provider():
+        return await shared_scammer_lookup(shared)
+
+    if metrics_port:
+        try:
+            servers.append(await start_metrics_http_server(metrics_port, metrics_host, lookup_provider))
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint unavailable on {metrics_host}:{metrics_port}: {e}")
+    if lookup_socket:
+        try:
+            servers.append(await start_lookup_unix_server(lookup_socket, lookup_provider))
+        except (OSError, NotImplementedError, AttributeError) as e:
+            print(f"⚠️ Lookup socket unavailable at {lookup_socket}: {e}")
+
+    cached = await timeline.run("list_cache", asyncio.to_thread(open_scammer_cache, index_file or SCAMMER_CACHE_FILE))
+    if cached is not None:
+        age = index_file_age(cached.path) or 0
+        print(f"⚡ Using cached scammer list ({len(cached)} scammers, {age / 60:.0f} min old) until the fresh one arrives.")
+        shared["scammer_map"] = cached
+        shared["scammer_ids"] = cached
+
+    async def _load_fresh_list():
+        backoff = 5
+        while True:
+            scammer_map, scammer_ids = await fetch_scammer_list(parse_in_subprocess, index_file)
+            if scammer_ids:
+                break
+            print(f"⚠️ No scammer data loaded; retrying in {backoff}s...")
+            METRICS.inc("scamscan_reconnects_total", reason="no_scammer_data")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 300)
+        async with _timed_lock(shared["lock"]):
+            shared["scammer_map"] = scammer_map
+            shared["scammer_ids"] = scammer_ids
+        METRICS.set_gauge("scamscan_scammer_list_size", len(scammer_ids))
+        if cached is not None:
+            print(f"⏱️ Startup: fresh scammer list reconciled after {timeline.elapsed():.2f}s "
+                  f"({len(cached)} cached -> {len(scammer_ids)}).")
+        await refresh_scammer_cache(shared["cache_file"], scammer_map)
+
+    if len(sessions) > 1:
+        print(f"👥 Multi-account Overwatch: {', '.join(sessions)}")
+    list_task = asyncio.create_task(timeline.run("list_fetch", _load_fresh_list()))
+    account_tasks = [
+        asyncio.create_task(_run_overwatch_reconnect_loop(
+            api_id, api_hash, overwatch_report_mode,
+            session=session, shared=shared, interactive=interactive,
+            sink=sink, recorder=recorder, metrics_interval=metrics_interval,
+        ))
+        for session in sessions
+    ]
+
+    hub_stop = asyncio.Event()
+    hub_tasks: List[asyncio.Task] = []
+    try:
+        forced = await timeline.run("update_check", _await_startup_update(startup_update))
+        if forced is not None:
+            return forced
+        if cached is None:
+            await list_task
+        shared["ready"].set()
+        hub_tasks = _start_overwatch_process_tasks(
+            shared, hub_stop, sink=sink, recorder=recorder,
+            metrics_interval=metrics_interval, check_updates=True,
+        )
+
+        results = await asyncio.gather(*account_tasks)
+        return next((rc for rc in results if rc is not None), None)
+    finally:
+        for t in account_tasks:
+            t.cancel()
+        list_task.cancel()
+        await asyncio.gather(list_task, *account_tasks, return_exceptions=True)
+        hub_stop.set()
+        for t in hub_tasks:
+            t.cancel()
+        await asyncio.gather(*hub_tasks, return_exceptions=True)
+        for server in servers:
+            server.close()
+        shared["observed"].save()
+
+async def _run_overwatch_reconnect_loop(
+    api_id,
+    api_hash,
+    overwatch_report_mode,
+    *,
+    session: str,
+    shared: Dict[str, Any],
+    interactive: bool,
+    sink: Optional[JsonlEventSink],
+    recorder: Optional[UpdateRecorder],
+    metrics_interval: int,
+):
+    """
+    One account's connect / run / reconnect loop. Returns EXIT_NOT_AUTHORIZED if its session needs a login.
+    """
     backoff = 5
+    carry: Dict[str, Any] = {}  # per-account state kept across reconnects (see overwatch_mode)
     while True:
-        client = TelegramClient(SESSION_NAME, api_id, api_hash)
+        client = ScamScanClient(session, api_id, api_hash)
+        soft_restart = False
         try:
-            await client.start()
-
-            scammer_map, scammer_ids = load_scammer_data_v2()
-            if not scammer_ids:
-                print("⚠️ No scammer data loaded; retrying soon...")
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, 300)
-                continue
+            async with shared["login_lock"]:
+                authorized = await shared["timeline"].run(
+                    "client_start", start_client(client, interactive=interactive), account=session,
+                )
+            if not authorized:
+                print(f"❌ Session '{session}' is not logged in; skipping this account.")
+                return EXIT_NOT_AUTHORIZED
 
             backoff = 5
-            await overwatch_mode(client, scammer_ids, scammer_map, overwatch_report_mode)
+            soft_restart = await overwatch_mode(client, shared["scammer_ids"], shared["scammer_map"], overwatch_report_mode,
+                                                sink=sink, metrics_interval=metrics_interval, recorder=recorder,
+                                                state_file=overwatch_state_file_for(session),
+                                                shared=shared, account=session, carry=carry)
 
         except Exception as e:
-            print(f"🔌 Overwatch crashed/disconnected: {e!r}")
+            print(f"🔌 Overwatch crashed/disconnected ({session}): {e!r}")
+            METRICS.inc("scamscan_reconnects_total", reason="crash")
         finally:
             try:
                 await client.disconnect()
             except Exception:
                 pass
 
+        if soft_restart:
+            METRICS.inc("scamscan_reconnects_total", reason="soft_restart")
+            print(f"♻️ Reconnecting '{session}' now (soft restart; scammer list and state stay in memory)...")
+            carry["restart_at"] = time.perf_counter()
+            continue
+
         print(f"🔁 Reconnecting in {backoff}s...")
         await asyncio.sleep(backoff)
         backoff = min(backoff * 2, 300)
@@ -1114,8 +4750,16 @@ async def overwatch_mode(
     client: TelegramClient,
     scammer_ids: Set[str],
     scammer_map: Dict[str, Dict[str, Any]],
-    overwatch_report_mode: int
-):
+    overwatch_report_mode: int,
+    sink: Optional[JsonlEventSink] = None,
+    metrics_interval: int = METRICS_SUMMARY_SECONDS,
+    state_file: str = OVERWATCH_STATE_FILE,
+    check_updates: bool = True,
+    recorder: Optional[UpdateRecorder] = None,
+    shared: Optional[Dict[str, Any]] = None,
+    account: str = SESSION_NAME,
+    carry: Optional[Dict[str, Any]] = None,
+) -> bool:
     """
     overwatch_report_mode:
       1) terminal only
@@ -1127,8 +4771,25 @@ async def overwatch_mode(
     -- Every hour, refresh:
       - scammer list
 
-    Life-check:
-      - if no NewMessage events in 4 hours => restart process
+    Liveness:
+      - GetState pings every 5 minutes; lost or stalled updates are fetched with catch_up()
+      - 3 failed pings in a row => disconnect and return True (soft restart)
+
+    sink: optional JsonlEventSink; every detection is also written there.
+    metrics_interval: seconds between "📈 Metrics" summary lines (0 = off).
+    state_file: where dedupe keys / allowlist / timestamps are persisted.
+    check_updates: run the 2-hourly GitHub version check.
+    recorder: optional UpdateRecorder; incoming update metadata is logged for replay.
+    shared: hub from new_overwatch_shared() when several accounts run in one process.
+      The hub owns the scammer list and its refresher, the update checker, sink/recorder
+      flushing and the metrics summary; this function then only runs per-account work
+      and only handles chats this account owns. Without it, everything runs here.
+    carry: dict the caller keeps across reconnects. The account's in-memory state (dedupe keys,
+      allowlist, own-alert tracking) is kept there and reused on the next call instead of
+      reloading it from disk and re-crawling dialogs.
+
+    Returns True if the liveness check asked for a restart; the caller reconnects right away.
+    account: name of this account within the hub (its session name).
     """
     print("🛰️ Overwatch mode enabled.")
     print("   - Listening for scammer messages and join/leave events")
@@ -1146,53 +4807,126 @@ async def overwatch_mode(
     state_lock = asyncio.Lock()
     stop_event = asyncio.Event()
 
+    standalone = shared is None
+    if standalone:
+        shared = new_overwatch_shared(scammer_map, scammer_ids)
+    timeline: StartupTimeline = shared["timeline"]
+    alerts: AlertRenderer = shared["alerts"]
+    first_start = ("protecting", account) not in timeline.steps
+
+    resumed = carry is not None and carry.get("state") is not None
+    if resumed:
+        # Soft restart in the same process: keep dedupe keys, allowlist and own-alert tracking
+        state = carry["state"]
+        last_notified = state["last_notified"]
+        group_last_sent = state["group_last_sent"]
+        state["restart_requested"] = False
+        initial_allowlist = state["allowlist"]
+        fresh_allowlist_task = None
+        crawl_admin_chats = state["admin_chats"]
+        print(f"♻️ Overwatch soft restart: reusing in-memory state ({len(initial_allowlist)} chats).")
+    else:
+        # Load persisted state (for manual restarts too) while asking Telegram who we are
+        persisted, me = await asyncio.gather(
+            timeline.run("state_load", asyncio.to_thread(load_overwatch_state_from_disk, state_file), account=account),
+            timeline.run("get_me", client.get_me(), account=account),
+        )
+        my_id = getattr(me, "id", None)
+
+        # Soft dedupe + daily group limits (persisted)
+        last_notified: Dict[Tuple[str, int, str, str], float] = dict(persisted.get("last_notified", {}))
+        group_last_sent: Dict[Tuple[int, str], float] = dict(persisted.get("group_last_sent", {}))
+
+        state: Dict[str, Any] = {
+            "allowlist": set(persisted.get("allowlist", set())),   # will be refreshed from dialogs
+            "last_message_ts": persisted.get("last_message_ts", None),
+            "restart_requested": False,
+            # chat_id -> (last message id seen, its time); where catch-up resumes after downtime
+            "chat_last_seen": dict(persisted.get("chat_last_seen", {})),
+            # chat_id -> admin log event id everything up to is processed; admin_chats: chat_id -> entity (filled by the crawl)
+            "admin_log_cursors": dict(persisted.get("admin_log_cursors", {})),
+            "admin_chats": {},
+            # chat_id -> {"max_id", "top", "seen"}: unread older part of a poll that hit the page cap
+            "admin_log_backlog": {},
+
+            # references so the persister can snapshot them
+            "group_last_sent": group_last_sent,
+            "last_notified": last_notified,
+        }
 
-    # Load persisted state (for manual restarts too)
-    persisted = load_overwatch_state_from_disk()
-    
-    me = await client.get_me()
-    my_id = getattr(me, "id", None)
-
-
-    # Soft dedupe + daily group limits (persisted)
-    last_notified: Dict[Tuple[str, int, str, str], float] = dict(persisted.get("last_notified", {}))
-    group_last_sent: Dict[Tuple[int, str], float] = dict(persisted.get("group_last_sent", {}))
+        # For duplicate message detection: what WE posted recently per chat
+        # chat_id -> deque of entries: {"msg_id": int, "ts": float, "uids": set(str)}
+        state["own_alerts"] = defaultdict(deque)
 
-    state: Dict[str, Any] = {
-        "allowlist": set(persisted.get("allowlist", set())),   # will be refreshed from dialogs
-        "scammer_ids": set(scammer_ids),
-        "scammer_map": dict(scammer_map),
-        "last_message_ts": persisted.get("last_message_ts", None),
-        "restart_requested": False,
+        # chat_id -> dict uid_str -> last_seen_ts (uids we alerted about recently)
+        state["own_recent_uids"] = defaultdict(dict)
 
-        # references so the persister can snapshot them
-        "group_last_sent": group_last_sent,
-        "last_notified": last_notified,
-    }
-    
-    # For duplicate message detection: what WE posted recently per chat
-    # chat_id -> deque of entries: {"msg_id": int, "ts": float, "uids": set(str)}
-    state["own_alerts"] = defaultdict(deque)
+        state["my_id"] = my_id
+        if carry is not None:
+            carry["state"] = state
 
-    # chat_id -> dict uid_str -> last_seen_ts (uids we alerted about recently)
-    state["own_recent_uids"] = defaultdict(dict)
+        # Start from the persisted allowlist if there is one; the dialog crawl is reconciled in later
+        crawl_admin_chats: Dict[int, Any] = {}
+        fresh_allowlist_task = asyncio.create_task(
+            timeline.run("allowlist_crawl", _build_group_allowlist(client, crawl_admin_chats), account=account)
+        )
+        if state["allowlist"]:
+            initial_allowlist = state["allowlist"]
+            print(f"⚡ Using persisted allowlist ({len(initial_allowlist)} chats) while reading groups in the background...")
+        else:
+            print("Reading groups...")
+            initial_allowlist = await fresh_allowlist_task
+            async with _timed_lock(state_lock):
+                state["allowlist"] = initial_allowlist
+                state["admin_chats"] = crawl_admin_chats
+
+    state["alive_since"] = time.time()  # the liveness check measures silence from here at the earliest
+    owned = await _register_overwatch_account(shared, account, client, initial_allowlist)
+    print(f"✅ Overwatch allowlist ready: {len(initial_allowlist)} chat(s) with >2 users.\n")
+    if not standalone:
+        print(f"👥 Account '{account}' watches {owned} of them (shared groups are watched by one account).\n")
+    METRICS.set_gauge("scamscan_allowlist_size", len(initial_allowlist))
+    METRICS.set_gauge("scamscan_scammer_list_size", len(shared["scammer_ids"]))
 
-    state["my_id"] = my_id
+    async def _on_allowlist_refresh(new_allow: Set[int]):
+        alerts.invalidate_chats()  # titles/usernames may have changed since they were cached
+        await _register_overwatch_account(shared, account, client, new_allow)
 
-    print("Reading groups...")
-    initial_allowlist = await _build_group_allowlist(client)
-    async with state_lock:
-        state["allowlist"] = initial_allowlist
-    print(f"✅ Overwatch allowlist ready: {len(initial_allowlist)} chat(s) with >2 users.\n")
+    async def _reconcile_fresh_allowlist():
+        if fresh_allowlist_task is None:
+            return
+        try:
+            new_allow = await fresh_allowlist_task
+        except Exception as e:
+            print(f"⚠️ Overwatch: background group crawl failed ({e}); keeping the persisted allowlist until the next refresh.")
+            return
+        async with _timed_lock(state_lock):
+            old_allow = state["allowlist"]
+            state["allowlist"] = new_allow
+            state["admin_chats"] = crawl_admin_chats
+        if new_allow is old_allow:
+            return
+        await _on_allowlist_refresh(new_allow)
+        METRICS.set_gauge("scamscan_allowlist_size", len(new_allow))
+        print(f"⏱️ Startup: fresh allowlist reconciled after {timeline.elapsed():.2f}s "
+              f"({len(new_allow)} chats, +{len(new_allow - old_allow)} / -{len(old_allow - new_allow)}).")
 
     # Start periodic tasks
     refresh_tasks = [
-        asyncio.create_task(_refresh_allowlist_periodically(client, state, state_lock, stop_event)),
-        asyncio.create_task(_refresh_scammer_data_periodically(state, state_lock, stop_event)),
-        asyncio.create_task(_life_check_periodically(state, state_lock, stop_event)),
-        asyncio.create_task(_persist_overwatch_state_periodically(state, state_lock, stop_event)),
-        asyncio.create_task(periodic_update_checker(stop_event, local_version=__version__, local_force=__force__, raw_url=GITHUB_RAW_URL, interval_seconds=UPDATE_CHECK_SECONDS)),
+        asyncio.create_task(_reconcile_fresh_allowlist()),
+        asyncio.create_task(_refresh_allowlist_periodically(client, state, state_lock, stop_event,
+                                                            on_refresh=_on_allowlist_refresh)),
+        asyncio.create_task(_liveness_check_periodically(client, state, state_lock, stop_event,
+                                                         on_restart=client.disconnect, account=account)),
+        asyncio.create_task(_persist_overwatch_state_periodically(state, state_lock, stop_event, path=state_file)),
     ]
+    if fresh_allowlist_task is not None:
+        refresh_tasks.append(fresh_allowlist_task)
+    if standalone:
+        refresh_tasks.extend(_start_overwatch_process_tasks(
+            shared, stop_event, sink=sink, recorder=recorder,
+            metrics_interval=metrics_interval, check_updates=check_updates,
+        ))
 
     DEDUPE_SECONDS = 30.0
     GROUP_LIMIT_SECONDS = 86400.0  # 1 day
@@ -1212,7 +4946,7 @@ async def overwatch_mode(
 
         except FloodWaitError as e:
             print(f"   ⏳ FloodWait while sending to group: sleeping {e.seconds}s (suppressing this send)")
-            await asyncio.sleep(e.seconds)
+            await _sleep_floodwait(e, "group_send")
             return None
         except Exception as e:
             print(f"❌ Failed to send alert to group '{getattr(chat_entity, 'title', chat_entity)}': {e}")
@@ -1227,18 +4961,24 @@ async def overwatch_mode(
         key = (kind, chat_id, uid_str, extra_key)
         now = time.time()
         if (now - last_notified.get(key, 0.0)) < DEDUPE_SECONDS:
+            METRICS.inc("scamscan_alerts_total", kind=kind, result="deduped")
             return
         last_notified[key] = now
+        METRICS.inc("scamscan_alerts_total", kind=kind, result="sent")
 
-        if overwatch_report_mode in (2, 3):
-            await _send_saved_message_reminder_in_xm(client, text)
+        METRICS.add_gauge("scamscan_alerts_inflight", 1)
+        try:
+            if overwatch_report_mode in (2, 3):
+                await _send_saved_message_reminder_in_xm(_alert_client(shared, client), text)
 
-        if overwatch_report_mode == 3 and chat_entity is not None:
-            sent_msg = await maybe_send_to_group_with_daily_limit(chat_entity, chat_id, uid_str, text)
-            if sent_msg:
-                await _record_own_group_alert(chat_id, sent_msg, {uid_str})
-            else:
-                print(f"ℹ️ Overwatch: group alert suppressed (daily limit) for scammer {uid_str} in chat {chat_id}")
+            if overwatch_report_mode == 3 and chat_entity is not None:
+                sent_msg = await maybe_send_to_group_with_daily_limit(chat_entity, chat_id, uid_str, text)
+                if sent_msg:
+                    await _record_own_group_alert(chat_id, sent_msg, {uid_str})
+                else:
+                    print(f"ℹ️ Overwatch: group alert suppressed (daily limit) for scammer {uid_str} in chat {chat_id}")
+        finally:
+            METRICS.add_gauge("scamscan_alerts_inflight", -1)
                 
 
 
@@ -1251,15 +4991,29 @@ async def overwatch_mode(
         scammer_display: str,
         scammer_topic: Optional[str]
     ):
-        await asyncio.sleep(120)
+        METRICS.add_gauge("scamscan_join_verify_pending", 1)
+        try:
+            await asyncio.sleep(120)
+            await _verify_join(chat_entity, chat_id, chat_title, chat_link, uid_str, scammer_display, scammer_topic)
+        finally:
+            METRICS.add_gauge("scamscan_join_verify_pending", -1)
+
+    async def _verify_join(
+        chat_entity,
+        chat_id: int,
+        chat_title: str,
+        chat_link: str,
+        uid_str: str,
+        scammer_display: str,
+        scammer_topic: Optional[str]
+    ):
         try:
             uid_int = int(uid_str)
         except Exception:
             return
 
         # ✅ pull current scammer_map from shared state (it can refresh hourly)
-        async with state_lock:
-            scammer_map_now = dict(state.get("scammer_map", {}))
+        scammer_map_now = shared["scammer_map"]
 
         username = None
         info = scammer_map_now.get(uid_str, {})
@@ -1277,32 +5031,30 @@ async def overwatch_mode(
         )
         print(f"   🔎 verify detail: {why}")
 
-        topic_line = f"• Scammer topic: {scammer_topic}\n" if scammer_topic else ""
+        _, _, scammer_frag, topic_line = alerts.scammer(uid_str, scammer_map_now, shared["observed"], scammer_display)
 
         if still is True:
-            text = (
-                f"🚨 **Scammer joined chat**\n"
-                f"• Chat: **{chat_title}**\n"
-                f"• Chat link: {chat_link}\n"
-                f"• Scammer: {scammer_display} (id `{uid_str}`)\n"
-                f"{topic_line}"
-            ).rstrip()
+            text = alerts.render("verify_still", chat_title=chat_title, chat_link=chat_link,
+                                 scammer=scammer_frag, topic_line=topic_line)
             print(f"✅ Overwatch verify: still in '{chat_title}': {scammer_display} ({uid_str})")
+            if sink is not None:
+                sink.emit("ow_verify", chat_id=chat_id, chat_title=chat_title, user_id=uid_str, display=scammer_display,
+                          topic_link=scammer_topic, link=chat_link, result="still", detail=why)
             await notify("verify", chat_entity, chat_id, uid_str, "still", text)
 
         elif still is False:
             print(f"⚠️ Overwatch verify: gone from '{chat_title}': {scammer_display} ({uid_str})")
+            if sink is not None:
+                sink.emit("ow_verify", chat_id=chat_id, chat_title=chat_title, user_id=uid_str, display=scammer_display,
+                          topic_link=scammer_topic, link=chat_link, result="gone", detail=why)
 
         else:
-            text = (
-                f"🚨 **Scammer joined chat (verify inconclusive)**\n"
-                f"• Chat: **{chat_title}**\n"
-                f"• Chat link: {chat_link}\n"
-                f"• Scammer: {scammer_display} (id `{uid_str}`)\n"
-                f"{topic_line}"
-                f"• Verify: {why}"
-            ).rstrip()
+            text = alerts.render("verify_unknown", chat_title=chat_title, chat_link=chat_link,
+                                 scammer=scammer_frag, topic_line=topic_line, why=why)
             print(f"ℹ️ Overwatch verify: inconclusive for '{chat_title}': {scammer_display} ({uid_str}) ({why})")
+            if sink is not None:
+                sink.emit("ow_verify", chat_id=chat_id, chat_title=chat_title, user_id=uid_str, display=scammer_display,
+                          topic_link=scammer_topic, link=chat_link, result="unknown", detail=why)
             await notify("verify", chat_entity, chat_id, uid_str, "unknown", text)
             
     async def _record_own_group_alert(chat_id: int, sent_msg, uids: Set[str]):
@@ -1318,7 +5070,7 @@ async def overwatch_mode(
         except Exception:
             ts = _now_ts()
 
-        async with state_lock:
+        async with _timed_lock(state_lock):
             # store per-chat alert message
             dq = state["own_alerts"][chat_id]
             dq.append({"msg_id": int(sent_msg.id), "ts": float(ts), "uids": set(uids)})
@@ -1363,7 +5115,7 @@ async def overwatch_mode(
         cutoff = _now_ts() - DUPLICATE_WINDOW_SECONDS
         prune_cutoff = _now_ts() - DUPLICATE_PRUNE_SECONDS
 
-        async with state_lock:
+        async with _timed_lock(state_lock):
             recent_uid_map = state["own_recent_uids"][chat_id]
             recent_uids = {u for u, uts in recent_uid_map.items() if uts >= cutoff}
 
@@ -1397,33 +5149,51 @@ async def overwatch_mode(
             await client.delete_messages(chat_id, to_delete, revoke=True)
             print(f"🧹 Duplicate detector: deleted {len(to_delete)} newer duplicate alert(s) in chat {chat_id} "
                   f"(uids={sorted(list(overlap))[:5]}{'...' if len(overlap)>5 else ''})")
+            if sink is not None:
+                sink.emit("ow_duplicate_deleted", chat_id=chat_id, message_ids=to_delete, user_ids=sorted(overlap),
+                          event_ts=candidate_ts)
         except FloodWaitError as e:
             print(f"   ⏳ FloodWait while deleting duplicates: sleeping {e.seconds}s")
-            await asyncio.sleep(e.seconds)
+            await _sleep_floodwait(e, "delete_duplicates")
         except Exception as e:
             print(f"⚠️ Duplicate detector: failed to delete duplicates in chat {chat_id}: {e}")
 
-        async with state_lock:
+        async with _timed_lock(state_lock):
             dq = state["own_alerts"][chat_id]
             state["own_alerts"][chat_id] = deque([a for a in dq if a["msg_id"] not in set(to_delete)])
 
 
-    @client.on(events.NewMessage())
-    async def on_new_message(event: events.NewMessage.Event):
-        async with state_lock:
+    async def _note_new_message(event: events.NewMessage.Event) -> bool:
+        """
+        Bookkeeping every message gets, inline in the handler: liveness timestamp and the chat's
+        catch-up cursor. Returns True if the chat is watched by this account.
+        """
+        chat_id = event.chat_id
+        msg_id = getattr(event.message, "id", None)
+        async with _timed_lock(state_lock):
             state["last_message_ts"] = time.time()
-
+            if chat_id is None or chat_id not in state["allowlist"]:
+                return False
+            if msg_id is not None:
+                seen = state["chat_last_seen"].get(chat_id)
+                if seen is None or msg_id > seen[0]:
+                    state["chat_last_seen"][chat_id] = (msg_id, _message_ts(event.message) or time.time())
+        return shared["chat_owner"].get(chat_id, account) == account
+
+    async def _process_new_message(event: events.NewMessage.Event):
         chat_id = event.chat_id
         if chat_id is None:
             return
 
-        async with state_lock:
+        async with _timed_lock(state_lock):
             allowlist = state["allowlist"]
-            scammer_ids_local = state["scammer_ids"]
-            scammer_map_local = state["scammer_map"]
+        scammer_ids_local = shared["scammer_ids"]
+        scammer_map_local = shared["scammer_map"]
 
         if chat_id not in allowlist:
             return
+        if shared["chat_owner"].get(chat_id, account) != account:
+            return  # another account in this process watches this chat
 
         # NEW: duplicate watcher (mode 3)
         await _handle_possible_duplicate_alert(event, chat_id)
@@ -1437,8 +5207,7 @@ async def overwatch_mode(
             except Exception:
                 chat_entity = None
 
-            chat_title = getattr(chat_entity, "title", None) or "(unknown chat)"
-            chat_link = _chat_link(chat_entity, chat_id)
+            chat_title, chat_link = alerts.chat(chat_entity, chat_id)
 
             # Check each user that was added (can be multiple)
             for auid in action_uids:
@@ -1446,20 +5215,15 @@ async def overwatch_mode(
                 if auid_str not in scammer_ids_local:
                     continue
 
-                info = scammer_map_local.get(auid_str, {})
-                scammer_display = scammer_display_name_from_v2(info) if info else auid_str
-                scammer_topic = topic_link_for_scammer(info) if info else None
-                topic_line = f"• Scammer topic: {scammer_topic}\n" if scammer_topic else ""
-
-                text = (
-                    f"🚨 **Scammer invited/added detected**\n"
-                    f"• Chat: **{chat_title}** (`{chat_id}`)\n"
-                    f"• Chat link: {chat_link}\n"
-                    f"• Scammer: {scammer_display} (id `{auid_str}`)\n"
-                    f"{topic_line}"
-                ).rstrip()
+                scammer_display, scammer_topic, scammer_frag, topic_line = alerts.scammer(
+                    auid_str, scammer_map_local, shared["observed"])
+                text = alerts.render("added", chat_title=chat_title, chat_id=chat_id, chat_link=chat_link,
+                                     scammer=scammer_frag, topic_line=topic_line)
 
                 print(f"🚨 Overwatch: scammer added/invited in '{chat_title}': {scammer_display} ({auid_str})")
+                if sink is not None:
+                    sink.emit("ow_added", chat_id=chat_id, chat_title=chat_title, user_id=auid_str, display=scammer_display,
+                              topic_link=scammer_topic, link=chat_link, event_ts=_message_ts(event.message))
 
                 # Use a stable extra_key so repeated identical service messages dedupe for 30s
                 await notify("joinmsg", chat_entity, chat_id, auid_str, str(event.message.id), text)
@@ -1490,39 +5254,37 @@ async def overwatch_mode(
         except Exception:
             chat_entity = None
 
-        chat_title = getattr(chat_entity, "title", None) or "(unknown chat)"
-        msg_link = _chat_link_for_message(chat_entity, chat_id, event.message.id)
+        chat_title, _ = alerts.chat(chat_entity, chat_id)
+        msg_link = alerts.message_link(chat_entity, chat_id, event.message.id)
 
-        info = scammer_map_local.get(uid_str, {})
-        scammer_display = scammer_display_name_from_v2(info) if info else name_for_telegram_user_fallback(sender)
-        scammer_topic = topic_link_for_scammer(info) if info else None
-
-        topic_line = f"• Scammer topic: {scammer_topic}\n" if scammer_topic else ""
-        text = (
-            f"🚨 **Scammer message detected**\n"
-            f"• Chat: **{chat_title}**\n"
-            f"• Scammer: {scammer_display} (id `{uid_str}`)\n"
-            f"{topic_line}"
-            f"• Message link: {msg_link}"
-        )
+        _observe_scammer(shared["observed"], sender, f"message in {chat_id}")
+        scammer_display, scammer_topic, scammer_frag, topic_line = alerts.scammer(
+            uid_str, scammer_map_local, shared["observed"], name_for_telegram_user_fallback(sender))
+        text = alerts.render("message", chat_title=chat_title, scammer=scammer_frag, topic_line=topic_line,
+                             msg_link=msg_link)
 
         print(f"🚨 Overwatch: scammer message in '{chat_title}' by {scammer_display} ({uid_str}) -> {msg_link}")
+        if sink is not None:
+            sink.emit("ow_message", chat_id=chat_id, chat_title=chat_title, user_id=uid_str, display=scammer_display,
+                      topic_link=scammer_topic, link=msg_link, event_ts=_message_ts(event.message))
         await notify("msg", chat_entity, chat_id, uid_str, str(event.message.id), text)
 
-    @client.on(events.ChatAction())
-    async def on_chat_action(event: events.ChatAction.Event):
+    async def _process_chat_action(event: events.ChatAction.Event):
         chat_id = event.chat_id
         if chat_id is None:
             return
 
         # Snapshot allowlist + scammer set
-        async with state_lock:
+        async with _timed_lock(state_lock):
             allowlist = state["allowlist"]
-            scammer_ids_local = state["scammer_ids"]
-            scammer_map_local = state["scammer_map"]
+            via_admin_log = chat_id in state["admin_chats"]
+        scammer_ids_local = shared["scammer_ids"]
+        scammer_map_local = shared["scammer_map"]
 
         if chat_id not in allowlist:
             return
+        if shared["chat_owner"].get(chat_id, account) != account:
+            return
 
         joined = bool(event.user_joined or event.user_added)
         left = bool(event.user_left or event.user_kicked)
@@ -1534,8 +5296,7 @@ async def overwatch_mode(
         except Exception:
             chat_entity = None
 
-        chat_title = getattr(chat_entity, "title", None) or "(unknown chat)"
-        chat_link = _chat_link(chat_entity, chat_id)
+        chat_title, chat_link = alerts.chat(chat_entity, chat_id)
 
         uid = getattr(event, "user_id", None)
         if uid is None:
@@ -1551,23 +5312,19 @@ async def overwatch_mode(
         if uid_str not in scammer_ids_local:
             return
 
-        info = scammer_map_local.get(uid_str, {})
-        scammer_display = scammer_display_name_from_v2(info) if info else uid_str
-        scammer_topic = topic_link_for_scammer(info) if info else None
-        topic_line = f"• Scammer topic: {scammer_topic}\n" if scammer_topic else ""
+        _observe_scammer(shared["observed"], getattr(event, "user", None), f"join/leave in {chat_id}")
+        scammer_display, scammer_topic, _, _ = alerts.scammer(
+            uid_str, scammer_map_local, shared["observed"])
 
+        # no message here: joins are alerted once delayed_join_verify / the admin log confirm them
         action = "joined" if joined else "left"
-        text = (
-            f"🚨 **Scammer {action} detected**\n"
-            f"• Chat: **{chat_title}** (`{chat_id}`)\n"
-            f"• Chat link: {chat_link}\n"
-            f"• Scammer: {scammer_display} (id `{uid_str}`)\n"
-            f"{topic_line}"
-        ).rstrip()
-
         print(f"🚨 Overwatch: scammer {action} in '{chat_title}': {scammer_display} ({uid_str})")
+        if sink is not None:
+            sink.emit("ow_join" if joined else "ow_leave", chat_id=chat_id, chat_title=chat_title, user_id=uid_str,
+                      display=scammer_display, topic_link=scammer_topic, link=chat_link,
+                      event_ts=_message_ts(getattr(event, "action_message", None)))
 
-        if joined:
+        if joined and not via_admin_log:  # admin-log chats are verified by _poll_admin_logs_periodically
             asyncio.create_task(delayed_join_verify(
                 chat_entity,
                 chat_id,
@@ -1578,7 +5335,271 @@ async def overwatch_mode(
                 scammer_topic
             ))
 
+    async def _process_admin_log(chat_id: int, chat_entity):
+        """
+        Reads membership changes since the chat's admin log cursor and alerts on scammers who are
+        still in the chat afterwards. The log is exact and ordered, so no delayed presence
+        heuristics are needed; a scammer it reports as a member is confirmed with one
+        channels.GetParticipant call.
+
+        The cursor only moves once everything after it has been read. When more happened than
+        one poll may read, the newest part is handled now and the rest is kept in
+        admin_log_backlog and read from the top down on the following polls; users already
+        handled from a newer event are skipped there.
+        """
+        async with _timed_lock(state_lock):
+            cursor = state["admin_log_cursors"].get(chat_id)
+            backlog = state["admin_log_backlog"].get(chat_id)
+        if cursor is None:
+            # first look at this chat: start from its newest event, the log goes back 48h
+            head = await _admin_log_head(client, chat_entity)
+            async with _timed_lock(state_lock):
+                state["admin_log_cursors"][chat_id] = head
+            return
+
+        max_id = backlog["max_id"] if backlog else 0
+        events_, users, complete = await _fetch_admin_log_membership(client, chat_entity, cursor, max_id)
+        if not events_ and not backlog:
+            return
+        METRICS.inc("scamscan_admin_log_events_total", len(events_), account=account)
+
+        final: Dict[int, bool] = {}
+        for ev in events_:
+            for uid, member in _admin_log_membership(ev):
+                final[uid] = member
+        if backlog:
+            final = {uid: m for uid, m in final.items() if uid not in backlog["seen"]}
+
+        async with _timed_lock(state_lock):
+            top = backlog["top"] if backlog else events_[-1].id
+            if complete:
+                state["admin_log_cursors"][chat_id] = top
+                state["admin_log_backlog"].pop(chat_id, None)
+            else:
+                seen = (backlog["seen"] if backlog else set()) | set(final)
+                state["admin_log_backlog"][chat_id] = {"max_id": events_[0].id, "top": top, "seen": seen}
+                print(f"⏳ Overwatch admin log: chat {chat_id} has more than "
+                      f"{OVERWATCH_ADMIN_LOG_MAX_PAGES * OVERWATCH_ADMIN_LOG_LIMIT} new events; "
+                      f"reading the older ones next round.")
+
+        scammer_ids_local = shared["scammer_ids"]
+        scammer_map_local = shared["scammer_map"]
+        chat_title, chat_link = alerts.chat(chat_entity, chat_id)
+        for uid, member in final.items():
+            uid_str = str(uid)
+            if uid_str not in scammer_ids_local:
+                continue
+            _observe_scammer(shared["observed"], users.get(uid), f"admin log of {chat_id}")
+            scammer_display, scammer_topic, scammer_frag, topic_line = alerts.scammer(
+                uid_str, scammer_map_local, shared["observed"])
+
+            if member and uid in users:
+                confirmed = await _is_channel_participant(client, chat_entity, users[uid])
+                if confirmed is not None:
+                    member = confirmed
+            if not member:
+                print(f"⚠️ Overwatch admin log: gone from '{chat_title}': {scammer_display} ({uid_str})")
+                if sink is not None:
+                    sink.emit("ow_verify", chat_id=chat_id, chat_title=chat_title, user_id=uid_str, display=scammer_display,
+                              topic_link=scammer_topic, link=chat_link, result="gone", detail="admin_log")
+                continue
+
+            text = alerts.render("verify_still", chat_title=chat_title, chat_link=chat_link,
+                                 scammer=scammer_frag, topic_line=topic_line)
+            print(f"✅ Overwatch admin log: in '{chat_title}': {scammer_display} ({uid_str})")
+            if sink is not None:
+                sink.emit("ow_verify", chat_id=chat_id, chat_title=chat_title, user_id=uid_str, display=scammer_display,
+                          topic_link=scammer_topic, link=chat_link, result="still", detail="admin_log")
+            await notify("verify", chat_entity, chat_id, uid_str, "still", text)
+
+    async def _poll_admin_logs_periodically(poll_seconds: float = OVERWATCH_ADMIN_LOG_SECONDS):
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=poll_seconds)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            async with _timed_lock(state_lock):
+                allowlist = state["allowlist"]
+                chats = [(cid, ent) for cid, ent in state["admin_chats"].items() if cid in allowlist]
+            for chat_id, chat_entity in chats:
+                if stop_event.is_set():
+                    break
+                if shared["chat_owner"].get(chat_id, account) != account:
+                    continue
+                try:
+                    with METRICS.time("scamscan_handler_seconds", handler="admin_log"):
+                        await _process_admin_log(chat_id, chat_entity)
+                except FloodWaitError as e:
+                    print(f"⏳ Overwatch admin log: FloodWait {e.seconds}s; resuming next round.")
+                    await _sleep_floodwait(e, "admin_log")
+                    break
+                except Exception as e:
+                    print(f"⚠️ Overwatch admin log: failed for chat {chat_id}: {e}")
+
+    async def _catch_up_missed_events(cursors: Dict[int, Tuple[int, float]]):
+        """
+        Re-reads what each watched chat got since its cursor (downtime, backoff, crash) and feeds
+        join/add service messages and messages from listed scammers through _process_new_message.
+        Most recently active chats go first; per-chat and total caps plus a pause between chats
+        keep a long outage from turning into a FloodWait.
+        """
+        async with _timed_lock(state_lock):
+            allowlist = state["allowlist"]
+        todo = sorted(
+            ((cid, cur) for cid, cur in cursors.items()
+             if cid in allowlist and shared["chat_owner"].get(cid, account) == account),
+            key=lambda kv: kv[1][1], reverse=True,
+        )
+        if not todo:
+            return
+
+        budget = OVERWATCH_CATCH_UP_MAX_MESSAGES
+        read = hits = chats = truncated = 0
+        for chat_id, (min_id, _) in todo:
+            if stop_event.is_set() or budget <= 0:
+                break
+            if chats:
+                await asyncio.sleep(OVERWATCH_CATCH_UP_CHAT_DELAY)
+            limit = min(OVERWATCH_CATCH_UP_PER_CHAT, budget)
+            try:
+                msgs = [m async for m in client.iter_messages(chat_id, limit=limit, min_id=min_id)]
+            except FloodWaitError as e:
+                print(f"⏳ Catch-up: FloodWait {e.seconds}s; skipping chat {chat_id}.")
+                await _sleep_floodwait(e, "catch_up")
+                continue
+            except Exception as e:
+                print(f"⚠️ Catch-up: couldn't read chat {chat_id}: {e}")
+                continue
+
+            chats += 1
+            read += len(msgs)
+            budget -= len(msgs)
+            if len(msgs) >= limit:
+                truncated += 1
+            if msgs:
+                async with _timed_lock(state_lock):
+                    seen = state["chat_last_seen"].get(chat_id)
+                    if seen is None or msgs[0].id > seen[0]:
+                        state["chat_last_seen"][chat_id] = (msgs[0].id, _message_ts(msgs[0]) or time.time())
+            scammer_ids_local = shared["scammer_ids"]
+            for msg in reversed(msgs):  # oldest first, like live updates
+                sender_id = getattr(msg, "sender_id", None)
+                if not _extract_action_user_ids(msg) and (sender_id is None or str(sender_id) not in scammer_ids_local):
+                    continue
+                hits += 1
+                try:
+                    await _process_new_message(_HistoryMessageEvent(client, chat_id, msg))
+                except Exception as e:
+                    print(f"⚠️ Catch-up: failed to process message {getattr(msg, 'id', '?')} in {chat_id}: {e}")
+
+        METRICS.inc("scamscan_catch_up_messages_total", read, account=account)
+        print(f"🔎 Catch-up ({account}): read {read} missed message(s) in {chats}/{len(todo)} chat(s), "
+              f"{hits} to check" + (f"; {truncated} chat(s) hit the per-chat cap" if truncated else "") + ".")
+
+    # Connected and warmed up; act only once the update check passed and a list is loaded
+    if not shared["ready"].is_set():
+        await timeline.run("wait_ready", shared["ready"].wait(), account=account)
+
+    # Cursors as of now: live messages below advance them, catch-up must start from here
+    async with _timed_lock(state_lock):
+        catch_up_from = dict(state["chat_last_seen"])
+
+    @client.on(events.Raw())
+    async def on_raw_update(update):
+        # Liveness only needs to know that updates still arrive; a plain store, no lock
+        state["last_update_ts"] = time.time()
+
+    # Event pipeline: handlers classify cheaply and enqueue, workers process by priority.
+    # Scammer hits jump ahead of duplicate-alert housekeeping, which is shed under load.
+    event_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    pipeline: Dict[str, Any] = {"seq": 0, "low_pending": 0, "pending": 0}  # pending: queued or being processed
+
+    def _classify_new_message(event) -> Optional[int]:
+        ids = shared["scammer_ids"]
+        sender_id = getattr(event.message, "sender_id", None)
+        if sender_id is not None and str(sender_id) in ids:
+            return EVENT_PRIORITY_HIT
+        action_uids = _extract_action_user_ids(event.message)
+        if action_uids:
+            return EVENT_PRIORITY_HIT if any(str(u) in ids for u in action_uids) else None
+        if overwatch_report_mode == 3 and _looks_like_scam_alert(getattr(event, "raw_text", None) or ""):
+            return EVENT_PRIORITY_HOUSEKEEPING
+        return None
+
+    def _classify_chat_action(event) -> Optional[int]:
+        if not (event.user_joined or event.user_added or event.user_left or event.user_kicked):
+            return None
+        uids = getattr(event, "user_ids", None) or [getattr(event, "user_id", None)]
+        if None in uids:
+            return EVENT_PRIORITY_MEMBERSHIP  # user has to be resolved before we know
+        ids = shared["scammer_ids"]
+        return EVENT_PRIORITY_HIT if any(str(u) in ids for u in uids) else None
+
+    def _enqueue(priority: Optional[int], handler: str, process, event):
+        if priority is None:
+            return
+        low = priority >= EVENT_PRIORITY_HOUSEKEEPING
+        if low and pipeline["low_pending"] >= OVERWATCH_LOW_PRIORITY_MAX_QUEUED:
+            METRICS.inc("scamscan_events_shed_total", priority=EVENT_PRIORITY_NAMES[priority], account=account)
+            return
+        if low:
+            pipeline["low_pending"] += 1
+        pipeline["seq"] += 1
+        pipeline["pending"] += 1
+        event_queue.put_nowait((priority, pipeline["seq"], time.perf_counter(), handler, process, event))
+        METRICS.set_gauge("scamscan_event_queue_depth", pipeline["pending"], account=account)
+
+    async def _event_worker():
+        while True:
+            priority, _, t_enqueued, handler, process, event = await event_queue.get()
+            try:
+                if priority >= EVENT_PRIORITY_HOUSEKEEPING:
+                    pipeline["low_pending"] -= 1
+                METRICS.observe("scamscan_event_queue_wait_seconds", time.perf_counter() - t_enqueued,
+                                priority=EVENT_PRIORITY_NAMES[priority])
+                with METRICS.time("scamscan_handler_seconds", handler=handler):
+                    await process(event)
+            except Exception as e:
+                print(f"⚠️ Overwatch: event processing failed: {e!r}")
+            finally:
+                METRICS.observe("scamscan_event_seconds", time.perf_counter() - t_enqueued,
+                                priority=EVENT_PRIORITY_NAMES[priority])
+                event_queue.task_done()
+                pipeline["pending"] -= 1
+                METRICS.set_gauge("scamscan_event_queue_depth", pipeline["pending"], account=account)
+
+    refresh_tasks.extend(asyncio.create_task(_event_worker()) for _ in range(OVERWATCH_EVENT_WORKERS))
+
+    @client.on(events.NewMessage())
+    async def on_new_message(event: events.NewMessage.Event):
+        METRICS.inc("scamscan_events_total", type="new_message", account=account)
+        if recorder is not None:
+            recorder.record_new_message(event)
+        with METRICS.time("scamscan_dispatch_seconds", handler="on_new_message"):
+            if await _note_new_message(event):
+                _enqueue(_classify_new_message(event), "on_new_message", _process_new_message, event)
+
+    @client.on(events.ChatAction())
+    async def on_chat_action(event: events.ChatAction.Event):
+        METRICS.inc("scamscan_events_total", type="chat_action", account=account)
+        if recorder is not None:
+            recorder.record_chat_action(event)
+        with METRICS.time("scamscan_dispatch_seconds", handler="on_chat_action"):
+            _enqueue(_classify_chat_action(event), "on_chat_action", _process_chat_action, event)
+
+    refresh_tasks.append(asyncio.create_task(
+        timeline.run("catch_up", _catch_up_missed_events(catch_up_from), account=account)
+    ))
+    refresh_tasks.append(asyncio.create_task(_poll_admin_logs_periodically()))
+
     print("🟢 Overwatch is running. Press Ctrl+C to stop.\n")
+    if first_start:
+        timeline.mark("protecting", account)
+        print(f"⏱️ Startup ({account}): {timeline.format(account)}\n")
+    elif resumed and carry.get("restart_at") is not None:
+        print(f"♻️ Soft restart complete in {time.perf_counter() - carry.pop('restart_at'):.2f}s.\n")
 
     restart_requested = False
     try:
@@ -1586,34 +5607,46 @@ async def overwatch_mode(
     except KeyboardInterrupt:
         print("\n🛑 Overwatch stopping (Ctrl+C).")
     finally:
-        # stop periodic tasks
-        async with state_lock:
+        # give queued events a moment, then stop periodic tasks and workers
+        if not event_queue.empty():
+            try:
+                await asyncio.wait_for(event_queue.join(), timeout=OVERWATCH_DRAIN_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Overwatch: {event_queue.qsize()} queued event(s) dropped on shutdown.")
+        async with _timed_lock(state_lock):
             restart_requested = bool(state.get("restart_requested", False))
 
         stop_event.set()
         for t in refresh_tasks:
             t.cancel()
         await asyncio.gather(*refresh_tasks, return_exceptions=True)
+        await _unregister_overwatch_account(shared, account)
 
         try:
             await client.disconnect()
         except Exception:
             pass
 
-    # If life-check requested restart: execv the current script
-    if restart_requested:
-        print("🔁 Restarting process via execv...")
-        os.execv(sys.executable, [sys.executable] + sys.argv)
+    # Liveness restarts are soft: the caller reconnects in-process, keeping the list, hub and carry
+    return restart_requested
 
 # --- Main ---
 async def main():
-    check_for_update_once(__version__, __force__, GITHUB_RAW_URL, print_prefix="🔎 Update check (startup)")
+    update_task = asyncio.create_task(_startup_update_check())
     api_id, api_hash = setup_api_credentials()
-    client = TelegramClient(SESSION_NAME, api_id, api_hash)
+    client = ScamScanClient(SESSION_NAME, api_id, api_hash)
+
+    # Unified load once at start for all modes, while the client connects
+    list_task = asyncio.create_task(load_scammer_data_v2_async())
+    await client.connect()
+    if not await client.is_user_authorized():
+        # login prompts come next; let the background output finish first
+        await asyncio.wait([update_task, list_task])
     await client.start()
-
-    # Unified load once at start for all modes
-    scammer_map, scammer_ids = load_scammer_data_v2()
+    if (await update_task).get("forced_update_required"):
+        await client.disconnect()
+        sys.exit(EXIT_FORCED_UPDATE)
+    scammer_map, scammer_ids = await list_task
     if not scammer_ids:
         print("⚠️ No scammer data loaded. Please check the API.")
         await client.disconnect()
@@ -1671,10 +5704,398 @@ async def main():
     print(f"   • Reporting: {report_mode} "
           f"({'Console only' if report_mode == 1 else 'Console + Saved Messages' if report_mode == 2 else 'Console + Chat message'})\n")
 
-    await check_chats_for_scammers(client, chat_name, scammer_ids, scammer_map, report_mode)
+    resume = False
+    if ScanCheckpoint.load(SCAN_CHECKPOINT_FILE).unfinished(chat_name, "participants"):
+        resume = input("⏯️ The last scan of these chats was interrupted. Resume it? (Y/n): ").strip().lower() != "n"
+
+    observed = ObservedUsers.load(OBSERVED_USERS_FILE)
+    await check_chats_for_scammers(client, chat_name, scammer_ids, scammer_map, report_mode, observed=observed,
+                                   alerts=load_alert_renderer(), checkpoint_file=SCAN_CHECKPOINT_FILE, resume=resume)
+    observed.save()
 
     await client.disconnect()
     input("\n✅ Done! Press Enter to exit...")
 
+async def _startup_update_check() -> dict:
+    """Startup version check that can run alongside client.start(); callers act on forced_update_required."""
+    return await check_for_update_once_async(
+        __version__, __force__, GITHUB_RAW_URL,
+        print_prefix="🔎 Update check (startup)", exit_on_force=False,
+    )
+
+async def _await_startup_update(update_task: Optional[asyncio.Task]) -> Optional[int]:
+    """EXIT_FORCED_UPDATE if the startup check found a forced update, else None."""
+    if update_task is None:
+        return None
+    result = await update_task
+    return EXIT_FORCED_UPDATE if result.get("forced_update_required") else None
+
+# --- Headless CLI ---
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="scan.py",
+        description="ScamScan: find known scammers in your Telegram chats. "
+                    "Run without arguments for the interactive menu.",
+        epilog="Exit codes: 0 ok, 1 error, 2 usage, 3 forced update, 4 no scammer data, "
+               "5 no credentials, 6 session not authorized, 10 scammers found, 130 interrupted.",
+    )
+    parser.add_argument("--no-update-check", action="store_true",
+                        help="skip the GitHub version check at startup")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    events_opts = argparse.ArgumentParser(add_help=False)
+    events_opts.add_argument("--events-jsonl", metavar="PATH",
+                             help="also write hits/events as JSON lines to PATH")
+    events_opts.add_argument("--events-max-mb", type=float, default=EVENTS_MAX_BYTES / (1024 * 1024),
+                             help="rotate the events file at this size (default: %(default)s)")
+    events_opts.add_argument("--events-backups", type=int, default=EVENTS_BACKUPS,
+                             help="rotated events files to keep (default: %(default)s)")
+    events_opts.add_argument("--instance", default=None,
+                             help="instance name recorded in events (default: host:session)")
+
+    list_opts = argparse.ArgumentParser(add_help=False)
+    list_opts.add_argument("--index-file", metavar="PATH", nargs="?", const=SHARED_INDEX_FILE, default=None,
+                           help="use a scammer index file shared by all ScamScan processes on this host "
+                                f"(refreshed when older than 1h; default path: {SHARED_INDEX_FILE})")
+
+    alert_opts = argparse.ArgumentParser(add_help=False)
+    alert_opts.add_argument("--language", choices=ALERT_LANGUAGES, default=None,
+                            help="language of alerts and reports (default: the templates file's, else en)")
+    alert_opts.add_argument("--templates", metavar="PATH", default=ALERT_TEMPLATES_FILE,
+                            help="JSON file overriding alert/report templates (default: %(default)s, if present)")
+
+    p_scan = sub.add_parser("scan", parents=[events_opts, list_opts, alert_opts], help="scan chats for known scammers")
+    p_scan.add_argument("--chat", default="",
+                        help="partial chat name to scan (default: all groups/channels)")
+    p_scan.add_argument("--report-mode", type=int, choices=(1, 2, 3), default=1,
+                        help="1 console only, 2 + Saved Messages, 3 + post in the chat (default: 1)")
+    p_scan.add_argument("--summary", action="store_true",
+                        help="also send one summary of all hits to Saved Messages when the scan is done")
+    p_scan.add_argument("--concurrency", type=int, default=1,
+                        help="chats scanned at once (default: 1)")
+    p_scan.add_argument("--format", choices=("text", "json"), default="text",
+                        help="json prints a machine-readable summary on stdout; progress goes to stderr")
+    p_scan.add_argument("--source", choices=SCAN_SOURCES, default="participants",
+                        help="participants: member lists; history: message senders and joins/adds; "
+                             "auto: history where the member list is hidden (default: %(default)s)")
+    p_scan.add_argument("--history-limit", type=int, default=SCAN_HISTORY_LIMIT,
+                        help="messages read per chat and run (default: %(default)s)")
+    p_scan.add_argument("--history-file", metavar="PATH", default=SCAN_HISTORY_FILE,
+                        help="per-chat history cursors, so reruns only read new messages (default: %(default)s)")
+    p_scan.add_argument("--checkpoint-file", metavar="PATH", default=SCAN_CHECKPOINT_FILE,
+                        help="progress written after every chat, for --resume; empty = none (default: %(default)s)")
+    p_scan.add_argument("--resume", action="store_true",
+                        help="continue an interrupted scan with the same --chat/--source and merge its results")
+    p_scan.add_argument("--order", choices=SCAN_ORDERS, default="dialog",
+                        help="scan order: dialog list, size (biggest first), stale (longest since last scan first) "
+                             "or risk (past hits x staleness x member churn per RPC) (default: %(default)s)")
+    p_scan.add_argument("--budget-seconds", type=float, default=None,
+                        help="scan only the highest-risk chats that fit in this many seconds; the rest waits")
+    p_scan.add_argument("--budget-rpcs", type=int, default=None,
+                        help="same, with a budget of API calls (participant pages)")
+
+    p_imm = sub.add_parser("immunize", parents=[list_opts], help="block scammer usernames")
+    p_imm.add_argument("--delay", type=int, default=30,
+                       help="seconds between blocks (default: 30)")
+
+    p_ow = sub.add_parser("overwatch", parents=[events_opts, list_opts, alert_opts], help="stay online and alert on scammer activity")
+    p_ow.add_argument("--report-mode", type=int, choices=(1, 2, 3), default=1,
+                      help="1 terminal only, 2 + Saved Messages reminder, 3 + post to group (default: 1)")
+    p_ow.add_argument("--sessions", default=SESSION_NAME,
+                      help="comma-separated Telethon session names to run together (default: %(default)s)")
+    p_ow.add_argument("--lease-db", metavar="PATH",
+                      help="SQLite lease file shared by Overwatch processes on this host; "
+                           "each shared group is then watched by one process/account")
+    p_ow.add_argument("--parse-in-subprocess", action="store_true",
+                      help="download and index the scammer list in a worker process, "
+                           "keeping event handling responsive during refreshes of large lists")
+    p_ow.add_argument("--record", metavar="PATH",
+                      help="record incoming update metadata to PATH (.gz = compressed) for `bench.py replay`")
+    p_ow.add_argument("--metrics-port", type=int, default=None,
+                      help="serve Prometheus metrics on this local port")
+    p_ow.add_argument("--metrics-host", default=METRICS_HTTP_HOST,
+                      help="bind address for --metrics-port (default: %(default)s)")
+    p_ow.add_argument("--metrics-interval", type=int, default=METRICS_SUMMARY_SECONDS,
+                      help="seconds between metrics summary lines, 0 = off (default: %(default)s)")
+
+    p_ow.add_argument("--lookup-socket", metavar="PATH", default=None,
+                      help="serve scammer lookups (GET /lookup?q=...) from memory on this Unix socket")
+
+    p_lookup = sub.add_parser("lookup", parents=[list_opts],
+                              help="look up scammers by id, @username, name or topic (no login needed)")
+    p_lookup.add_argument("query", help="user id, @username, name, topic:N or a topic link")
+    p_lookup.add_argument("--by", choices=LOOKUP_BY, default="auto", help="what the query is (default: %(default)s)")
+    p_lookup.add_argument("--limit", type=int, default=LOOKUP_DEFAULT_LIMIT, help="max results (default: %(default)s)")
+    p_lookup.add_argument("--server", metavar="URL", default=None,
+                          help="ask a running Overwatch instead of loading the list, e.g. http://127.0.0.1:9310")
+    p_lookup.add_argument("--socket", metavar="PATH", default=None,
+                          help="ask a running Overwatch over its --lookup-socket")
+    p_lookup.add_argument("--format", choices=("text", "json"), default="text")
+
+    p_observed = sub.add_parser("observed", parents=[list_opts],
+                                help="export scammers' observed usernames/names and their changes (no login needed)")
+    p_observed.add_argument("--file", default=OBSERVED_USERS_FILE, help="observed identity store (default: %(default)s)")
+    p_observed.add_argument("--changed-only", action="store_true", help="only users seen under more than one identity")
+    p_observed.add_argument("--with-list", action="store_true",
+                            help="load the scammer list too, to show each user's listed username")
+    p_observed.add_argument("--output", metavar="PATH", default=None, help="write here instead of stdout")
+    p_observed.add_argument("--format", choices=("text", "json", "csv"), default="text")
+
+    p_login = sub.add_parser("login", help="log a session in interactively (needed once per account)")
+    p_login.add_argument("--session", default=SESSION_NAME, help="session name (default: %(default)s)")
+
+    return parser
+
+async def _cli_load_scammer_list(args):
+    if args.index_file:
+        return await fetch_scammer_list(index_file=args.index_file)
+    return await load_scammer_data_v2_async()
+
+def _sink_from_args(args) -> Optional[JsonlEventSink]:
+    path = getattr(args, "events_jsonl", None)
+    if not path:
+        return None
+    return JsonlEventSink(
+        path,
+        instance=args.instance,
+        max_bytes=int(args.events_max_mb * 1024 * 1024),
+        backups=args.events_backups,
+    )
+
+async def _cli_scan(args, api_id, api_hash, update_task: Optional[asyncio.Task] = None) -> int:
+    client = ScamScanClient(SESSION_NAME, api_id, api_hash)
+    sink = _sink_from_args(args)
+    observed = ObservedUsers.load(OBSERVED_USERS_FILE)
+    try:
+        authorized, (scammer_map, scammer_ids) = await asyncio.gather(
+            start_client(client, interactive=False),
+            _cli_load_scammer_list(args),
+        )
+        forced = await _await_startup_update(update_task)
+        if forced is not None:
+            return forced
+        if not authorized:
+            return EXIT_NOT_AUTHORIZED
+        if not scammer_ids:
+            print("⚠️ No scammer data loaded. Please check the API.")
+            return EXIT_NO_SCAMMER_DATA
+
+        alerts = load_alert_renderer(args.templates, args.language)
+        summary = await check_chats_for_scammers(
+            client, args.chat, scammer_ids, scammer_map, args.report_mode,
+            concurrency=args.concurrency,
+            sink=sink,
+            source=args.source,
+            history_file=args.history_file,
+            history_limit=args.history_limit,
+            observed=observed,
+            alerts=alerts,
+            reports=ReportWriter(client, args.report_mode, summary=args.summary, alerts=alerts),
+            checkpoint_file=args.checkpoint_file or None,
+            resume=args.resume,
+            order=args.order,
+            budget_seconds=args.budget_seconds,
+            budget_rpcs=args.budget_rpcs,
+        )
+    finally:
+        await client.disconnect()
+        if sink is not None:
+            sink.flush()
+        observed.save()
+
+    hits = sum(len(r["scammers"]) for r in summary["results"])
+    summary["scammers_found"] = hits
+    summary["scanned_at"] = int(time.time())
+    summary["version"] = __version__
+
+    if args.format == "json":
+        print(json.dumps(summary, ensure_ascii=False, indent=2), file=sys.__stdout__)
+    else:
+        deferred = f", {summary['chats_deferred']} deferred" if summary.get("chats_deferred") else ""
+        print(f"\n🧾 Scanned {summary['chats_scanned']}/{summary['chats_matched']} chat(s), "
+              f"{summary['chats_failed']} failed{deferred}, {hits} scammer hit(s).")
+
+    return EXIT_SCAMMERS_FOUND if hits else EXIT_OK
+
+async def _cli_login(args, api_id, api_hash) -> int:
+    client = ScamScanClient(args.session, api_id, api_hash)
+    try:
+        await start_client(client, interactive=True)
+        me = await client.get_me()
+        print(f"✅ Session '{args.session}' logged in as {name_for_telegram_user_fallback(me)} (id {getattr(me, 'id', '?')}).")
+    finally:
+        await client.disconnect()
+    return EXIT_OK
+
+async def _cli_immunize(args, api_id, api_hash, update_task: Optional[asyncio.Task] = None) -> int:
+    client = ScamScanClient(SESSION_NAME, api_id, api_hash)
+    try:
+        authorized, (scammer_map, scammer_ids) = await asyncio.gather(
+            start_client(client, interactive=False),
+            _cli_load_scammer_list(args),
+        )
+        forced = await _await_startup_update(update_task)
+        if forced is not None:
+            return forced
+        if not authorized:
+            return EXIT_NOT_AUTHORIZED
+        if not scammer_ids:
+            print("⚠️ No scammer data loaded. Please check the API.")
+            return EXIT_NO_SCAMMER_DATA
+
+        observed = ObservedUsers.load(OBSERVED_USERS_FILE)
+        usernames = build_usernames_to_block_from_v2(scammer_ids, scammer_map, observed)
+        try:
+            await block_usernames_slowly(client, usernames, delay_seconds=max(0, args.delay),
+                                         observed=observed, scammer_ids=scammer_ids)
+        finally:
+            observed.save()
+    finally:
+        await client.disconnect()
+    return EXIT_OK
+
+async def _query_lookup_socket(path: str, request_path: str) -> Dict[str, Any]:
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(f"GET {request_path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    if b" 200 " not in head.split(b"\r\n", 1)[0]:
+        raise RuntimeError(head.split(b"\r\n", 1)[0].decode("latin-1"))
+    return json.loads(body)
+
+async def _cli_lookup(args) -> int:
+    request_path = "/lookup?" + urlencode({"q": args.query, "by": args.by, "limit": args.limit})
+    try:
+        if args.socket:
+            res = await _query_lookup_socket(args.socket, request_path)
+        elif args.server:
+            resp = await asyncio.to_thread(http_session().get, args.server.rstrip("/") + request_path, timeout=10)
+            resp.raise_for_status()
+            res = resp.json()
+        else:
+            scammer_map, scammer_ids = await _cli_load_scammer_list(args)
+            if not scammer_ids:
+                print("⚠️ No scammer data loaded. Please check the API.")
+                return EXIT_NO_SCAMMER_DATA
+            res = lookup_response(ScammerLookup(scammer_map), args.query, args.by, args.limit)
+    except Exception as e:
+        print(f"❌ Lookup failed: {e}")
+        return EXIT_NO_SCAMMER_DATA
+
+    if args.format == "json":
+        print(json.dumps(res, ensure_ascii=False, indent=2), file=sys.__stdout__)
+    elif not res["results"]:
+        print(f"✅ No listed scammer matches '{args.query}'.")
+    else:
+        for r in res["results"]:
+            score = f" [{r['score']:.2f}]" if r["match"] == "name" else ""
+            topic = f" topic: {r['topic_link']}" if r["topic_link"] else ""
+            print(f"⚠️ {r['display']} (id {r['user_id']}) — matched {r['match']}{score}{topic}")
+            if r.get("reason"):
+                print(f"    reason: {r['reason']}")
+    return EXIT_SCAMMERS_FOUND if res["results"] else EXIT_OK
+
+async def _cli_observed(args) -> int:
+    if not os.path.exists(args.file):
+        print(f"⚠️ {args.file} doesn't exist yet; Overwatch, scan and immunize create it.")
+        return EXIT_NO_SCAMMER_DATA
+    observed = ObservedUsers.load(args.file)
+    scammer_map = None
+    if args.with_list:
+        scammer_map, _ = await _cli_load_scammer_list(args)
+    rows = observed.export_rows(scammer_map, changed_only=args.changed_only)
+
+    with (open(args.output, "w", encoding="utf-8", newline="") if args.output else contextlib.nullcontext(sys.__stdout__)) as out:
+        if args.format == "json":
+            json.dump(rows, out, ensure_ascii=False, indent=2)
+            out.write("\n")
+        elif args.format == "csv":
+            w = csv.writer(out)
+            w.writerow(["user_id", "username", "full_name", "listed_username", "first_seen", "last_seen", "previous_usernames"])
+            for r in rows:
+                prev = " ".join(p["username"] for p in r["previous"] if p["username"])
+                w.writerow([r["user_id"], r["username"] or "", r["full_name"] or "", r["listed_username"] or "",
+                            r["first_seen"], r["last_seen"], prev])
+        else:
+            for r in rows:
+                now = r["username"] or r["full_name"] or "?"
+                listed = f" (listed as {r['listed_username']})" if r["listed_username"] and r["listed_username"] != r["username"] else ""
+                print(f"👤 {r['user_id']}: {now}{listed}", file=out)
+                for p in r["previous"]:
+                    print(f"    was {p['username'] or p['full_name'] or '?'} until "
+                          f"{datetime.fromtimestamp(p['last_seen'] or 0).strftime('%Y-%m-%d %H:%M')}", file=out)
+            print(f"🧾 {len(rows)} user(s), {sum(1 for r in rows if r['previous'])} with identity changes.", file=out)
+    return EXIT_OK
+
+async def cli_main(argv: List[str]) -> int:
+    """
+    Non-interactive entry point: never calls input(), returns an EXIT_* code.
+    """
+    args = build_arg_parser().parse_args(argv)
+
+    # json output: keep stdout clean for the summary, send progress to stderr
+    redirect = contextlib.redirect_stdout(sys.stderr) if getattr(args, "format", "text") == "json" else contextlib.nullcontext()
+    with redirect:
+        if args.command == "lookup":
+            return await _cli_lookup(args)
+        if args.command == "observed":
+            return await _cli_observed(args)
+
+        # runs alongside client startup and the list fetch; commands check it before acting
+        update_task = None if args.no_update_check else asyncio.create_task(_startup_update_check())
+
+        creds = load_api_credentials_noninteractive()
+        if creds is None:
+            print(f"❌ No API credentials. Set SCAMSCAN_API_ID / SCAMSCAN_API_HASH or run interactively once to create {CONFIG_FILE}.")
+            if update_task is not None:
+                update_task.cancel()
+            return EXIT_NOT_CONFIGURED
+        api_id, api_hash = creds
+
+        if args.command == "scan":
+            return await _cli_scan(args, api_id, api_hash, update_task)
+        if args.command == "immunize":
+            return await _cli_immunize(args, api_id, api_hash, update_task)
+        if args.command == "login":
+            forced = await _await_startup_update(update_task)
+            if forced is not None:
+                return forced
+            return await _cli_login(args, api_id, api_hash)
+        if args.command == "overwatch":
+            rc = await run_overwatch_forever(
+                api_id, api_hash, args.report_mode,
+                interactive=False,
+                sessions=[x.strip() for x in args.sessions.split(",") if x.strip()],
+                lease_db=args.lease_db,
+                parse_in_subprocess=args.parse_in_subprocess,
+                index_file=args.index_file,
+                sink=_sink_from_args(args),
+                recorder=UpdateRecorder(args.record) if args.record else None,
+                metrics_port=args.metrics_port,
+                metrics_host=args.metrics_host,
+                metrics_interval=args.metrics_interval,
+                startup_update=update_task,
+                lookup_socket=args.lookup_socket,
+                alerts=load_alert_renderer(args.templates, args.language),
+            )
+            return EXIT_OK if rc is None else rc
+
+    return EXIT_USAGE
+
+async def _with_http_cleanup(coro):
+    try:
+        return await coro
+    finally:
+        await close_http_sessions()
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    if len(sys.argv) > 1:
+        try:
+            sys.exit(asyncio.run(_with_http_cleanup(cli_main(sys.argv[1:]))))
+        except KeyboardInterrupt:
+            sys.exit(EXIT_INTERRUPTED)
+    asyncio.run(_with_http_cleanup(main()))
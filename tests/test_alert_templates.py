@@ -0,0 +1,42 @@
+import json
+import string
+
+import pytest
+
+import scan
+
+def _load(tmp_path, templates, language="en"):
+    path = tmp_path / "alert_templates.json"
+    path.write_text(json.dumps({"language": language, "templates": templates}), encoding="utf-8")
+    return scan.load_alert_renderer(str(path))
+
+@pytest.mark.parametrize("language", scan.ALERT_LANGUAGES)
+def test_builtin_templates_only_use_their_kinds_fields(language):
+    for kind, text in scan.ALERT_TEMPLATES[language].items():
+        used = {name for _, name, _, _ in string.Formatter().parse(text) if name}
+        assert used <= set(scan.ALERT_TEMPLATE_FIELDS[kind]), kind
+
+@pytest.mark.parametrize("kind, text", [
+    ("message", "🚨 scam {scammer} in {chat_id}"),
+    ("verify_still", "🚨 scam {scammer} in {chat_title} ({chat_id})"),
+    ("report_header", "{chat_title} {chat_link}"),
+    ("scammer", "{display} {topic_link}"),
+])
+def test_override_using_a_field_its_kind_does_not_get_is_rejected(tmp_path, capsys, kind, text):
+    alerts = _load(tmp_path, {kind: text})
+    assert alerts.templates[kind] == scan.ALERT_TEMPLATES["en"][kind]
+    assert f"'{kind}' doesn't render" in capsys.readouterr().out
+
+def test_valid_override_renders_with_runtime_fields(tmp_path, capsys):
+    alerts = _load(tmp_path, {"message": "🚨 scam {scammer} in {chat_title}: {msg_link}",
+                              "verify_still": "🚨 scam {scammer} still in {chat_link}"})
+    assert capsys.readouterr().out == ""
+    text = alerts.render("message", chat_title="Chat", scammer="@x", topic_line="", msg_link="https://t.me/c/1/2")
+    assert text == "🚨 scam @x in Chat: https://t.me/c/1/2"
+    text = alerts.render("verify_still", chat_title="Chat", chat_link="https://t.me/c/1", scammer="@x", topic_line="")
+    assert text == "🚨 scam @x still in https://t.me/c/1"
+
+def test_unknown_kind_is_ignored(tmp_path, capsys):
+    alerts = _load(tmp_path, {"nope": "x"})
+    assert "nope" not in alerts.templates
+    assert "unknown template 'nope'" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+import scan
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(scan.time, "time", lambda: now[0])
+    return now
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return scan.ChatLeaseStore(str(tmp_path / "leases.sqlite"), ttl_seconds=60)
+
+def test_each_chat_goes_to_one_holder(store):
+    assert store.sync("a", {1, 2}) == {1, 2}
+    assert store.sync("b", {2, 3}) == {3}
+    assert store.sync("a", {1, 2}) == {1, 2}  # renewal keeps them
+
+def test_expired_leases_are_taken_over(store, clock):
+    store.sync("a", {1, 2})
+    clock[0] += 30
+    assert store.sync("b", {1, 2}) == set()  # still live
+    clock[0] += 31
+    assert store.sync("b", {1, 2}) == {1, 2}  # a stopped renewing
+    assert store.sync("a", {1, 2}) == set()
+
+def test_renewal_pushes_expiry_out(store, clock):
+    store.sync("a", {1})
+    clock[0] += 50
+    store.sync("a", {1})
+    clock[0] += 50
+    assert store.sync("b", {1}) == set()
+
+def test_unlisted_chats_are_dropped(store):
+    store.sync("a", {1, 2})
+    assert store.sync("a", {1}) == {1}
+    assert store.sync("b", {2}) == {2}
+
+def test_release_hands_chats_over_now(store):
+    store.sync("a", {1, 2})
+    store.release("a")
+    assert store.sync("b", {1, 2}) == {1, 2}
+
+def test_leases_are_shared_through_the_file(tmp_path, clock):
+    path = str(tmp_path / "leases.sqlite")
+    scan.ChatLeaseStore(path).sync("a", {1})
+    assert scan.ChatLeaseStore(path).sync("b", {1}) == set()
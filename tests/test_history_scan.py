@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+import bench
+import scan
+
+def _world(messages, scammer_at):
+    client, peer_ids, _, scammer_ids = bench._bench_world(
+        chats=1, participants=5, scammers=len(scammer_at), scammers_per_chat=0, rpc_latency=0)
+    peer_id = peer_ids[0]
+    senders = {msg_id: scammer_ids[i] for i, msg_id in enumerate(scammer_at)}
+    client.history[peer_id] = [SimpleNamespace(id=i, sender_id=senders.get(i, 1), sender=None, action=None)
+                               for i in range(1, messages + 1)]
+    scammer_map = bench._bench_scammer_payload(len(scammer_at))["data"]
+    return client, client.chats[peer_id], scammer_map, [str(s) for s in scammer_ids]
+
+def _scan(client, chat, scammer_map, cursors, limit):
+    return asyncio.run(scan.scan_chat_history_for_scammers(
+        client, chat, set(scammer_map), scammer_map, 0, cursors=cursors, limit=limit))
+
+def test_first_run_reads_newest_messages_and_sets_cursor_to_newest():
+    client, chat, scammer_map, (old, recent) = _world(3000, scammer_at=[5, 2900])
+    cursors = {}
+    hits = _scan(client, chat, scammer_map, cursors, limit=1000)
+    assert [h[0] for h in hits] == [recent]
+    assert cursors[chat.id] == 3000
+
+def test_rerun_reads_forward_from_cursor_over_several_runs():
+    client, chat, scammer_map, (first, second) = _world(3000, scammer_at=[1500, 2900])
+    cursors = {chat.id: 100}
+    found = []
+    for expected_cursor in (1100, 2100, 3000, 3000):
+        found += [h[0] for h in _scan(client, chat, scammer_map, cursors, limit=1000)]
+        assert cursors[chat.id] == expected_cursor
+    assert found == [first, second]
+
+def test_no_new_messages_keeps_cursor():
+    client, chat, scammer_map, _ = _world(50, scammer_at=[10])
+    cursors = {chat.id: 50}
+    assert _scan(client, chat, scammer_map, cursors, limit=1000) == []
+    assert cursors[chat.id] == 50
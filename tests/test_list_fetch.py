@@ -0,0 +1,101 @@
+import asyncio
+import gzip
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scan
+
+PAYLOAD = json.dumps({"count": 300, "data": {str(7_000_000_000 + i): {"username": f"u{i}", "topic_id": i}
+                                             for i in range(300)}}).encode("utf-8")
+
+def _deflate_raw(body):
+    c = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return c.compress(body) + c.flush()
+
+BODIES = {
+    "identity": PAYLOAD,
+    "gzip": gzip.compress(PAYLOAD),
+    "deflate": zlib.compress(PAYLOAD),
+    "deflate-raw": _deflate_raw(PAYLOAD),
+}
+
+@pytest.fixture(scope="module")
+def server():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            kind = self.path.strip("/")
+            body = BODIES[kind]
+            self.send_response(200)
+            if kind != "identity":
+                self.send_header("Content-Encoding", kind.split("-")[0])
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(body), 1000):
+                part = body[i:i + 1000]
+                self.wfile.write(b"%x\r\n" % len(part) + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def _wire_bytes_counted(fetch):
+    before = scan.METRICS.counter_total("scamscan_list_fetch_bytes_total")
+    entries = {}
+    fetch(lambda k, v: entries.__setitem__(k, v))
+    return entries, scan.METRICS.counter_total("scamscan_list_fetch_bytes_total") - before
+
+@pytest.mark.skipif(scan.aiohttp is None, reason="aiohttp not installed")
+@pytest.mark.parametrize("kind", sorted(BODIES))
+def test_async_fetch_counts_wire_bytes(server, kind):
+    async def fetch(on_entry):
+        try:
+            await scan.stream_scammer_data_v2_async(f"{server}/{kind}", on_entry)
+        finally:
+            await scan.close_http_sessions()
+
+    entries, counted = _wire_bytes_counted(lambda on_entry: asyncio.run(fetch(on_entry)))
+    assert len(entries) == 300
+    assert counted == len(BODIES[kind])
+
+@pytest.mark.parametrize("kind", ["identity", "gzip", "deflate"])
+def test_sync_fetch_counts_wire_bytes(server, kind):
+    entries, counted = _wire_bytes_counted(lambda on_entry: scan.stream_scammer_data_v2(f"{server}/{kind}", on_entry))
+    assert len(entries) == 300
+    assert counted == len(BODIES[kind])
+
+@pytest.mark.skipif(scan.aiohttp is None, reason="aiohttp not installed")
+def test_aiohttp_session_shared_while_stale_session_closes(monkeypatch):
+    class StaleSession:
+        closed = False
+
+        async def close(self):
+            await asyncio.sleep(0.01)
+            self.closed = True
+
+    stale = StaleSession()
+    monkeypatch.setattr(scan, "_AIOHTTP_SESSION", stale)
+    monkeypatch.setattr(scan, "_AIOHTTP_SESSION_LOOP", object())  # made on some earlier loop
+
+    async def main():
+        try:
+            sessions = await asyncio.gather(*(scan.aiohttp_session() for _ in range(5)))
+            assert len({id(s) for s in sessions}) == 1
+            assert not sessions[0].closed
+        finally:
+            await scan.close_http_sessions()
+
+    asyncio.run(main())
+    assert stale.closed
+    assert scan._AIOHTTP_SESSION is None
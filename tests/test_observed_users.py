@@ -0,0 +1,65 @@
+import json
+from types import SimpleNamespace
+
+import scan
+
+def _user(uid, username=None, first_name="User"):
+    return SimpleNamespace(id=uid, username=username, first_name=first_name, last_name=None)
+
+def test_two_processes_saving_keep_each_others_observations(tmp_path):
+    path = str(tmp_path / "observed_users.json")
+    a = scan.ObservedUsers.load(path)
+    b = scan.ObservedUsers.load(path)
+    a.observe(_user(1, "one"))
+    b.observe(_user(2, "two"))
+    b.mark_dead("@gone")
+    a.save()
+    b.save()
+    on_disk = json.loads(open(path, encoding="utf-8").read())
+    assert set(on_disk["users"]) == {"1", "2"}
+    assert "gone" in on_disk["dead_usernames"]
+    # a process that saves again afterwards doesn't drop what the other one wrote
+    a.observe(_user(3, "three"))
+    a.save()
+    on_disk = json.loads(open(path, encoding="utf-8").read())
+    assert set(on_disk["users"]) == {"1", "2", "3"}
+    assert "gone" in on_disk["dead_usernames"]
+
+def test_identity_change_seen_elsewhere_becomes_current_with_history(tmp_path):
+    path = str(tmp_path / "observed_users.json")
+    a = scan.ObservedUsers.load(path)
+    a.observe(_user(1, "old_name"))
+    a.users["1"]["first_seen"] -= 20
+    a.users["1"]["last_seen"] -= 10  # a saw the old name a while ago
+    a.save()
+    b = scan.ObservedUsers.load(path)
+    b.observe(_user(1, "new_name"))
+    b.save()
+    a.dirty = True
+    generation = a.generation
+    a.save()
+    assert a.users["1"]["username"] == "new_name"
+    assert [h[0] for h in a.users["1"]["history"]] == ["old_name"]
+    assert a.generation > generation
+
+def test_name_seen_in_use_after_being_marked_dead_is_alive(tmp_path):
+    path = str(tmp_path / "observed_users.json")
+    a = scan.ObservedUsers.load(path)
+    a.mark_dead("reused")
+    a.dead_usernames["reused"] -= 100
+    a.save()
+    b = scan.ObservedUsers.load(path)
+    b.dead_usernames.clear()
+    b.observe(_user(5, "reused"))
+    b.save()
+    a.dirty = True
+    a.save()
+    assert not a.is_dead("reused")
+
+def test_merge_observed_user_dedupes_history():
+    a = {"username": "x", "full_name": "X", "first_seen": 100, "last_seen": 200, "history": [["w", "W", 10, 90]]}
+    b = {"username": "x", "full_name": "X", "first_seen": 50, "last_seen": 150, "history": [["w", "W", 10, 90]]}
+    merged = scan._merge_observed_user(a, b)
+    assert merged["first_seen"] == 50
+    assert merged["last_seen"] == 200
+    assert merged["history"] == [["w", "W", 10, 90]]
@@ -0,0 +1,48 @@
+import pytest
+
+import scan
+
+DATA = {
+    "101": {"username": "Scam_Alice", "full_name": "Alice Crypto Support", "topic_id": 7, "reason": "fake escrow"},
+    "102": {"username": "None", "full_name": "Bob Giveaway", "topic_id": "7"},
+    "103": {"username": "@carol", "full_name": "Carol Trader", "topic_id": 9},
+    "104": {"username": "dave", "full_name": "Dave Trader"},
+}
+
+@pytest.fixture(params=["dict", "compact"])
+def lookup(request, tmp_path):
+    if request.param == "dict":
+        return scan.ScammerLookup(DATA)
+    path = str(tmp_path / "scammer_index.bin")
+    scan.write_compact_index_file(path, DATA)
+    return scan.ScammerLookup(scan.CompactScammerIndex.open(path))
+
+def _ids(results):
+    return [r["user_id"] for r in results]
+
+def test_by_id(lookup):
+    (r,) = lookup.search("101")
+    assert (r["match"], r["username"], r["topic_id"]) == ("id", "@Scam_Alice", 7)
+    assert lookup.search("999") == []
+
+def test_by_username_is_case_insensitive(lookup):
+    assert _ids(lookup.search("@scam_alice")) == ["101"]
+    assert _ids(lookup.search("CAROL", by="username")) == ["103"]
+    assert lookup.search("@none") == []  # "None" placeholders aren't indexed
+
+def test_by_topic(lookup):
+    assert sorted(_ids(lookup.search("topic:7"))) == ["101", "102"]
+    assert _ids(lookup.search(f"{scan.SCAMMER_TOPIC_BASE}/9")) == ["103"]
+    assert lookup.search("topic:x") == []
+
+def test_by_name_prefix_and_rank(lookup):
+    results = lookup.search("trader")
+    assert sorted(_ids(results)) == ["103", "104"]
+    assert all(r["match"] == "name" for r in results)
+    assert _ids(lookup.search("carol trad")) == ["103"]  # narrowed by the second token
+
+def test_by_name_typo(lookup):
+    assert _ids(lookup.search("giveawey", by="name")) == ["102"]
+
+def test_limit(lookup):
+    assert len(lookup.search("trader", limit=1)) == 1
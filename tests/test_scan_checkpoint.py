@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import scan
+
+def _chat(chat_id, title="Group"):
+    return SimpleNamespace(id=chat_id, title=title)
+
+def _hit(chat_id):
+    return {"chat_id": chat_id, "title": "Group", "scammers": [{"user_id": 1}]}
+
+def test_resume_merges_results_across_runs(tmp_path):
+    path = str(tmp_path / "scan_checkpoint.json")
+    cp = scan.ScanCheckpoint.load(path)
+    assert cp.begin("all", "dialogs", resume=False) == 0
+    cp.record(_chat(1), _hit(1))
+    cp.record(_chat(2), None)
+    cp.record(_chat(3), None, failed=True)
+    # interrupted here
+
+    cp = scan.ScanCheckpoint.load(path)
+    assert cp.unfinished("all", "dialogs")
+    assert cp.begin("all", "dialogs", resume=True) == 2
+    assert cp.is_done(1) and cp.is_done(2)
+    assert not cp.is_done(3)  # failed chats are retried
+    assert cp.run["failed"] == []
+    cp.record(_chat(3), _hit(3))
+    assert sorted(r["chat_id"] for r in cp.results()) == [1, 3]
+
+    cp.finish()
+    cp = scan.ScanCheckpoint.load(path)
+    assert cp.run is None and cp.results() == []
+    assert set(cp.chats) == {"1", "2", "3"}  # chat metadata outlives the run
+
+def test_resume_needs_the_same_filter_and_source(tmp_path):
+    path = str(tmp_path / "scan_checkpoint.json")
+    cp = scan.ScanCheckpoint.load(path)
+    cp.begin("all", "dialogs", resume=False)
+    cp.record(_chat(1), _hit(1))
+
+    cp = scan.ScanCheckpoint.load(path)
+    assert not cp.unfinished("groups", "dialogs")
+    assert cp.begin("groups", "dialogs", resume=True) == 0
+    assert cp.results() == []
+
+def test_chat_meta_accumulates_over_scans():
+    cp = scan.ScanCheckpoint(path=None)
+    cp.begin("all", "dialogs", resume=False)
+    cp.record(_chat(1), _hit(1), chat_stats={"participants": 50, "seconds": 1.234})
+    cp.begin("all", "dialogs", resume=False)
+    cp.record(_chat(1), None)
+    meta = cp.chats["1"]
+    assert (meta["scans"], meta["hit_scans"], meta["hits"]) == (2, 1, 0)
+    assert (meta["participants"], meta["seconds"]) == (50, 1.23)
+
+def test_unreadable_checkpoint_starts_fresh(tmp_path):
+    path = tmp_path / "scan_checkpoint.json"
+    path.write_text("{not json")
+    cp = scan.ScanCheckpoint.load(str(path))
+    assert cp.run is None and cp.chats == {}
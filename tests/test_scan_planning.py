@@ -0,0 +1,79 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import scan
+
+def _chat(chat_id, participants):
+    return SimpleNamespace(id=chat_id, title=f"chat {chat_id}", participants_count=participants)
+
+def _checkpoint(**meta):
+    cp = scan.ScanCheckpoint(path=None)
+    cp.chats = {str(k): v for k, v in meta.items()}
+    return cp
+
+def test_cost_estimate_from_size_or_measured_time():
+    cp = _checkpoint(**{"2": {"seconds": 7.5}})
+    assert scan.estimate_scan_cost(_chat(1, 450), cp) == (3 * scan.SCAN_RPC_SECONDS, 3)
+    assert scan.estimate_scan_cost(_chat(2, 450), cp) == (7.5, 3)
+    assert scan.estimate_scan_cost(_chat(3, 0), cp)[1] == 1
+
+def test_no_budget_ranks_everything():
+    now = time.time()
+    cp = _checkpoint(**{
+        "1": {"last_scan": now, "scans": 5, "hit_scans": 0},  # just scanned, never a hit
+        "2": {"last_scan": now - scan.SCAN_STALE_SECONDS, "scans": 5, "hit_scans": 5},
+    })
+    chats = [_chat(1, 100), _chat(2, 100), _chat(3, 100)]
+    selected, deferred = scan.plan_scan(chats, cp)
+    assert [c.id for c in selected][0] == 2 and selected[-1].id == 1
+    assert deferred == []
+
+def test_rpc_budget_skips_what_does_not_fit():
+    cp = _checkpoint()
+    # priority per RPC favours the small chats; the big one (5 RPCs) doesn't fit after them
+    chats = [_chat(1, 1000), _chat(2, 100), _chat(3, 100), _chat(4, 100)]
+    selected, deferred = scan.plan_scan(chats, cp, budget_rpcs=4)
+    assert sorted(c.id for c in selected) == [2, 3, 4]
+    assert [c.id for c in deferred] == [1]
+
+def test_seconds_budget_lets_smaller_chats_through_after_a_skip():
+    now = time.time()
+    cp = _checkpoint(**{
+        "1": {"seconds": 100.0, "hit_scans": 3, "scans": 3},  # highest priority, too slow
+        "2": {"seconds": 20.0, "last_scan": now - scan.SCAN_STALE_SECONDS},
+    })
+    selected, deferred = scan.plan_scan([_chat(1, 100), _chat(2, 100)], cp, budget_seconds=30)
+    assert [c.id for c in selected] == [2]
+    assert [c.id for c in deferred] == [1]
+
+def test_both_budgets_apply():
+    cp = _checkpoint()
+    chats = [_chat(i, 100) for i in range(6)]
+    selected, _ = scan.plan_scan(chats, cp, budget_seconds=10 * scan.SCAN_RPC_SECONDS, budget_rpcs=2)
+    assert len(selected) == 2
+
+def test_member_sketch_is_bounded_and_order_independent():
+    ids = list(range(1000, 1500))
+    sketch = scan._member_sketch(ids)
+    assert len(sketch) == scan.SCAN_CHURN_SKETCH
+    assert sketch == sorted(sketch) == scan._member_sketch(reversed(ids))
+    assert len(scan._member_sketch([1, 2, 2])) == 2
+
+def test_sketch_churn():
+    members = list(range(10_000, 12_000))
+    same = scan._member_sketch(members)
+    assert scan._sketch_churn(same, scan._member_sketch(list(members))) == 0.0
+    assert scan._sketch_churn(same, scan._member_sketch(range(50_000, 52_000))) == 1.0
+    half = scan._member_sketch(members[1000:] + list(range(20_000, 21_000)))
+    assert scan._sketch_churn(same, half) == pytest.approx(2 / 3, abs=0.25)  # Jaccard 1/3
+    assert scan._sketch_churn([], same) is None
+
+def test_churn_is_recorded_between_scans():
+    cp = scan.ScanCheckpoint(path=None)
+    chat = _chat(1, 3)
+    for sketch in (scan._member_sketch([1, 2, 3]), scan._member_sketch([4, 5, 6])):
+        cp.begin("all", "participants", resume=False)
+        cp.record(chat, None, chat_stats={"sketch": sketch})
+    assert cp.chats["1"]["churn"] == 1.0
@@ -0,0 +1,27 @@
+import os
+import time
+
+import scan
+
+DATA = {"1": {"username": "a", "topic_id": 10}, "2": {"username": "b", "topic_id": 20}}
+
+def test_not_modified_refresh_keeps_the_index_identity(tmp_path, monkeypatch):
+    path = str(tmp_path / "scammer_index.bin")
+    scan.write_compact_index_file(path, DATA)
+    old = time.time() - 2 * scan.SHARED_INDEX_MAX_AGE_SECONDS
+    os.utime(path, (old, old))
+    index = scan.CompactScammerIndex.open(path)
+
+    monkeypatch.setattr(scan, "_build_index_file_from_v2_url", lambda url, p, validators: (None, None, validators))
+    assert scan.refresh_shared_index_file(path, "http://unused") == (False, None, None)
+
+    assert scan.index_file_age(path) < 60  # marked fresh
+    assert scan.index_file_identity(path) == index.identity  # so readers don't remap it
+
+def test_atomic_replace_changes_the_identity(tmp_path):
+    path = str(tmp_path / "scammer_index.bin")
+    scan.write_compact_index_file(path, DATA)
+    index = scan.CompactScammerIndex.open(path)
+    scan.write_compact_index_file(path, {**DATA, "3": {"username": "c"}})
+    assert scan.index_file_identity(path) != index.identity
+    assert len(scan.CompactScammerIndex.open(path)) == 3
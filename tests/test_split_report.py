@@ -0,0 +1,50 @@
+import re
+
+import pytest
+
+import scan
+
+HEADER = "🚨 Scan report: Some Group"
+
+def _report(lines, width=40):
+    return "\n".join([HEADER] + [f"{i:04d} " + "x" * (width - 5) for i in range(lines)])
+
+def _strip_label(part, i, n):
+    label = f"({i}/{n}) "
+    assert part.startswith(label)
+    return part[len(label):]
+
+def test_short_text_is_one_unlabelled_part():
+    text = _report(3)
+    assert scan.split_report(text) == [text]
+
+def test_exactly_at_the_limit_is_not_split():
+    text = "x" * scan.TELEGRAM_MESSAGE_LIMIT
+    assert scan.split_report(text) == [text]
+
+@pytest.mark.parametrize("limit", [200, scan.TELEGRAM_MESSAGE_LIMIT])
+def test_parts_fit_and_are_labelled(limit):
+    text = _report(limit // 10)
+    parts = scan.split_report(text, limit)
+    n = len(parts)
+    assert n > 1
+    assert all(len(p) <= limit for p in parts)
+    bodies = [_strip_label(p, i, n) for i, p in enumerate(parts, 1)]
+    assert all(b.split("\n", 1)[0] == HEADER for b in bodies)  # every part says what it's about
+    lines = [line for b in bodies for line in b.split("\n")[1:]]
+    assert lines == text.split("\n")[1:]  # nothing lost, duplicated or reordered
+
+def test_long_lines_are_cut():
+    text = "\n".join([HEADER, "y" * 1000, "z"])
+    parts = scan.split_report(text, 300)
+    assert all(len(p) <= 300 for p in parts)
+    bodies = [_strip_label(p, i, len(parts)) for i, p in enumerate(parts, 1)]
+    assert "".join(b.split("\n", 1)[1] for b in bodies).replace("\n", "") == "y" * 1000 + "z"
+
+def test_oversized_first_line_is_not_repeated():
+    first = "h" * 150
+    text = "\n".join([first] + ["w" * 50] * 10)
+    parts = scan.split_report(text, 200)
+    assert all(len(p) <= 200 for p in parts)
+    assert sum(p.count(first) for p in parts) == 1
+    assert all(re.match(r"\(\d+/%d\) " % len(parts), p) for p in parts)
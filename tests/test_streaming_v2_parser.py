@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from scan import StreamingV2Parser
+
+PAYLOADS = [
+    '{"data":{"1":{"a":1}},"count":2,"generated_at":1700000000.25}',
+    '{"data":{"1":{"a":1.5e3},"2":{"b":-2E-2}},"count":2,"generated_at":1.7e9}',
+    '{"data":{"7":{"topic_id":12}},"generated_at":-0.5,"count":10}',
+]
+
+def _parse(chunks):
+    entries = {}
+    parser = StreamingV2Parser(lambda k, v: entries.__setitem__(k, v))
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return entries, parser.meta
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_every_two_way_split_parses_like_json(payload):
+    expected = json.loads(payload)
+    for cut in range(1, len(payload)):
+        entries, meta = _parse([payload[:cut], payload[cut:]])
+        assert entries == expected["data"], cut
+        assert meta == {k: v for k, v in expected.items() if k != "data"}, cut
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_one_character_chunks(payload):
+    expected = json.loads(payload)
+    entries, meta = _parse(list(payload))
+    assert entries == expected["data"]
+    assert meta["generated_at"] == expected["generated_at"]
+
+def test_split_after_decimal_point():
+    payload = PAYLOADS[0]
+    entries, meta = _parse([payload[:58], payload[58:]])
+    assert meta["generated_at"] == 1700000000.25